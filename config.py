@@ -4,22 +4,79 @@ class DynaGraphConfig:
     GAMMA = 0.1  # Temporal decay rate
     PRUNE_THRESHOLD = 0.15  # Node centrality threshold for pruning
     REWIRING_INTERVAL = 5  # Turns between graph rewiring
+    GRAPH_BACKEND = "networkx"  # "networkx" MultiDiGraph or "compact" interned-id columnar store
+    GRAPH_STORE_PATH = None  # e.g. "memory/session" for snapshot + write-ahead log persistence
+    SNAPSHOT_INTERVAL = 50  # WAL records between background snapshots (0 = only on save())
+    WAL_FSYNC = True  # fsync every WAL record and snapshot before acknowledging it
+    RDF_BASE_IRI = "http://dynagraph.local/"  # Namespace for exported node, predicate and metadata IRIs
+    EXPORT_CHUNK_LINES = 4096  # Lines buffered per write when streaming exports
+    ASYNC_INGESTION = True  # Ingest turns and consolidate on a background worker
+    INGESTION_WAIT_POLICY = "dependent"  # Before retrieval: "dependent" (query mentions pending text), "always" or "never"
+    INGESTION_WAIT_TIMEOUT = 30.0  # Max seconds a retrieval waits for pending ingestion (None = unbounded)
+    PREDICATE_CACHE_SIZE = 4096  # LRU bound for predicate -> ontology mappings
     
     # Multi-Scale Retriever parameters
     BEAM_WIDTH = 3  # Beam search width
     KAPPA = 0.8  # Degree preference in traversal
+    RETRIEVAL_ENGINE = "beam"  # "beam" search from each anchor or "ppr" local push personalized PageRank
+    PPR_ALPHA = 0.15  # Teleport probability back to the anchors
+    PPR_EPSILON = 1e-4  # Residual tolerance per unit of out-degree; bounds push work
+    PPR_TOP_K = 20  # Highest-ranked nodes whose connecting edges form the context
+    BEAM_ENGINE = "python"  # "python" reference search or "csr" array engine over a graph snapshot
     MAX_ANCHORS = 5  # Maximum anchor nodes to consider
     DELTA_RANGE = (1, 5)  # Min/max cognitive depth
+    CONTEXT_TOKEN_BUDGET = 1024  # Estimated tokens of linearized context per query (0 = unlimited)
+    CONTEXT_RANK_WEIGHTS = (0.5, 0.3, 0.2)  # Fact ranking: path rank, edge weight, recency
+    RETRIEVAL_CACHE_SIZE = 1024  # Cached contexts per graph (0 disables the retrieval cache)
+    RETRIEVAL_TIME_BUDGET = None  # Seconds per anytime retrieval (None = no deadline)
+    C_OP_MODE = "fixed"  # Cognitive-depth C_op: "fixed" (1.0) or "measured" per-level search cost
+    C_OP_UNIT = 1e-3  # Seconds per unit of C_op when measured (C_miss is in the same unit)
+    LEVEL_COST_SMOOTHING = 0.2  # EMA factor for measured per-level search cost
+    NER_MODEL = "en_core_web_sm"  # spaCy pipeline used for query entities
+    NER_BATCH_SIZE = 64  # Texts per nlp.pipe batch
     
     # Memory Consolidator parameters
     MERGE_SIMILARITY = 0.85  # Node merging threshold
+    MERGE_BLOCK_SIZE = 1024  # Rows per block in the similarity threshold search
     COMMUNITY_RESOLUTION = 1.0  # Louvain community detection resolution
+    COMMUNITY_DRIFT_THRESHOLD = 0.02  # Modularity drop that forces a full Louvain rerun
+    CENTRALITY_MODE = "exact"  # Pruning centrality: "exact" or "sampled"
+    CENTRALITY_SAMPLES = 256  # Pivot sources for sampled betweenness
+    
+    # Shared embedding service
+    EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+    EMBEDDING_CACHE_PATH = None  # e.g. "cache/embeddings" to persist vectors across runs
+    EMBEDDING_MEMORY_CACHE_SIZE = 100000  # Vectors kept (LRU) when EMBEDDING_CACHE_PATH is None
+    EMBEDDING_FLUSH_ROWS = 4096  # New vectors buffered before they are appended to the cache file
+    
+    # Triplet extraction
+    TRIPLET_BATCH_SIZE = 8  # Texts packed into one extraction request by extract_triplets_many
+    EXTRACTION_CACHE_PATH = None  # e.g. "cache/extractions.sqlite" to reuse LLM extractions across runs
+    EXTRACTION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Least recently used entries are evicted beyond this
+    EXTRACTION_CACHE_READ_ONLY = False  # Serve hits but never write (deterministic benchmark replays)
     
     # LLM Integration (Google AI Studio API)
     TRIPLET_MODEL = "gemini-2.5-flash"
     MAIN_MODEL = "gemini-2.5-flash"
     API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
     API_KEY = "VOTRE_CLE_AI_STUDIO_ICI"  # Remplacer par votre clé Google AI Studio
+    LLM_MAX_CONCURRENCY = 8  # Requests in flight per interface (sync / asyncio)
+    LLM_TIMEOUT = 60.0  # Seconds per request
+    LLM_MAX_RETRIES = 5  # Retries on rate limits, timeouts and 5xx errors
+    LLM_BACKOFF_BASE = 0.5  # Seconds; retry n waits up to base * 2**n (or Retry-After)
+    LLM_BACKOFF_MAX = 30.0  # Cap on a single backoff delay
+    LLM_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle pooled connection stays open
+    LLM_POOL_SHARD_SIZE = 8  # Connections per async pool; higher concurrency uses several pools
+    LLM_LATENCY_WINDOW = 1024  # Recent calls kept for latency percentiles
+    
+    # Multi-session service (service.py)
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8080
+    SERVICE_STORE_DIR = "memory/sessions"  # One snapshot + WAL store per session under this directory
+    SERVICE_MAX_ACTIVE_SESSIONS = 512  # Idle sessions beyond this are evicted to disk, least recent first
+    SERVICE_IDLE_TIMEOUT = 300.0  # Seconds without a turn before a session is evicted
+    SERVICE_WORKERS = 8  # Threads for retrieval and session loading; generation runs on the event loop
+    SERVICE_INGESTION_WORKERS = 4  # Threads for graph updates, kept apart so ingestion never delays retrieval
     
     # Evaluation
     LONG_RANGE_TEST_SIZE = 100
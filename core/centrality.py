@@ -0,0 +1,76 @@
+import time
+import networkx as nx
+import numpy as np
+from typing import Dict
+from config import DynaGraphConfig as config
+
+class CentralityEngine:
+    """Betweenness centrality for online pruning, computed exactly or from k sampled pivots"""
+
+    MODES = ("exact", "sampled")
+
+    def __init__(self, mode=config.CENTRALITY_MODE, samples=config.CENTRALITY_SAMPLES, seed=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown centrality mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.samples = samples
+        self.seed = seed
+        self.stats = {}
+
+    def compute(self, graph: nx.Graph) -> Dict:
+        start = time.perf_counter()
+        if self.mode == "exact":
+            scores = self._exact(graph)
+        else:
+            scores = self._sampled(graph, self.samples)
+
+        self.stats = {
+            "mode": self.mode,
+            "nodes": len(graph),
+            "time": time.perf_counter() - start
+        }
+        return scores
+
+    def _exact(self, graph: nx.Graph) -> Dict:
+        return nx.betweenness_centrality(graph)
+
+    def _sampled(self, graph: nx.Graph, k: int) -> Dict:
+        if k >= len(graph):
+            return self._exact(graph)
+        # Brandes from k random pivots, rescaled by n/k (unbiased estimate)
+        return nx.betweenness_centrality(graph, k=k, seed=self.seed)
+
+    def tradeoff_report(self, graph: nx.Graph, sample_sizes=(32, 128, 512),
+                        threshold=config.PRUNE_THRESHOLD) -> Dict[str, Dict]:
+        """Time and error of each mode against exact betweenness on the current graph.
+
+        prune_agreement is the Jaccard overlap of the below-threshold (prunable) node sets.
+        """
+        start = time.perf_counter()
+        exact = self._exact(graph)
+        report = {"exact": self._compare(exact, exact, time.perf_counter() - start, threshold)}
+
+        for k in sample_sizes:
+            if k >= len(graph):
+                continue
+            start = time.perf_counter()
+            estimate = self._sampled(graph, k)
+            report[f"sampled_k{k}"] = self._compare(exact, estimate, time.perf_counter() - start, threshold)
+
+        return report
+
+    @staticmethod
+    def _compare(exact: Dict, estimate: Dict, elapsed: float, threshold: float) -> Dict:
+        nodes = list(exact)
+        if not nodes:
+            return {"time": elapsed, "max_error": 0.0, "mean_error": 0.0, "prune_agreement": 1.0}
+        errors = np.abs(np.array([exact[n] for n in nodes]) - np.array([estimate.get(n, 0.0) for n in nodes]))
+        exact_prune = {n for n in nodes if exact[n] < threshold}
+        estimate_prune = {n for n in nodes if estimate.get(n, 0.0) < threshold}
+        union = exact_prune | estimate_prune
+        return {
+            "time": elapsed,
+            "max_error": float(errors.max()),
+            "mean_error": float(errors.mean()),
+            "prune_agreement": len(exact_prune & estimate_prune) / len(union) if union else 1.0
+        }
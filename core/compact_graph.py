@@ -0,0 +1,618 @@
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Hashable, Iterable, List
+import numpy as np
+import networkx as nx
+from utils.graph_utils import UnionFind
+
+_UNSET = np.iinfo(np.int32).min  # int column value for an attribute that was never set
+_NODE_COLUMNS = ('last_updated', 'created', 'centrality')
+
+def _deep_sizeof(obj, seen=None) -> int:
+    """Bytes held by obj and everything reachable through built-in containers"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, np.ndarray):
+        size += 0 if obj.base is None else obj.nbytes
+    return size
+
+def csr_index(keys: np.ndarray, edge_ids: np.ndarray, n_nodes: int):
+    """(indptr, edge ids grouped by key) with insertion order kept inside each group"""
+    order = edge_ids[np.argsort(keys, kind='stable')].astype(np.int32)
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_nodes), out=indptr[1:])
+    return indptr, order
+
+# graph.graph entries built for one graph object (versions, indexes, caches); a converted copy starts without them
+_DERIVED_STATE = ('versions', 'anchor_index', 'csr_snapshot', 'retrieval_cache', 'node_embeddings', 'degree_stats')
+
+def _copy_attributes(attributes: Dict) -> Dict:
+    return {key: value for key, value in attributes.items() if key not in _DERIVED_STATE}
+
+class CompactMultiDiGraph:
+    """Memory graph with interned node/predicate ids and columnar NumPy edges.
+
+    Edges live in parallel arrays (src, dst, predicate id, float32 weight,
+    int32 last_updated) indexed by edge id; node timestamps and centrality are
+    columns indexed by node id. Out/in adjacency is a CSR index over edge ids
+    plus a small overlay of edges added since the last rebuild, so ingesting a
+    turn never re-sorts the whole edge list.
+
+    The object answers the part of the nx.MultiDiGraph API that ingestion and
+    retrieval use (nodes, adjacency, degree, neighbors, predecessors, has_edge,
+    get_edge_data, add_node, add_edge, edges, graph) and consolidation (out_edges,
+    in_edges, remove_nodes_from). Edge keys are edge ids, and attribute dicts
+    handed out are copies: update an edge through add_edge. Structural NetworkX
+    algorithms run on topology(); the rest go through to_networkx().
+    """
+
+    def __init__(self):
+        self.graph = {}
+
+        self._names = []
+        self._ids = {}
+        self._predicates = []
+        self._predicate_ids = {}
+
+        self._node_alive = np.zeros(0, dtype=bool)
+        self._node_last = np.zeros(0, dtype=np.int32)
+        self._node_created = np.zeros(0, dtype=np.int32)
+        self._node_centrality = np.zeros(0, dtype=np.float32)
+        self._out_degree = np.zeros(0, dtype=np.int32)
+        self._in_degree = np.zeros(0, dtype=np.int32)
+        self._node_extra = {}  # node id -> other attributes
+        self._node_count = 0
+
+        self._src = np.zeros(0, dtype=np.int32)
+        self._dst = np.zeros(0, dtype=np.int32)
+        self._pred = np.zeros(0, dtype=np.int32)
+        self._weight = np.zeros(0, dtype=np.float32)
+        self._last = np.zeros(0, dtype=np.int32)
+        self._edge_alive = np.zeros(0, dtype=bool)
+        self._history = {}  # edge id -> archived_history, only when non-empty
+        self._edge_extra = {}  # edge id -> other attributes
+        self._edge_total = 0
+        self._edge_count = 0
+
+        # CSR over edge ids by source / target, plus edges added since it was built
+        self._out_indptr = np.zeros(1, dtype=np.int64)
+        self._out_edges = np.zeros(0, dtype=np.int32)
+        self._in_indptr = np.zeros(1, dtype=np.int64)
+        self._in_edges = np.zeros(0, dtype=np.int32)
+        self._out_overlay = {}
+        self._in_overlay = {}
+        self._overlay_size = 0
+
+    # ------------------------------------------------------------------ storage
+
+    @staticmethod
+    def _grow(array: np.ndarray, needed: int, fill) -> np.ndarray:
+        if needed <= len(array):
+            return array
+        grown = np.full(max(needed, 2 * len(array), 64), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _node_id(self, node: Hashable) -> int:
+        idx = self._ids.get(node)
+        if idx is None:
+            idx = self._ids[node] = len(self._names)
+            self._names.append(node)
+            needed = idx + 1
+            self._node_alive = self._grow(self._node_alive, needed, False)
+            self._node_last = self._grow(self._node_last, needed, _UNSET)
+            self._node_created = self._grow(self._node_created, needed, _UNSET)
+            self._node_centrality = self._grow(self._node_centrality, needed, np.nan)
+            self._out_degree = self._grow(self._out_degree, needed, 0)
+            self._in_degree = self._grow(self._in_degree, needed, 0)
+            self._node_alive[idx] = True
+            self._node_count += 1
+        return idx
+
+    def _predicate_id(self, predicate) -> int:
+        if predicate is None:
+            return -1
+        idx = self._predicate_ids.get(predicate)
+        if idx is None:
+            idx = self._predicate_ids[predicate] = len(self._predicates)
+            self._predicates.append(predicate)
+        return idx
+
+    def _set_node_attr(self, idx: int, key, value):
+        if key == 'last_updated' and isinstance(value, (int, np.integer)):
+            self._node_last[idx] = value
+        elif key == 'created' and isinstance(value, (int, np.integer)):
+            self._node_created[idx] = value
+        elif key == 'centrality' and isinstance(value, (int, float, np.number)):
+            self._node_centrality[idx] = value
+        else:
+            self._node_extra.setdefault(idx, {})[key] = value
+
+    def _node_attrs(self, idx: int) -> dict:
+        attrs = {}
+        if self._node_last[idx] != _UNSET:
+            attrs['last_updated'] = int(self._node_last[idx])
+        if self._node_created[idx] != _UNSET:
+            attrs['created'] = int(self._node_created[idx])
+        if not np.isnan(self._node_centrality[idx]):
+            attrs['centrality'] = float(self._node_centrality[idx])
+        attrs.update(self._node_extra.get(idx, {}))
+        return attrs
+
+    def _edge_attrs(self, eid: int) -> dict:
+        attrs = {}
+        if self._pred[eid] >= 0:
+            attrs['predicate'] = self._predicates[self._pred[eid]]
+        if not np.isnan(self._weight[eid]):
+            attrs['weight'] = float(self._weight[eid])
+        if self._last[eid] != _UNSET:
+            attrs['last_updated'] = int(self._last[eid])
+        attrs['archived_history'] = list(self._history.get(eid, []))
+        attrs.update(self._edge_extra.get(eid, {}))
+        return attrs
+
+    def _rebuild_index(self):
+        live = np.flatnonzero(self._edge_alive[:self._edge_total]).astype(np.int32)
+        self._out_indptr, self._out_edges = csr_index(self._src[live], live, len(self._names))
+        self._in_indptr, self._in_edges = csr_index(self._dst[live], live, len(self._names))
+        self._out_overlay, self._in_overlay, self._overlay_size = {}, {}, 0
+
+    def _incident(self, idx: int, outgoing: bool) -> np.ndarray:
+        """Live edge ids leaving (or entering) node idx, in insertion order"""
+        indptr, edges, overlay = ((self._out_indptr, self._out_edges, self._out_overlay) if outgoing
+                                  else (self._in_indptr, self._in_edges, self._in_overlay))
+        ids = edges[indptr[idx]:indptr[idx + 1]] if idx + 1 < len(indptr) else edges[:0]
+        recent = overlay.get(idx)
+        if recent:
+            ids = np.concatenate([ids, np.asarray(recent, dtype=np.int32)])
+        return ids[self._edge_alive[ids]]
+
+    def _edges_between(self, u, v) -> List[int]:
+        if u not in self._ids or v not in self._ids:
+            return []
+        ids = self._incident(self._ids[u], True)
+        return ids[self._dst[ids] == self._ids[v]].tolist()
+
+    def _require(self, node) -> int:
+        idx = self._ids.get(node)
+        if idx is None:
+            raise nx.NetworkXError(f"The node {node} is not in the graph.")
+        return idx
+
+    # ------------------------------------------------------------- graph API
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_multigraph(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return self._node_count
+
+    def __iter__(self):
+        return (self._names[i] for i in np.flatnonzero(self._node_alive[:len(self._names)]))
+
+    def __contains__(self, node) -> bool:
+        try:
+            return node in self._ids
+        except TypeError:
+            return False
+
+    def __getitem__(self, node) -> "_Adjacency":
+        return _Adjacency(self, self._require(node))
+
+    def number_of_nodes(self) -> int:
+        return self._node_count
+
+    def number_of_edges(self, u=None, v=None) -> int:
+        if u is None:
+            return self._edge_count
+        data = self.get_edge_data(u, v)
+        return 0 if data is None else len(data)
+
+    @property
+    def nodes(self) -> "_NodeView":
+        return _NodeView(self)
+
+    @property
+    def degree(self) -> "_DegreeView":
+        return _DegreeView(self)
+
+    def add_node(self, node, **attr):
+        idx = self._node_id(node)
+        for key, value in attr.items():
+            self._set_node_attr(idx, key, value)
+
+    def add_nodes_from(self, nodes: Iterable):
+        for node in nodes:
+            if isinstance(node, tuple) and len(node) == 2 and isinstance(node[1], dict):
+                self.add_node(node[0], **node[1])
+            else:
+                self.add_node(node)
+
+    def add_edge(self, u, v, key=None, **attr) -> int:
+        """Append a parallel edge u -> v (or update edge `key`) and return its key"""
+        if key is not None and key < self._edge_total and self._edge_alive[key]:
+            eid = key
+        else:
+            src, dst = self._node_id(u), self._node_id(v)
+            eid = self._edge_total
+            needed = eid + 1
+            self._src = self._grow(self._src, needed, 0)
+            self._dst = self._grow(self._dst, needed, 0)
+            self._pred = self._grow(self._pred, needed, -1)
+            self._weight = self._grow(self._weight, needed, np.nan)
+            self._last = self._grow(self._last, needed, _UNSET)
+            self._edge_alive = self._grow(self._edge_alive, needed, False)
+            self._src[eid], self._dst[eid] = src, dst
+            self._edge_alive[eid] = True
+            self._edge_total += 1
+            self._edge_count += 1
+            self._out_degree[src] += 1
+            self._in_degree[dst] += 1
+            self._out_overlay.setdefault(src, []).append(eid)
+            self._in_overlay.setdefault(dst, []).append(eid)
+            self._overlay_size += 1
+            if self._overlay_size > max(1024, self._edge_count // 8):
+                self._rebuild_index()
+
+        for name, value in attr.items():
+            if name == 'predicate':
+                self._pred[eid] = self._predicate_id(value)
+            elif name == 'weight' and isinstance(value, (int, float, np.number)):
+                self._weight[eid] = value
+            elif name == 'last_updated' and isinstance(value, (int, np.integer)):
+                self._last[eid] = value
+            elif name == 'archived_history':
+                if value:
+                    self._history[eid] = list(value)
+                else:
+                    self._history.pop(eid, None)
+            else:
+                self._edge_extra.setdefault(eid, {})[name] = value
+        return eid
+
+    def remove_edge(self, u, v, key=None):
+        data = self.get_edge_data(u, v)
+        if not data or (key is not None and key not in data):
+            raise nx.NetworkXError(f"The edge {u}-{v} is not in the graph.")
+        self._drop_edge(key if key is not None else max(data))
+
+    def _drop_edge(self, eid: int):
+        if not self._edge_alive[eid]:
+            return
+        self._edge_alive[eid] = False
+        self._out_degree[self._src[eid]] -= 1
+        self._in_degree[self._dst[eid]] -= 1
+        self._history.pop(eid, None)
+        self._edge_extra.pop(eid, None)
+        self._edge_count -= 1
+
+    def remove_node(self, node):
+        idx = self._require(node)
+        for eid in np.concatenate([self._incident(idx, True), self._incident(idx, False)]).tolist():
+            self._drop_edge(eid)
+        self._node_alive[idx] = False
+        self._node_extra.pop(idx, None)
+        del self._ids[node]
+        self._node_count -= 1
+
+    def remove_nodes_from(self, nodes: Iterable):
+        for node in list(nodes):
+            if node in self._ids:
+                self.remove_node(node)
+
+    def has_edge(self, u, v, key=None) -> bool:
+        edges = self._edges_between(u, v)
+        return bool(edges) and (key is None or key in edges)
+
+    def get_edge_data(self, u, v, key=None, default=None):
+        """{key: attrs} for every u -> v edge (attrs of `key` when given), like nx.MultiDiGraph"""
+        data = {eid: self._edge_attrs(eid) for eid in self._edges_between(u, v)}
+        if not data:
+            return default
+        if key is not None:
+            return data.get(key, default)
+        return data
+
+    def successors(self, node):
+        ids = self._incident(self._require(node), True)
+        return iter([self._names[d] for d in dict.fromkeys(self._dst[ids].tolist())])
+
+    neighbors = successors
+
+    def predecessors(self, node):
+        ids = self._incident(self._require(node), False)
+        return iter([self._names[s] for s in dict.fromkeys(self._src[ids].tolist())])
+
+    def out_edges(self, node, data=False):
+        """(node, v[, attrs]) for each edge leaving node, like nx.MultiDiGraph.out_edges(node)"""
+        ids = self._incident(self._require(node), True)
+        return [(node, self._names[d]) + ((self._edge_attrs(e),) if data else ())
+                for e, d in zip(ids.tolist(), self._dst[ids].tolist())]
+
+    def in_edges(self, node, data=False):
+        """(u, node[, attrs]) for each edge entering node, like nx.MultiDiGraph.in_edges(node)"""
+        ids = self._incident(self._require(node), False)
+        return [(self._names[s], node) + ((self._edge_attrs(e),) if data else ())
+                for e, s in zip(ids.tolist(), self._src[ids].tolist())]
+
+    @property
+    def edges(self) -> "_EdgeView":
+        return _EdgeView(self)
+
+    def _iter_edges(self, data=False, keys=False, default=None):
+        for eid in np.flatnonzero(self._edge_alive[:self._edge_total]):
+            eid = int(eid)
+            edge = (self._names[self._src[eid]], self._names[self._dst[eid]])
+            if keys:
+                edge += (eid,)
+            if data is True:
+                edge += (self._edge_attrs(eid),)
+            elif data:
+                edge += (self._edge_attrs(eid).get(data, default),)
+            yield edge
+
+    def number_weakly_connected_components(self) -> int:
+        components = UnionFind()
+        for u, v in self._iter_edges():
+            components.union(u, v)
+        return len({components.find(node) for node in self})
+
+    # ------------------------------------------------------------ conversion
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """Materialize an nx.MultiDiGraph with a copy of this graph's attributes (derived state is rebuilt)"""
+        graph = nx.MultiDiGraph()
+        graph.graph = _copy_attributes(self.graph)
+        graph.add_nodes_from((node, self._node_attrs(self._ids[node])) for node in self)
+        graph.add_edges_from((u, v, attrs) for u, v, attrs in self._iter_edges(data=True))
+        return graph
+
+    def topology(self) -> nx.DiGraph:
+        """Attribute-free nx.DiGraph of the live structure, for structural algorithms (betweenness).
+
+        Nodes keep only last_updated; parallel edges collapse to one, which
+        unweighted shortest paths do not distinguish.
+        """
+        graph = nx.DiGraph()
+        nodes = np.flatnonzero(self._node_alive[:len(self._names)]).tolist()
+        graph.add_nodes_from(
+            (self._names[i], {'last_updated': int(self._node_last[i])} if self._node_last[i] != _UNSET else {})
+            for i in nodes
+        )
+        edges = np.flatnonzero(self._edge_alive[:self._edge_total])
+        names = self._names
+        graph.add_edges_from(zip(map(names.__getitem__, self._src[edges].tolist()),
+                                 map(names.__getitem__, self._dst[edges].tolist())))
+        return graph
+
+    @classmethod
+    def from_networkx(cls, source: nx.Graph) -> "CompactMultiDiGraph":
+        graph = cls()
+        graph.graph = _copy_attributes(source.graph)
+        graph.add_nodes_from(source.nodes(data=True))
+        for u, v, attrs in source.edges(data=True):
+            graph.add_edge(u, v, **attrs)
+        graph._rebuild_index()
+        return graph
+
+    def columns(self) -> Dict:
+        """Live nodes and edges as renumbered, dense column copies (the snapshot layout)"""
+        nodes = np.flatnonzero(self._node_alive[:len(self._names)])
+        node_remap = np.full(len(self._names), -1, dtype=np.int32)
+        node_remap[nodes] = np.arange(len(nodes), dtype=np.int32)
+        edges = np.flatnonzero(self._edge_alive[:self._edge_total])
+        edge_remap = dict(zip(edges.tolist(), range(len(edges))))
+        return {
+            "names": [self._names[i] for i in nodes.tolist()],
+            "predicates": list(self._predicates),
+            "node_last": self._node_last[nodes],
+            "node_created": self._node_created[nodes],
+            "node_centrality": self._node_centrality[nodes],
+            "src": node_remap[self._src[edges]],
+            "dst": node_remap[self._dst[edges]],
+            "pred": self._pred[edges],
+            "weight": self._weight[edges],
+            "last": self._last[edges],
+            "history": {edge_remap[e]: list(h) for e, h in self._history.items() if e in edge_remap},
+            "edge_extra": {edge_remap[e]: dict(a) for e, a in self._edge_extra.items() if e in edge_remap},
+            "node_extra": {int(node_remap[i]): dict(a) for i, a in self._node_extra.items() if node_remap[i] >= 0}
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict, index: Dict = None) -> "CompactMultiDiGraph":
+        """Adopt columns() output without copying the arrays (memory-mapped arrays stay mapped).
+
+        `index` may carry prebuilt out_indptr/out_edges/in_indptr/in_edges; otherwise
+        the adjacency index is built here.
+        """
+        graph = cls()
+        graph._names = list(columns["names"])
+        graph._ids = {name: i for i, name in enumerate(graph._names)}
+        graph._predicates = list(columns["predicates"])
+        graph._predicate_ids = {predicate: i for i, predicate in enumerate(graph._predicates)}
+        n_nodes, n_edges = len(graph._names), len(columns["src"])
+
+        graph._node_alive = np.ones(n_nodes, dtype=bool)
+        graph._node_last = columns["node_last"]
+        graph._node_created = columns["node_created"]
+        graph._node_centrality = columns["node_centrality"]
+        graph._node_extra = {int(i): dict(a) for i, a in columns.get("node_extra", {}).items()}
+        graph._node_count = n_nodes
+
+        graph._src, graph._dst, graph._pred = columns["src"], columns["dst"], columns["pred"]
+        graph._weight, graph._last = columns["weight"], columns["last"]
+        graph._edge_alive = np.ones(n_edges, dtype=bool)
+        graph._history = {int(e): list(h) for e, h in columns.get("history", {}).items()}
+        graph._edge_extra = {int(e): dict(a) for e, a in columns.get("edge_extra", {}).items()}
+        graph._edge_total = graph._edge_count = n_edges
+        graph._out_degree = np.bincount(graph._src[:n_edges], minlength=n_nodes).astype(np.int32)
+        graph._in_degree = np.bincount(graph._dst[:n_edges], minlength=n_nodes).astype(np.int32)
+
+        if index is None:
+            graph._rebuild_index()
+        else:
+            graph._out_indptr, graph._out_edges = index["out_indptr"], index["out_edges"]
+            graph._in_indptr, graph._in_edges = index["in_indptr"], index["in_edges"]
+        return graph
+
+    def memory_report(self, compare: bool = True) -> Dict:
+        """Bytes per edge of this layout and, when compare is set, of the equivalent nx.MultiDiGraph"""
+        arrays = [self._node_alive, self._node_last, self._node_created, self._node_centrality,
+                  self._out_degree, self._in_degree, self._src, self._dst, self._pred, self._weight,
+                  self._last, self._edge_alive, self._out_indptr, self._out_edges, self._in_indptr, self._in_edges]
+        compact = sum(array.nbytes for array in arrays) + sum(
+            _deep_sizeof(obj) for obj in (self._names, self._ids, self._predicates, self._predicate_ids,
+                                          self._history, self._edge_extra, self._node_extra,
+                                          self._out_overlay, self._in_overlay)
+        )
+        edges = max(self._edge_count, 1)
+        report = {
+            "nodes": self._node_count,
+            "edges": self._edge_count,
+            "compact_bytes": compact,
+            "compact_bytes_per_edge": compact / edges
+        }
+        if compare:
+            graph = self.to_networkx()
+            seen = set()
+            reference = sum(_deep_sizeof(getattr(graph, name), seen) for name in ('_node', '_succ', '_pred'))
+            report.update({
+                "networkx_bytes": reference,
+                "networkx_bytes_per_edge": reference / edges,
+                "ratio": reference / max(compact, 1)
+            })
+        return report
+
+class _NodeAttrs(MutableMapping):
+    """Live attribute mapping of one node; writes go to the columns"""
+
+    def __init__(self, graph: CompactMultiDiGraph, idx: int):
+        self._graph = graph
+        self._idx = idx
+
+    def __getitem__(self, key):
+        return self._graph._node_attrs(self._idx)[key]
+
+    def __setitem__(self, key, value):
+        self._graph._set_node_attr(self._idx, key, value)
+
+    def __delitem__(self, key):
+        graph, idx = self._graph, self._idx
+        if key in _NODE_COLUMNS and key in graph._node_attrs(idx) and key not in graph._node_extra.get(idx, {}):
+            column = {'last_updated': graph._node_last, 'created': graph._node_created,
+                      'centrality': graph._node_centrality}[key]
+            column[idx] = np.nan if key == 'centrality' else _UNSET
+        else:
+            del graph._node_extra[idx][key]
+
+    def __iter__(self):
+        return iter(self._graph._node_attrs(self._idx))
+
+    def __len__(self):
+        return len(self._graph._node_attrs(self._idx))
+
+class _NodeView(Mapping):
+    def __init__(self, graph: CompactMultiDiGraph):
+        self._graph = graph
+
+    def __getitem__(self, node) -> _NodeAttrs:
+        return _NodeAttrs(self._graph, self._graph._ids[node])
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node):
+        return node in self._graph
+
+    def __call__(self, data=False, default=None):
+        if data is False:
+            return self
+        graph = self._graph
+        if data is True:
+            return [(node, graph._node_attrs(graph._ids[node])) for node in graph]
+        return [(node, graph._node_attrs(graph._ids[node]).get(data, default)) for node in graph]
+
+class _EdgeView:
+    """graph.edges: len() is the edge count; graph.edges(data=..., keys=..., default=...) iterates"""
+
+    def __init__(self, graph: CompactMultiDiGraph):
+        self._graph = graph
+
+    def __call__(self, data=False, keys=False, default=None):
+        return self._graph._iter_edges(data, keys, default)
+
+    def __iter__(self):
+        return self._graph._iter_edges()
+
+    def __len__(self):
+        return self._graph._edge_count
+
+class _DegreeView:
+    """graph.degree(node) -> in + out edge count; graph.degree() -> (node, degree) pairs"""
+
+    def __init__(self, graph: CompactMultiDiGraph):
+        self._graph = graph
+
+    def __getitem__(self, node) -> int:
+        idx = self._graph._require(node)
+        return int(self._graph._out_degree[idx] + self._graph._in_degree[idx])
+
+    def __call__(self, nbunch=None, weight=None):
+        if nbunch is not None and nbunch in self._graph:
+            return self[nbunch]
+        nodes = self._graph if nbunch is None else [n for n in nbunch if n in self._graph]
+        return ((node, self[node]) for node in nodes)
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return len(self._graph)
+
+class _Adjacency(Mapping):
+    """graph[u]: successor -> {edge key: attrs}, computed from u's edges on access"""
+
+    def __init__(self, graph: CompactMultiDiGraph, idx: int):
+        self._graph = graph
+        self._idx = idx
+
+    def _grouped(self) -> Dict:
+        graph = self._graph
+        ids = graph._incident(self._idx, True)
+        grouped = {}
+        for eid, dst in zip(ids.tolist(), graph._dst[ids].tolist()):
+            grouped.setdefault(graph._names[dst], {})[eid] = graph._edge_attrs(eid)
+        return grouped
+
+    def __getitem__(self, node) -> Dict:
+        graph = self._graph
+        data = {eid: graph._edge_attrs(eid) for eid in graph._edges_between(graph._names[self._idx], node)}
+        if not data:
+            raise KeyError(node)
+        return data
+
+    def __iter__(self):
+        return iter(self._grouped())
+
+    def __len__(self):
+        return len(self._grouped())
+
+    def items(self):
+        return self._grouped().items()
+
+    def values(self):
+        return self._grouped().values()
@@ -1,100 +1,181 @@
+import time
 import networkx as nx
-import community  # python-louvain
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from config import DynaGraphConfig as config
+from utils.embedding_utils import get_embedding_service, get_node_embedding_store
+from utils.graph_utils import group_pairs, merge_node_groups, to_weighted_undirected, get_graph_versions
+from utils.text_processing import get_anchor_index
+from .centrality import CentralityEngine
+from .communities import CommunityDetector
+from .compact_graph import CompactMultiDiGraph
 
 class MemoryConsolidator:
-    def __init__(self, merge_threshold=0.8):
+    def __init__(self, merge_threshold=0.8, block_size=config.MERGE_BLOCK_SIZE, centrality_mode=config.CENTRALITY_MODE):
         self.merge_threshold = merge_threshold
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.block_size = block_size
+        self.embedding_model = get_embedding_service()
+        self.centrality = CentralityEngine(mode=centrality_mode)
+        self.communities = CommunityDetector()
+        self.merge_stats = {}
+    
+    def _mark_changed(self, nodes):
+        """Tell the incremental community detector which nodes had edges rewired or removed"""
+        self.communities.mark_changed(nodes)
     
     def online_consolidation(self, graph: nx.Graph, current_turn: int) -> nx.Graph:
         """Perform online pruning and merging"""
         # Prune low-centrality nodes
-        centrality = nx.betweenness_centrality(graph)
+        structure = graph.topology() if isinstance(graph, CompactMultiDiGraph) else graph
+        centrality = self.centrality.compute(structure)
         nodes_to_remove = [
             node for node in graph.nodes 
             if centrality.get(node, 0) < config.PRUNE_THRESHOLD
             and current_turn - graph.nodes[node].get('last_updated', current_turn) > 10
         ]
+        touched = set(nodes_to_remove)
+        for node in nodes_to_remove:
+            touched.update(nx.all_neighbors(graph, node))
+        self._mark_changed(touched - set(nodes_to_remove))
+        if nodes_to_remove:
+            get_graph_versions(graph).touch(touched)
+        get_anchor_index(graph).remove(nodes_to_remove)
         graph.remove_nodes_from(nodes_to_remove)
         
         # Merge similar nodes
         self._merge_similar_nodes(graph)
         return graph
     
-    def _merge_similar_nodes(self, graph: nx.Graph):
+    def _merge_similar_nodes(self, graph: nx.Graph) -> dict:
         """Merge nodes with high semantic similarity"""
-        nodes = list(graph.nodes)
-        embeddings = self.embedding_model.encode(nodes)
+        store = get_node_embedding_store(graph)
+        store.service = self.embedding_model
+        encoded = store.sync(graph)
+        
+        start = time.perf_counter()
+        to_merge = self._find_similar_pairs(store.names, store.matrix)
+        search_time = time.perf_counter() - start
         
-        # Create similarity matrix
-        similarity_matrix = np.dot(embeddings, embeddings.T)
-        np.fill_diagonal(similarity_matrix, 0)  # Ignore self-similarity
+        # Merge transitive groups in one in-place pass
+        start = time.perf_counter()
+        groups = group_pairs(to_merge)
+        anchor_index = get_anchor_index(graph)
+        touched = set()
+        for group in groups:
+            for node in group:
+                touched.add(node)
+                touched.update(nx.all_neighbors(graph, node))
+        mapping = merge_node_groups(graph, groups)
+        store.remove(mapping)
+        anchor_index.remove(mapping)
+        self._mark_changed(mapping.values())
+        if mapping:
+            get_graph_versions(graph).touch(touched)
+        merge_time = time.perf_counter() - start
         
-        # Find pairs to merge
-        to_merge = []
-        for i in range(len(nodes)):
-            for j in range(i+1, len(nodes)):
-                if similarity_matrix[i, j] > self.merge_threshold:
-                    to_merge.append((nodes[i], nodes[j]))
+        self.merge_stats = {
+            "nodes": len(store),
+            "encoded": encoded,
+            "candidate_pairs": len(to_merge),
+            "merged_groups": len(groups),
+            "merged_nodes": len(mapping),
+            "search_time": search_time,
+            "merge_time": merge_time
+        }
+        return self.merge_stats
+    
+    def _find_similar_pairs(self, names: list, embeddings: np.ndarray) -> list:
+        """Return (i < j) name pairs above the merge threshold, in row-major order.
         
-        # Merge nodes
-        for node1, node2 in to_merge:
-            if node1 in graph and node2 in graph:
-                # Merge node2 into node1
-                nx.contracted_nodes(graph, node1, node2, self_loops=False)
+        Similarities are computed one block of rows at a time against the upper
+        triangle only, so memory stays O(block_size * n) instead of O(n^2).
+        """
+        n = len(names)
+        pairs = []
+        for row_start in range(0, n, self.block_size):
+            block = embeddings[row_start:row_start + self.block_size] @ embeddings[row_start:].T
+            rows, cols = np.nonzero(block > self.merge_threshold)
+            upper = cols > rows
+            for i, j in zip(rows[upper] + row_start, cols[upper] + row_start):
+                pairs.append((names[i], names[j]))
+        return pairs
     
     def offline_consolidation(self, graph: nx.Graph) -> nx.Graph:
         """Perform community-based graph abstraction"""
         if len(graph.nodes) < 10:
             return graph  # No need for abstraction on small graphs
             
-        # Convert to undirected for community detection
-        undirected = graph.to_undirected()
-        partition = community.best_partition(undirected, resolution=config.COMMUNITY_RESOLUTION)
+        # Convert to a simple weighted undirected graph for community detection;
+        # python-louvain mixes per-edge and per-neighbour weights on multigraphs
+        undirected = to_weighted_undirected(graph)
+        # Warm-started from the previous run's partition
+        partition = self.communities.detect(graph, undirected)
+        
+        return self._abstract_communities(graph, partition)
+    
+    def _abstract_communities(self, graph: nx.Graph, partition: dict, min_weight: float = 0.3) -> nx.DiGraph:
+        """Build the community super-graph in one pass over the edge list.
+        
+        Each community is represented by its member with the highest internal degree
+        (the argmax of degree centrality within the community). An inter-community
+        edge carries the mean weight over the connected node pairs between the two
+        communities and is kept above `min_weight`. Parallel edges of a multigraph
+        count as one node pair with their mean weight.
+        """
+        nodes = list(partition)
+        index = {node: i for i, node in enumerate(nodes)}
+        node_comm = np.fromiter((partition[node] for node in nodes), dtype=np.int64, count=len(nodes))
+        
+        # Collapse parallel edges to one weight per (u, v) pair
+        pair_weights = {}
+        for u, v, weight in graph.edges(data='weight', default=0):
+            if u in index and v in index:
+                total, count = pair_weights.get((u, v), (0.0, 0))
+                pair_weights[(u, v)] = (total + weight, count + 1)
+        
+        if pair_weights:
+            src = np.fromiter((index[u] for u, _ in pair_weights), dtype=np.int64, count=len(pair_weights))
+            dst = np.fromiter((index[v] for _, v in pair_weights), dtype=np.int64, count=len(pair_weights))
+            weights = np.fromiter((total / count for total, count in pair_weights.values()), dtype=np.float64, count=len(pair_weights))
+            # Edge multiplicity, so internal degree matches the multigraph degree
+            multiplicity = np.fromiter((count for _, count in pair_weights.values()), dtype=np.float64, count=len(pair_weights))
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+            weights = multiplicity = np.zeros(0, dtype=np.float64)
+        
+        src_comm, dst_comm = node_comm[src], node_comm[dst]
+        internal = src_comm == dst_comm
+        
+        # Representative: highest internal degree, ties to the first member
+        internal_degree = (np.bincount(src[internal], weights=multiplicity[internal], minlength=len(nodes))
+                           + np.bincount(dst[internal], weights=multiplicity[internal], minlength=len(nodes)))
+        order = np.lexsort((np.arange(len(nodes)), -internal_degree, node_comm))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = node_comm[order[1:]] != node_comm[order[:-1]]
+        super_nodes = {int(node_comm[i]): nodes[i] for i in order[first]}
         
-        # Create super nodes
         communities = {}
-        for node, comm_id in partition.items():
-            communities.setdefault(comm_id, []).append(node)
+        for node in nodes:
+            communities.setdefault(partition[node], []).append(node)
         
         super_graph = nx.DiGraph()
-        super_nodes = {}
-        
-        # Create super nodes (representative: highest centrality node)
-        for comm_id, nodes in communities.items():
-            subgraph = graph.subgraph(nodes)
-            if not subgraph.nodes:
-                continue
-                
-            centrality = nx.degree_centrality(subgraph)
-            representative = max(centrality, key=centrality.get)
-            super_nodes[comm_id] = representative
-            super_graph.add_node(representative, community=nodes)
+        for comm_id, members in communities.items():
+            super_graph.add_node(super_nodes[comm_id], community=members)
         
-        # Add edges between communities
-        for comm1 in communities:
-            for comm2 in communities:
-                if comm1 == comm2:
-                    continue
-                    
-                # Calculate aggregate weight
-                weights = []
-                for node1 in communities[comm1]:
-                    for node2 in communities[comm2]:
-                        if graph.has_edge(node1, node2):
-                            weights.append(graph[node1][node2].get('weight', 0))
-                
-                if weights:
-                    avg_weight = sum(weights) / len(weights)
-                    if avg_weight > 0.3:  # Minimum connection threshold
-                        super_graph.add_edge(
-                            super_nodes[comm1], 
-                            super_nodes[comm2],
-                            weight=avg_weight,
-                            type="inter_community"
-                        )
+        # Mean weight per ordered community pair
+        external = ~internal
+        if external.any():
+            keys = np.stack([src_comm[external], dst_comm[external]], axis=1)
+            pairs, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            sums = np.bincount(inverse, weights=weights[external], minlength=len(pairs))
+            counts = np.bincount(inverse, minlength=len(pairs))
+            means = sums / counts
+            for (comm1, comm2), avg_weight in zip(pairs[means > min_weight], means[means > min_weight]):
+                super_graph.add_edge(
+                    super_nodes[int(comm1)],
+                    super_nodes[int(comm2)],
+                    weight=float(avg_weight),
+                    type="inter_community"
+                )
         
-        return super_graph
\ No newline at end of file
+        return super_graph
@@ -1,19 +1,58 @@
 import re
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import openai
 from config import DynaGraphConfig as config
+from utils.embedding_utils import get_embedding_service
+from utils.text_processing import get_anchor_index
+from utils.graph_utils import get_graph_versions
+from utils.llm_client import get_llm_client
+from .extraction_cache import get_extraction_cache
+
+# Each prompt is part of the cache key of the results it produced: editing it invalidates them
+TRIPLET_PROMPT = """
+        Extract key facts as a JSON list of [Subject, Predicate, Object] triplets.
+        Focus on entities, their attributes, and relationships.
+        
+        Text: "{text}"
+        
+        Output format: {{"triplets": [["s1", "p1", "o1"], ["s2", "p2", "o2"]]}}
+        """
+
+# Several texts per request; each item's triplets come back under its id
+TRIPLET_BATCH_PROMPT = """
+        Extract key facts from each numbered text below as a JSON list of [Subject, Predicate, Object] triplets.
+        Focus on entities, their attributes, and relationships. Treat every text independently.
+        
+        Texts:
+        {items}
+        
+        Output format: {{"results": {{"1": [["s1", "p1", "o1"]], "2": [["s2", "p2", "o2"]]}}}}
+        Return one entry for every id, using an empty list when a text has no facts.
+        """
 
 class TemporalKnowledgeConstructor:
-    def __init__(self, alpha=0.7, gamma=0.1):
+    def __init__(self, alpha=0.7, gamma=0.1, predicate_cache_size=config.PREDICATE_CACHE_SIZE):
         self.alpha = alpha
         self.gamma = gamma
-        self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.semantic_model = get_embedding_service()
+        self.llm = get_llm_client()
+        self.extraction_cache = get_extraction_cache()
         self.core_concepts = self._load_core_concepts()
         
+        # Ontology embeddings are computed once and refreshed only when core_concepts changes
+        self._ontology_key = None
+        self._ontology_matrix = None
+        
+        # Bounded LRU cache: predicate -> (mapped predicate, score)
+        self.predicate_cache_size = predicate_cache_size
+        self._predicate_cache = OrderedDict()
+        # One constructor may serve many graphs from several threads (see service.py)
+        self._predicate_lock = threading.Lock()
+        
     def _load_core_concepts(self):
         # Formal Predicate Ontology (Def 1)
         return [
@@ -23,66 +62,204 @@ class TemporalKnowledgeConstructor:
             "temporally-precedes", "interacts-with"
         ]
     
+    def _cache_key(self, text: str, template: str) -> str:
+        return self.extraction_cache.key(config.TRIPLET_MODEL, template, text)
+    
+    def _cached(self, text: str):
+        # Single and batched prompts answer the same question: a result from either will do
+        return self.extraction_cache.lookup([self._cache_key(text, template)
+                                             for template in (TRIPLET_PROMPT, TRIPLET_BATCH_PROMPT)])
+    
     def extract_triplets(self, text: str) -> list:
-        prompt = f"""
-        Extract key facts as a JSON list of [Subject, Predicate, Object] triplets.
-        Focus on entities, their attributes, and relationships.
+        cache = self.extraction_cache
+        if cache is not None:
+            cached = self._cached(text)
+            if cached is not None:
+                return cached
         
-        Text: "{text}"
+        triplets = self._extract_uncached(text)
+        if triplets is None:
+            # Malformed reply: extract nothing this time, but let the next call retry
+            return []
         
-        Output format: {{"triplets": [["s1", "p1", "o1"], ["s2", "p2", "o2"]]}}
+        if cache is not None:
+            cache.put(self._cache_key(text, TRIPLET_PROMPT), triplets)
+        return triplets
+    
+    def extract_triplets_many(self, texts: list, batch_size: int = config.TRIPLET_BATCH_SIZE) -> list:
+        """Extract triplets for several texts, packing up to batch_size texts per LLM call.
+        
+        Returns one triplet list per input text, in order. Repeated texts are sent once;
+        with the extraction cache enabled, cached texts are not sent at all. Texts whose
+        reply could not be parsed get no triplets and are not cached.
         """
+        results = {}
+        misses = []
+        cache = self.extraction_cache
+        for text in dict.fromkeys(texts):
+            cached = self._cached(text) if cache is not None else None
+            if cached is None:
+                misses.append(text)
+            else:
+                results[text] = cached
+        
+        batch_size = max(1, batch_size)
+        batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        # Batches are independent requests; the shared client bounds how many are in flight
+        with ThreadPoolExecutor(max_workers=max(1, min(len(batches), self.llm.max_concurrency))) as pool:
+            for batch_results in pool.map(self._extract_batch, batches):
+                results.update(batch_results)
         
-        client = openai.OpenAI(base_url=config.API_BASE_URL, api_key=config.API_KEY)
-        response = client.chat.completions.create(
+        for text in misses:
+            triplets, template = results[text]
+            if triplets is None:
+                triplets = []
+            elif cache is not None:
+                cache.put(self._cache_key(text, template), triplets)
+            results[text] = triplets
+        return [results[text] for text in texts]
+    
+    def _extract_batch(self, batch: list) -> dict:
+        """Map each text of the batch to (triplets or None if unparsable, prompt template used),
+        splitting the batch when the reply is malformed"""
+        if len(batch) == 1:
+            return {batch[0]: (self._extract_uncached(batch[0]), TRIPLET_PROMPT)}
+        
+        items = "\n        ".join(f"[{i}] {json.dumps(text)}" for i, text in enumerate(batch, 1))
+        response = self.llm.complete(
             model=config.TRIPLET_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+            messages=[{"role": "user", "content": TRIPLET_BATCH_PROMPT.format(items=items)}],
             temperature=0.1
         )
+        keyed = self._parse_keyed_triplets(response.choices[0].message.content if response.choices else None)
+        
+        results, missing = {}, []
+        for i, text in enumerate(batch, 1):
+            triplets = keyed.get(str(i))
+            if isinstance(triplets, list) and all(isinstance(t, list) for t in triplets):
+                results[text] = (triplets, TRIPLET_BATCH_PROMPT)
+            else:
+                missing.append(text)
         
+        if len(missing) == len(batch):
+            # Nothing usable: retry each half on its own
+            half = len(batch) // 2
+            results.update(self._extract_batch(batch[:half]))
+            results.update(self._extract_batch(batch[half:]))
+        elif missing:
+            results.update(self._extract_batch(missing))
+        return results
+    
+    def _extract_uncached(self, text: str) -> list:
+        response = self.llm.complete(
+            model=config.TRIPLET_MODEL,
+            messages=[{"role": "user", "content": TRIPLET_PROMPT.format(text=text)}],
+            temperature=0.1
+        )
+        return self._parse_triplets(response.choices[0].message.content if response.choices else None)
+    
+    @staticmethod
+    def _parse_keyed_triplets(content: str) -> dict:
+        try:
+            match = re.search(r'\{.*\}', content, re.DOTALL)
+            if match:
+                result = json.loads(match.group(0).strip()).get("results", {})
+                return result if isinstance(result, dict) else {}
+            return {}
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def _parse_triplets(content: str) -> list:
+        """Triplets of a single-text reply, or None if the reply is malformed"""
         try:
-            content = response.choices[0].message.content
             # Make sure we reliably extract JSON if model prefixes strings
             match = re.search(r'\{.*\}', content, re.DOTALL)
             if match:
-                result = json.loads(match.group(0).strip())
-                return result.get("triplets", [])
-            return []
+                triplets = json.loads(match.group(0).strip()).get("triplets")
+                if isinstance(triplets, list) and all(isinstance(t, list) for t in triplets):
+                    return triplets
+            return None
         except Exception:
-            return []
+            return None
+    
+    def _get_ontology_matrix(self) -> np.ndarray:
+        """Return L2-normalized ontology embeddings, re-encoding only if the ontology changed"""
+        key = tuple(self.core_concepts)
+        if self._ontology_matrix is None or key != self._ontology_key:
+            core_embeds = np.asarray(self.semantic_model.encode(list(key)), dtype=np.float32)
+            self._ontology_matrix = self._normalize_rows(core_embeds)
+            self._ontology_key = key
+            # Cached mappings refer to the previous ontology
+            self._predicate_cache.clear()
+        return self._ontology_matrix
+    
+    @staticmethod
+    def _normalize_rows(embeds: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(embeds, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeds / norms
     
     def map_predicate_to_ontology(self, predicate: str) -> tuple[str, float]:
+        return self.map_predicates_to_ontology([predicate])[0]
+    
+    def map_predicates_to_ontology(self, predicates: list) -> list:
+        """Map a batch of predicates with one encode call and one matrix product"""
         if not self.core_concepts:
-            return predicate, 0.5
+            return [(predicate, 0.5) for predicate in predicates]
+        with self._predicate_lock:
+            return self._map_predicates(predicates)
+    
+    def _map_predicates(self, predicates: list) -> list:
+        core_matrix = self._get_ontology_matrix()
+        cache = self._predicate_cache
         
-        pred_embed = self.semantic_model.encode([predicate])
-        core_embeds = self.semantic_model.encode(self.core_concepts)
-        similarities = cosine_similarity(pred_embed, core_embeds)[0]
-        max_idx = np.argmax(similarities)
+        misses = list(dict.fromkeys(p for p in predicates if p not in cache))
         
-        # If similarity is too low, keep original but assign low relevance
-        if similarities[max_idx] < 0.4:
-            return predicate, similarities[max_idx]
+        if misses:
+            pred_embeds = self._normalize_rows(
+                np.asarray(self.semantic_model.encode(misses), dtype=np.float32)
+            )
+            similarities = pred_embeds @ core_matrix.T
+            best_indices = np.argmax(similarities, axis=1)
             
-        return self.core_concepts[max_idx], similarities[max_idx]
+            for row, predicate in enumerate(misses):
+                max_idx = best_indices[row]
+                score = float(similarities[row, max_idx])
+                # If similarity is too low, keep original but assign low relevance
+                mapped = predicate if score < 0.4 else self.core_concepts[max_idx]
+                cache[predicate] = (mapped, score)
+        
+        results = []
+        for predicate in predicates:
+            cache.move_to_end(predicate)
+            results.append(cache[predicate])
+        
+        while len(cache) > self.predicate_cache_size:
+            cache.popitem(last=False)
+        
+        return results
     
     def update_graph(self, graph: nx.DiGraph, text: str, turn: int) -> nx.DiGraph:
-        triplets = self.extract_triplets(text)
+        return self.apply_triplets(graph, self.extract_triplets(text), turn)
+    
+    def apply_triplets(self, graph: nx.DiGraph, triplets: list, turn: int) -> nx.DiGraph:
+        """Write already-extracted triplets into the graph (no LLM call)"""
+        triplets = [t for t in triplets if len(t) == 3]
         
-        for triplet in triplets:
-            if len(triplet) != 3:
-                continue
-                
-            s, p, o = triplet
-            
+        # Map every predicate of the turn to the formal ontology in one batch
+        mappings = self.map_predicates_to_ontology([p for _, p, _ in triplets])
+        
+        anchor_index = get_anchor_index(graph)
+        
+        for (s, p, o), (mapped_p, S_p) in zip(triplets, mappings):
             # Create or update nodes
             if s not in graph.nodes:
                 graph.add_node(s, last_updated=turn, created=turn, centrality=0.0)
+                anchor_index.add([s])
             if o not in graph.nodes:
                 graph.add_node(o, last_updated=turn, created=turn, centrality=0.0)
-                
-            # Map to formal ontology
-            mapped_p, S_p = self.map_predicate_to_ontology(p)
+                anchor_index.add([o])
             
             # Conflict Resolution: Temporal Precedence with Archiving
             last_update = turn
@@ -111,4 +288,7 @@ class TemporalKnowledgeConstructor:
             graph.nodes[s]['last_updated'] = turn
             graph.nodes[o]['last_updated'] = turn
         
+        if triplets:
+            get_graph_versions(graph).touch(n for s, _, o in triplets for n in (s, o))
+        
         return graph
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+import json
+import atexit
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from config import DynaGraphConfig as config
+
+class ExtractionCache:
+    """Persistent triplet-extraction results keyed by sha256(model, prompt template, text).
+
+    Entries live in one SQLite table with their serialized size and a use counter.
+    Hits only bump the counter in memory; the new values are written with the next
+    put, every `touch_batch` hits, and by flush() (at exit and on close). When the
+    total size exceeds `max_bytes`, least recently used entries are deleted down to
+    90% of the bound. In read-only mode the database is opened read-only and never
+    written, so benchmark replays see a fixed set of answers.
+    """
+
+    def __init__(self, path: str = config.EXTRACTION_CACHE_PATH,
+                 max_bytes: int = config.EXTRACTION_CACHE_MAX_BYTES,
+                 read_only: bool = config.EXTRACTION_CACHE_READ_ONLY, touch_batch: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self.touch_batch = touch_batch
+        self._lock = threading.Lock()
+        # key -> use counter of hits not yet written
+        self._touched = {}
+
+        if read_only:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, triplets TEXT NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS extractions_used ON extractions (used)")
+            self._db.commit()
+
+        self.total_bytes, self._clock = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(used), 0) FROM extractions"
+        ).fetchone()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, template: str, text: str) -> str:
+        return hashlib.sha256("\0".join((model, template, text)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List]:
+        return self.lookup([key])
+
+    def lookup(self, keys: List[str]) -> Optional[List]:
+        """Entry of the first key present (one hit or one miss, however many keys)"""
+        with self._lock:
+            rows = dict(self._db.execute(
+                f"SELECT key, triplets FROM extractions WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall())
+            key = next((key for key in keys if key in rows), None)
+            if key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.read_only:
+                self._clock += 1
+                self._touched[key] = self._clock
+                if len(self._touched) >= self.touch_batch:
+                    self._write_touches()
+                    self._db.commit()
+            return json.loads(rows[key])
+
+    def _write_touches(self):
+        self._db.executemany("UPDATE extractions SET used = ? WHERE key = ?",
+                             [(used, key) for key, used in self._touched.items()])
+        self._touched.clear()
+
+    def put(self, key: str, triplets: List):
+        if self.read_only:
+            return
+        value = json.dumps(triplets)
+        size = len(key) + len(value)
+        with self._lock:
+            # Pending hits go first, so eviction sees current use order
+            self._write_touches()
+            self._touched.pop(key, None)
+            previous = self._db.execute("SELECT size FROM extractions WHERE key = ?", (key,)).fetchone()
+            self._clock += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO extractions (key, triplets, size, used) VALUES (?, ?, ?, ?)",
+                (key, value, size, self._clock)
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(0.9 * self.max_bytes))
+            self._db.commit()
+
+    def _evict(self, target: int):
+        cursor = self._db.execute("SELECT key, size FROM extractions ORDER BY used")
+        evicted = []
+        for key, size in cursor:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        cursor.close()
+        self._db.executemany("DELETE FROM extractions WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "read_only": self.read_only
+        }
+
+    def flush(self):
+        """Write the use counters of hits since the last write"""
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+                self._db.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the process-wide extraction cache, or None when EXTRACTION_CACHE_PATH is unset"""
+    global _cache
+    if _cache is None and config.EXTRACTION_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache(config.EXTRACTION_CACHE_PATH, config.EXTRACTION_CACHE_MAX_BYTES,
+                                         config.EXTRACTION_CACHE_READ_ONLY)
+                atexit.register(_cache.flush)
+    return _cache
@@ -1,31 +1,90 @@
+import io
+import threading
 import networkx as nx
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, IO
+from config import DynaGraphConfig as config
+
+from .compact_graph import CompactMultiDiGraph
+from .persistence import GraphStore
+from .rdf_io import write_ntriples, write_edge_csv, write_node_csv, read_ntriples, read_edge_csv
 
 class TemporalKnowledgeGraph:
-    def __init__(self):
-        self.graph = nx.MultiDiGraph()
+    def __init__(self, backend=config.GRAPH_BACKEND, store_path=None):
+        if backend not in ("networkx", "compact"):
+            raise ValueError(f"Unknown graph backend '{backend}', expected 'networkx' or 'compact'")
+        self.backend = backend
+        self.graph = nx.MultiDiGraph() if backend == "networkx" else CompactMultiDiGraph()
         self.turn_counter = 0
+        # Held while the graph is written or read across threads; extraction runs outside it
+        self.lock = threading.RLock()
+        
+        # Snapshot + write-ahead log under store_path; an existing store is recovered here
+        self.store = None
+        if store_path:
+            self.store = GraphStore(store_path)
+            self.store.recover(self)
+    
+    def _persist(self):
+        if self.store is not None:
+            self.store.log_changes(self)
+    
+    def save(self, wait: bool = True) -> None:
+        """Write a snapshot now (in the background unless wait is set)"""
+        if self.store is None:
+            raise RuntimeError("TemporalKnowledgeGraph has no store_path to save to")
+        with self.lock:
+            self.store.snapshot(self, wait=wait)
+    
+    def close(self) -> None:
+        if self.store is not None:
+            with self.lock:
+                self.store.close()
     
     def update(self, text: str, constructor) -> None:
         """Update the graph with new information from text"""
-        self.turn_counter += 1
-        self.graph = constructor.update_graph(
-            self.graph, 
-            text, 
-            self.turn_counter
-        )
+        triplets = constructor.extract_triplets(text)
+        with self.lock:
+            self.turn_counter += 1
+            self.graph = constructor.apply_triplets(
+                self.graph, 
+                triplets, 
+                self.turn_counter
+            )
+            self._persist()
+    
+    def update_many(self, texts: list, constructor, batch_size: int = config.TRIPLET_BATCH_SIZE) -> None:
+        """Apply several texts as consecutive turns, extracting their triplets in batched LLM calls"""
+        batch_triplets = constructor.extract_triplets_many(texts, batch_size)
+        with self.lock:
+            for triplets in batch_triplets:
+                self.turn_counter += 1
+                self.graph = constructor.apply_triplets(
+                    self.graph, 
+                    triplets, 
+                    self.turn_counter
+                )
+            self._persist()
+    
+    def as_networkx(self) -> nx.MultiDiGraph:
+        """The graph as an nx.MultiDiGraph (materialized from the compact backend)"""
+        if isinstance(self.graph, CompactMultiDiGraph):
+            return self.graph.to_networkx()
+        return self.graph
     
     def consolidate(self, consolidator) -> None:
         """Apply memory consolidation to the graph"""
-        self.graph = consolidator.online_consolidation(
-            self.graph, 
-            self.turn_counter
-        )
+        with self.lock:
+            # In place on either backend; the compact graph only hands centrality its topology()
+            self.graph = consolidator.online_consolidation(
+                self.graph, 
+                self.turn_counter
+            )
+            self._persist()
     
     def offline_consolidation(self, consolidator) -> nx.Graph:
         """Perform offline abstraction and return abstracted graph"""
-        return consolidator.offline_consolidation(self.graph)
+        return consolidator.offline_consolidation(self.as_networkx())
     
     def get_graph_metrics(self) -> Dict[str, Any]:
         """Return metrics about the current graph state"""
@@ -34,13 +93,55 @@ class TemporalKnowledgeGraph:
             "edges": len(self.graph.edges),
             "density": nx.density(self.graph),
             "avg_degree": sum(dict(self.graph.degree()).values()) / len(self.graph.nodes),
-            "connected_components": nx.number_weakly_connected_components(self.graph),
+            "connected_components": (self.graph.number_weakly_connected_components()
+                                     if isinstance(self.graph, CompactMultiDiGraph)
+                                     else nx.number_weakly_connected_components(self.graph)),
             "turn": self.turn_counter
         }
     
-    def export_rdf(self) -> str:
-        """Export graph to RDF-like format"""
-        rdf_lines = []
-        for u, v, data in self.graph.edges(data=True):
-            rdf_lines.append(f"<{u}> <{data.get('predicate', 'related_to')}> <{v}> .")
-        return "\n".join(rdf_lines)
\ No newline at end of file
+    def memory_report(self) -> Dict[str, Any]:
+        """Bytes per edge of the compact layout versus the equivalent nx.MultiDiGraph"""
+        graph = self.graph if isinstance(self.graph, CompactMultiDiGraph) else CompactMultiDiGraph.from_networkx(self.graph)
+        return graph.memory_report()
+    
+    def export_rdf(self, handle: IO[str] = None, metadata: bool = False):
+        """Export the graph as N-Triples.
+
+        Streams to handle when given and returns line/edge counts; otherwise returns
+        the document as a string. metadata reifies each edge with its weight,
+        last_updated and archived_history so import_rdf restores the full memory.
+        """
+        with self.lock:
+            if handle is not None:
+                return write_ntriples(self.graph, handle, metadata)
+            buffer = io.StringIO()
+            write_ntriples(self.graph, buffer, metadata)
+            return buffer.getvalue()
+    
+    def export_edges(self, handle: IO[str], nodes: IO[str] = None) -> int:
+        """Stream a compact CSV edge dump (one row per edge with weight, timestamp and history).
+
+        The edge file leaves out isolated nodes and node timestamps; pass `nodes`
+        to also write them as a node CSV for import_edges.
+        """
+        with self.lock:
+            if nodes is not None:
+                write_node_csv(self.graph, nodes)
+            return write_edge_csv(self.graph, handle)
+    
+    def import_rdf(self, handle: IO[str]) -> None:
+        """Replace the graph with an export_rdf document, loaded in one bulk pass"""
+        self._replace_graph(read_ntriples(handle, self.backend))
+    
+    def import_edges(self, handle: IO[str], nodes: IO[str] = None) -> None:
+        """Replace the graph with an export_edges CSV dump (and its node CSV, when given)"""
+        self._replace_graph(read_edge_csv(handle, self.backend, nodes))
+    
+    def _replace_graph(self, graph) -> None:
+        turns = [t for _, _, t in graph.edges(data='last_updated') if t is not None]
+        with self.lock:
+            self.graph = graph
+            self.turn_counter = max(turns, default=self.turn_counter)
+            if self.store is not None:
+                # The WAL only holds deltas; a bulk replacement is captured as a snapshot
+                self.store.snapshot(self, wait=True)
\ No newline at end of file
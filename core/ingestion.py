@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+class IngestionWorker:
+    """Ordered background queue for one conversation's graph updates.
+
+    Jobs run one at a time on a daemon thread in submission order, so turn t's
+    ingestion always lands before turn t's consolidation and before turn t+1's
+    ingestion. Each job may carry the text it ingests; pending_mentions() lets a
+    caller decide whether a new query depends on work that has not landed yet.
+    """
+
+    def __init__(self, name: str = "dynagraph-ingestion"):
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._pending = {}  # seq -> (enqueued_at, lowercased text)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_error = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.max_depth = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable, *args, text: str = "") -> int:
+        """Queue job(*args) and return its sequence number"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("IngestionWorker is closed")
+            self.submitted += 1
+            seq = self.submitted
+            self._pending[seq] = (time.perf_counter(), text.lower())
+            self.max_depth = max(self.max_depth, len(self._pending))
+            # Enqueued under the lock so concurrent submitters' jobs run in seq order
+            self._queue.put((seq, job, args))
+        return seq
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            seq, job, args = item
+            try:
+                job(*args)
+            except Exception as exc:  # keep the queue alive; the failure is reported in stats()
+                self.failed += 1
+                self.last_error = repr(exc)
+            with self._cond:
+                enqueued_at, _ = self._pending.pop(seq)
+                self.last_lag = time.perf_counter() - enqueued_at
+                self.max_lag = max(self.max_lag, self.last_lag)
+                self.completed = seq
+                self._cond.notify_all()
+
+    def pending_mentions(self, terms: Iterable[str]) -> Optional[int]:
+        """Sequence number of the last pending job whose text mentions any term, else None"""
+        terms = [term.lower() for term in terms if term]
+        with self._cond:
+            for seq in sorted(self._pending, reverse=True):
+                text = self._pending[seq][1]
+                if any(term in text for term in terms):
+                    return seq
+        return None
+
+    def wait(self, seq: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Block until job `seq` (default: everything submitted so far) has run"""
+        with self._cond:
+            target = self.submitted if seq is None else seq
+            return self._cond.wait_for(lambda: self.completed >= target, timeout)
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = time.perf_counter()
+            oldest = min((enqueued for enqueued, _ in self._pending.values()), default=None)
+            return {
+                "depth": len(self._pending),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "lag": 0.0 if oldest is None else now - oldest,
+                "last_lag": self.last_lag,
+                "max_lag": self.max_lag,
+                "last_error": self.last_error
+            }
+
+    def close(self, wait: bool = True):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if wait:
+            self._thread.join()
@@ -0,0 +1,346 @@
+import os
+import json
+import glob
+import shutil
+import struct
+import zlib
+import time
+import threading
+from contextlib import nullcontext
+from typing import Callable, Dict, List
+import numpy as np
+import networkx as nx
+from config import DynaGraphConfig as config
+from utils.graph_utils import get_graph_versions
+from .compact_graph import CompactMultiDiGraph, csr_index
+
+_FRAME = struct.Struct("<II")  # payload length, crc32
+_NODE_ARRAYS = ("node_last", "node_created", "node_centrality")
+_EDGE_ARRAYS = ("src", "dst", "pred", "weight", "last")
+_INDEX_ARRAYS = ("out_indptr", "out_edges", "in_indptr", "in_edges")
+_CAPTURE_CHUNK = 4096  # nodes copied per hold of the graph lock by a background snapshot
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class GraphStore:
+    """Durable memory for a TemporalKnowledgeGraph: columnar snapshots plus a write-ahead log.
+
+    After every mutation batch, log_changes() appends one WAL record with the
+    attributes of each node touched since the last record (or a drop for nodes
+    that no longer exist) and the edges running between two touched nodes.
+    Touched nodes come from the graph's GraphVersions, which ingestion, pruning
+    and merging already maintain; a writer touches both endpoints of every edge
+    it changes, so no other edge can differ. Replay replaces those node pairs'
+    edges wholesale, so applying a record twice is harmless.
+
+    Every `snapshot_interval` records the WAL rotates to a new segment and a
+    background thread writes the graph's columns as .npy files. The compact
+    backend is copied under the caller's lock (vectorized); a NetworkX graph is
+    copied by the writer thread a chunk of nodes at a time under kg.lock, and
+    any change made meanwhile is also in a record after the snapshot, which
+    recovery replays. Recovery memory-maps the newest complete snapshot and
+    replays only the WAL records after it.
+
+    Layout under `path`: CURRENT (name of the live snapshot), snapshot-<seq>/,
+    and wal-<first seq>.log segments of length/crc32-framed JSON records.
+    """
+
+    def __init__(self, path: str, snapshot_interval: int = config.SNAPSHOT_INTERVAL,
+                 fsync: bool = config.WAL_FSYNC):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._logged_version = 0
+        self._records_since_snapshot = 0
+        self._wal = None
+        self._writer = None
+        self._writer_error = None
+
+        self.stats = {"records": 0, "snapshots": 0, "replayed": 0, "last_snapshot_time": 0.0}
+
+    # ---------------------------------------------------------------- recovery
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "wal-*.log")),
+                      key=lambda p: int(os.path.basename(p)[4:-4]))
+
+    def recover(self, kg) -> int:
+        """Load the latest snapshot and replay the WAL tail into kg; returns records replayed"""
+        current = os.path.join(self.path, "CURRENT")
+        graph, turn = None, 0
+        if os.path.exists(current):
+            with open(current) as f:
+                name = f.read().strip()
+            graph, meta = self._load_snapshot(os.path.join(self.path, name), kg.backend)
+            self.seq = self.snapshot_seq = meta["seq"]
+            turn = meta["turn"]
+        if graph is None:
+            graph = nx.MultiDiGraph() if kg.backend == "networkx" else CompactMultiDiGraph()
+
+        replayed = 0
+        for segment in self._segments():
+            records, clean = self._read_segment(segment)
+            for record in records:
+                if record["seq"] <= self.seq:
+                    continue
+                self._apply(graph, record)
+                self.seq, turn = record["seq"], record["turn"]
+                replayed += 1
+            if not clean:
+                # Nothing after a torn record can be applied in order
+                for later in self._segments():
+                    if int(os.path.basename(later)[4:-4]) > self.seq:
+                        os.remove(later)
+                break
+
+        kg.graph = graph
+        kg.turn_counter = turn
+        self._logged_version = get_graph_versions(graph).version
+        self._records_since_snapshot = replayed
+        self.stats["replayed"] = replayed
+        self._open_segment()
+        return replayed
+
+    @staticmethod
+    def _read_segment(segment: str):
+        """(records, clean); a torn or corrupt tail left by a crash mid-append is cut off"""
+        records, clean = [], True
+        with open(segment, "r+b") as f:
+            offset = 0
+            while True:
+                header = f.read(_FRAME.size)
+                if not header:
+                    break
+                if len(header) < _FRAME.size:
+                    clean = False
+                    break
+                length, crc = _FRAME.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    clean = False
+                    break
+                offset = f.tell()
+                records.append(json.loads(payload))
+            f.truncate(offset)
+        return records, clean
+
+    @staticmethod
+    def _apply(graph: nx.Graph, record: Dict):
+        for op in record["ops"]:
+            if op[0] == "drop" and op[1] in graph:
+                graph.remove_node(op[1])
+        for op in record["ops"]:
+            if op[0] == "node":
+                graph.add_node(op[1], **op[2])
+        # The record holds every edge between its nodes; any other edge among them is gone
+        scope = {op[1] for op in record["ops"]}
+        for op in record["ops"]:
+            if op[0] != "node":
+                continue
+            node = op[1]
+            for target in [target for target in graph.successors(node) if target in scope]:
+                for key in list(graph[node][target]):
+                    graph.remove_edge(node, target, key)
+            for target, group in op[3]:
+                for attrs in group:
+                    graph.add_edge(node, target, **attrs)
+        if record["ops"]:
+            get_graph_versions(graph).touch(op[1] for op in record["ops"])
+
+    # ---------------------------------------------------------------- logging
+
+    def _open_segment(self):
+        if self._wal is not None:
+            self._wal.close()
+        self._wal = open(os.path.join(self.path, f"wal-{self.seq + 1}.log"), "ab")
+
+    def log_changes(self, kg):
+        """Append one record with everything touched since the last one; call under kg.lock"""
+        graph = kg.graph
+        versions = get_graph_versions(graph)
+        changed = versions.changed_since(self._logged_version)
+        if changed is None:
+            # The version log no longer reaches back: only a full snapshot is consistent
+            self._logged_version = versions.version
+            self.seq += 1
+            self.snapshot(kg, wait=True)
+            return
+
+        ops = []
+        for node in changed:
+            if node in graph:
+                # Only edges between two touched nodes can have changed
+                groups = [(target, list(graph.get_edge_data(node, target).values()))
+                          for target in graph.successors(node) if target in changed]
+                ops.append(["node", node, dict(graph.nodes[node]), groups])
+            else:
+                ops.append(["drop", node])
+        payload = json.dumps({"seq": self.seq + 1, "turn": kg.turn_counter, "ops": ops},
+                             default=_json_default).encode("utf-8")
+        self._wal.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+        self.seq += 1
+        self._logged_version = versions.version
+        self._records_since_snapshot += 1
+        self.stats["records"] += 1
+        if self.snapshot_interval and self._records_since_snapshot >= self.snapshot_interval:
+            self.snapshot(kg)
+
+    # -------------------------------------------------------------- snapshots
+
+    def snapshot(self, kg, wait: bool = False) -> bool:
+        """Capture kg now and write it in the background; call under kg.lock.
+
+        Returns False when a previous snapshot is still being written (the next
+        interval retries) unless wait is set.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            if not wait:
+                return False
+            self._writer.join()
+
+        graph = kg.graph
+        if isinstance(graph, CompactMultiDiGraph):
+            columns = graph.columns()  # vectorized copies, cheap under the lock
+            capture = lambda: columns
+        else:
+            # Only the node list is taken here; attributes are copied in chunks by the writer.
+            # A waiting caller holds kg.lock, so it copies everything itself.
+            names = list(graph)
+            lock = nullcontext() if wait else kg.lock
+            capture = lambda: self._capture(graph, names, lock)
+            if wait:
+                columns = capture()
+                capture = lambda: columns
+        seq, turn = self.seq, kg.turn_counter
+        # The snapshot holds every change so far; a replaced graph also restarts its version count
+        self._logged_version = get_graph_versions(graph).version
+        self._records_since_snapshot = 0
+        self._open_segment()  # records after `seq` go to a segment the snapshot does not cover
+
+        self._writer = threading.Thread(target=self._write_snapshot, args=(capture, seq, turn),
+                                        name="dynagraph-snapshot", daemon=True)
+        self._writer.start()
+        if wait:
+            self._writer.join()
+        return True
+
+    @staticmethod
+    def _capture(graph: nx.MultiDiGraph, names: List, lock) -> Dict:
+        """Columns of a NetworkX graph, copied _CAPTURE_CHUNK nodes (and their out-edges) per hold of lock"""
+        compact = CompactMultiDiGraph()
+        for start in range(0, len(names), _CAPTURE_CHUNK):
+            with lock:
+                for node in names[start:start + _CAPTURE_CHUNK]:
+                    if node in graph:
+                        compact.add_node(node, **graph.nodes[node])
+                        for _, target, attrs in graph.out_edges(node, data=True):
+                            compact.add_edge(node, target, **attrs)
+        return compact.columns()
+
+    def _write_snapshot(self, capture: Callable[[], Dict], seq: int, turn: int):
+        try:
+            start = time.perf_counter()
+            columns = capture()
+
+            n_nodes = len(columns["names"])
+            edge_ids = np.arange(len(columns["src"]), dtype=np.int32)
+            index = dict(zip(("out_indptr", "out_edges"), csr_index(columns["src"], edge_ids, n_nodes)))
+            index.update(zip(("in_indptr", "in_edges"), csr_index(columns["dst"], edge_ids, n_nodes)))
+
+            name = f"snapshot-{seq}"
+            final = os.path.join(self.path, name)
+            tmp = final + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for key in _NODE_ARRAYS + _EDGE_ARRAYS:
+                np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(columns[key]))
+            for key in _INDEX_ARRAYS:
+                np.save(os.path.join(tmp, f"{key}.npy"), index[key])
+            meta = {
+                "seq": seq,
+                "turn": turn,
+                "names": columns["names"],
+                "predicates": columns["predicates"],
+                "history": columns["history"],
+                "edge_extra": columns["edge_extra"],
+                "node_extra": columns["node_extra"]
+            }
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(meta, f, default=_json_default)
+            if self.fsync:
+                for file in os.listdir(tmp):
+                    with open(os.path.join(tmp, file), "rb") as f:
+                        os.fsync(f.fileno())
+            shutil.rmtree(final, ignore_errors=True)
+            os.replace(tmp, final)
+
+            pointer = os.path.join(self.path, "CURRENT.tmp")
+            with open(pointer, "w") as f:
+                f.write(name)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(pointer, os.path.join(self.path, "CURRENT"))
+            if self.fsync:
+                _fsync_dir(self.path)
+
+            # Older snapshots and fully covered WAL segments are no longer needed
+            for old in glob.glob(os.path.join(self.path, "snapshot-*")):
+                if old != final and not old.endswith(".tmp"):
+                    shutil.rmtree(old, ignore_errors=True)
+            segments = self._segments()
+            for segment, following in zip(segments, segments[1:]):
+                if int(os.path.basename(following)[4:-4]) <= seq + 1:
+                    os.remove(segment)
+
+            self.snapshot_seq = seq
+            self.stats["snapshots"] += 1
+            self.stats["last_snapshot_time"] = time.perf_counter() - start
+        except Exception as exc:  # the WAL still holds every record; surface the failure in stats
+            self._writer_error = repr(exc)
+            self.stats["snapshot_error"] = self._writer_error
+
+    @staticmethod
+    def _load_snapshot(directory: str, backend: str):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        # Copy-on-write maps: loading is O(1) in the edge count and later edits stay private
+        columns = {key: np.load(os.path.join(directory, f"{key}.npy"), mmap_mode="c")
+                   for key in _NODE_ARRAYS + _EDGE_ARRAYS}
+        index = {key: np.load(os.path.join(directory, f"{key}.npy"), mmap_mode="c") for key in _INDEX_ARRAYS}
+        columns.update({key: meta[key] for key in ("names", "predicates", "history", "edge_extra", "node_extra")})
+        graph = CompactMultiDiGraph.from_columns(columns, index)
+        if backend == "networkx":
+            graph = graph.to_networkx()
+        return graph, meta
+
+    def wait(self):
+        """Block until a background snapshot (if any) is on disk"""
+        if self._writer is not None:
+            self._writer.join()
+
+    def close(self):
+        self.wait()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
@@ -0,0 +1,95 @@
+import time
+from collections import deque
+from typing import Dict, Hashable, List, Set, Tuple
+import networkx as nx
+from config import DynaGraphConfig as config
+from utils.graph_utils import edge_attributes
+
+class PushPPR:
+    """Local forward-push personalized PageRank from a set of anchor nodes.
+
+    Residual mass starts on the anchors and is pushed along out-edges in
+    proportion to edge weight until every residual is below epsilon times the
+    node's out-degree. Work is O(1 / (alpha * epsilon)) pushes regardless of
+    graph size; dangling nodes keep the mass they receive. With a deadline the
+    push stops early; the estimates it has so far are lower bounds.
+    """
+
+    def __init__(self, alpha=config.PPR_ALPHA, epsilon=config.PPR_EPSILON, top_k=config.PPR_TOP_K):
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.top_k = top_k
+        self.stats = {}
+
+    @staticmethod
+    def _out_weights(graph: nx.Graph, node) -> List[Tuple[Hashable, float]]:
+        weights = []
+        for neighbor, data in graph[node].items():
+            if graph.is_multigraph():
+                weight = max(attrs.get('weight', 0.1) for attrs in data.values())
+            else:
+                weight = data.get('weight', 0.1)
+            weights.append((neighbor, max(weight, 0.0)))
+        return weights
+
+    def rank(self, graph: nx.Graph, anchors: List, deadline: float = None) -> Tuple[Dict, Set]:
+        """Return (approximate PPR scores, every node the push read or wrote).
+
+        deadline is a time.perf_counter() value, checked every 64 pushes.
+        """
+        estimate, residual = {}, {}
+        seeds = list(dict.fromkeys(anchors))
+        for anchor in seeds:
+            residual[anchor] = residual.get(anchor, 0.0) + 1.0 / len(seeds)
+
+        queue = deque(seeds)
+        queued = set(seeds)
+        pushes = 0
+        truncated = False
+        while queue:
+            if deadline is not None and pushes % 64 == 63 and time.perf_counter() > deadline:
+                truncated = True
+                break
+            node = queue.popleft()
+            queued.discard(node)
+            mass = residual.get(node, 0.0)
+            out = self._out_weights(graph, node)
+            if mass <= self.epsilon * max(len(out), 1):
+                continue
+
+            pushes += 1
+            residual[node] = 0.0
+            estimate[node] = estimate.get(node, 0.0) + self.alpha * mass
+            total = sum(weight for _, weight in out)
+            if not out:
+                estimate[node] += (1 - self.alpha) * mass
+                continue
+
+            spread = (1 - self.alpha) * mass
+            for neighbor, weight in out:
+                share = spread * (weight / total if total > 0 else 1.0 / len(out))
+                residual[neighbor] = residual.get(neighbor, 0.0) + share
+                if neighbor not in queued and residual[neighbor] > self.epsilon * max(len(graph[neighbor]), 1):
+                    queue.append(neighbor)
+                    queued.add(neighbor)
+
+        self.stats = {"pushes": pushes, "touched": len(residual), "truncated": truncated}
+        return estimate, set(residual) | set(estimate)
+
+    def context_subgraph(self, graph: nx.Graph, anchors: List, deadline: float = None) -> Tuple[nx.DiGraph, Set]:
+        """Edges among the top-k PPR nodes, inserted by descending p(u) + p(v)"""
+        scores, touched = self.rank(graph, anchors, deadline)
+        top = sorted(scores, key=scores.get, reverse=True)[:self.top_k]
+        selected = set(top)
+
+        edges = []
+        for u in top:
+            for v in graph[u]:
+                if v in selected and v != u:
+                    edges.append((scores[u] + scores[v], u, v))
+        edges.sort(key=lambda edge: edge[0], reverse=True)
+
+        context_graph = nx.DiGraph()
+        for score, u, v in edges:
+            context_graph.add_edge(u, v, rank_score=score, **edge_attributes(graph, u, v))
+        return context_graph, touched
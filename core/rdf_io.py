@@ -0,0 +1,315 @@
+import re
+import csv
+import json
+from array import array
+from typing import Dict, Hashable, IO, Tuple
+from urllib.parse import quote, unquote
+import numpy as np
+import networkx as nx
+from config import DynaGraphConfig as config
+from .compact_graph import CompactMultiDiGraph, _UNSET
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+_NODE = "node/"
+_PREDICATE = "predicate/"
+_META = "meta/"
+_EDGE_META = ("weight", "lastUpdated", "archivedHistory")
+_NODE_META = ("lastUpdated", "created")
+
+_ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+_UNESCAPES = {'\\': '\\', '"': '"', "'": "'", 'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f'}
+_TERM = r'(<[^>]*>|_:[A-Za-z0-9_.-]+|"(?:[^"\\]|\\.)*"(?:\^\^<[^>]*>|@[A-Za-z0-9-]+)?)'
+_TRIPLE = re.compile(r'^\s*' + _TERM + r'\s+' + _TERM + r'\s+' + _TERM + r'\s*\.\s*$')
+_ABSOLUTE_IRI = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*://[^\x00-\x20<>"{}|^`\\]*$')
+_LITERAL_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+
+def _iri(base: str, kind: str, name: Hashable) -> str:
+    name = str(name)
+    if _ABSOLUTE_IRI.match(name):
+        return f"<{name}>"  # imported from another vocabulary: keep it as is
+    # Percent-encoding everything outside unreserved characters keeps the IRI valid N-Triples
+    return f"<{base}{kind}{quote(name, safe='')}>"
+
+def _literal(value, datatype: str = None) -> str:
+    text = ''.join(_ESCAPES.get(ch, ch if ch >= ' ' else f"\\u{ord(ch):04X}") for ch in str(value))
+    return f'"{text}"^^<{XSD}{datatype}>' if datatype else f'"{text}"'
+
+def _unescape(text: str) -> str:
+    def replace(match):
+        token = match.group(1)
+        if token[0] in 'uU' and len(token) > 1:
+            return chr(int(token[1:], 16))
+        return _UNESCAPES.get(token, token)
+    return _LITERAL_ESCAPE.sub(replace, text)
+
+def write_ntriples(graph: nx.Graph, handle: IO[str], metadata: bool = False, base: str = config.RDF_BASE_IRI,
+                   chunk_lines: int = config.EXPORT_CHUNK_LINES) -> Dict[str, int]:
+    """Stream graph facts to handle as N-Triples, chunk_lines lines per write.
+
+    Every edge becomes `<subject> <predicate> <object> .`. With metadata, each edge
+    is also reified as a blank-node rdf:Statement carrying its weight, last_updated
+    and archived_history (JSON), and node timestamps are emitted as well, so
+    read_ntriples can rebuild the full memory graph.
+    """
+    meta = lambda name: f"<{base}{_META}{name}>"
+    buffer, counts = [], {"edges": 0, "lines": 0}
+
+    def emit(line: str):
+        buffer.append(line)
+        if len(buffer) >= chunk_lines:
+            flush()
+
+    def flush():
+        if buffer:
+            handle.write("\n".join(buffer) + "\n")
+            counts["lines"] += len(buffer)
+            buffer.clear()
+
+    if metadata:
+        for node, attrs in graph.nodes(data=True):
+            subject = _iri(base, _NODE, node)
+            for key, name in (('last_updated', 'lastUpdated'), ('created', 'created')):
+                if attrs.get(key) is not None:
+                    emit(f"{subject} {meta(name)} {_literal(int(attrs[key]), 'integer')} .")
+
+    for i, (u, v, attrs) in enumerate(graph.edges(data=True)):
+        subject, obj = _iri(base, _NODE, u), _iri(base, _NODE, v)
+        predicate = _iri(base, _PREDICATE, attrs.get('predicate', 'related-to'))
+        emit(f"{subject} {predicate} {obj} .")
+        if metadata:
+            statement = f"_:e{i}"
+            emit(f"{statement} <{RDF}type> <{RDF}Statement> .")
+            emit(f"{statement} <{RDF}subject> {subject} .")
+            emit(f"{statement} <{RDF}predicate> {predicate} .")
+            emit(f"{statement} <{RDF}object> {obj} .")
+            if attrs.get('weight') is not None:
+                emit(f"{statement} {meta('weight')} {_literal(float(attrs['weight']), 'double')} .")
+            if attrs.get('last_updated') is not None:
+                emit(f"{statement} {meta('lastUpdated')} {_literal(int(attrs['last_updated']), 'integer')} .")
+            emit(f"{statement} {meta('archivedHistory')} {_literal(json.dumps(attrs.get('archived_history') or []))} .")
+        counts["edges"] += 1
+    flush()
+    return counts
+
+def write_edge_csv(graph: nx.Graph, handle: IO[str], chunk_lines: int = config.EXPORT_CHUNK_LINES) -> int:
+    """Stream one CSV row per edge: subject, predicate, object, weight, last_updated, archived_history.
+
+    Edges only: nodes without edges and node timestamps are not in this file;
+    write_node_csv dumps them alongside.
+    """
+    writer = csv.writer(handle)
+    writer.writerow(["subject", "predicate", "object", "weight", "last_updated", "archived_history"])
+    rows, count = [], 0
+    for u, v, attrs in graph.edges(data=True):
+        rows.append([u, attrs.get('predicate', 'related-to'), v,
+                     '' if attrs.get('weight') is None else float(attrs['weight']),
+                     '' if attrs.get('last_updated') is None else int(attrs['last_updated']),
+                     json.dumps(attrs.get('archived_history') or [])])
+        if len(rows) >= chunk_lines:
+            writer.writerows(rows)
+            count += len(rows)
+            rows.clear()
+    writer.writerows(rows)
+    return count + len(rows)
+
+def write_node_csv(graph: nx.Graph, handle: IO[str], chunk_lines: int = config.EXPORT_CHUNK_LINES) -> int:
+    """Stream one CSV row per node: node, last_updated, created"""
+    writer = csv.writer(handle)
+    writer.writerow(["node", "last_updated", "created"])
+    rows, count = [], 0
+    for node, attrs in graph.nodes(data=True):
+        rows.append([node] + ['' if attrs.get(key) is None else int(attrs[key]) for key in ('last_updated', 'created')])
+        if len(rows) >= chunk_lines:
+            writer.writerows(rows)
+            count += len(rows)
+            rows.clear()
+    writer.writerows(rows)
+    return count + len(rows)
+
+class _ColumnBuilder:
+    """Accumulates streamed nodes/edges in typed arrays, then loads them as one graph"""
+
+    def __init__(self):
+        self.names, self.ids = [], {}
+        self.predicates, self.predicate_ids = [], {}
+        self.src, self.dst, self.pred = array('i'), array('i'), array('i')
+        self.weight, self.last = array('f'), array('i')
+        self.history = {}
+        self.node_attrs = {}
+
+    def node(self, name: Hashable) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def edge(self, u, predicate, v, weight=None, last_updated=None, history=None) -> int:
+        pid = self.predicate_ids.get(predicate)
+        if pid is None:
+            pid = self.predicate_ids[predicate] = len(self.predicates)
+            self.predicates.append(predicate)
+        self.src.append(self.node(u))
+        self.dst.append(self.node(v))
+        self.pred.append(pid)
+        self.weight.append(np.nan)
+        self.last.append(_UNSET)
+        eid = len(self.src) - 1
+        self.set_edge(eid, weight, last_updated, history)
+        return eid
+
+    def set_edge(self, eid: int, weight=None, last_updated=None, history=None):
+        if weight is not None:
+            self.weight[eid] = weight
+        if last_updated is not None:
+            self.last[eid] = last_updated
+        if history:
+            self.history[eid] = history
+
+    def graph(self, backend: str) -> nx.Graph:
+        n_nodes = len(self.names)
+        node_last = np.full(n_nodes, _UNSET, dtype=np.int32)
+        node_created = np.full(n_nodes, _UNSET, dtype=np.int32)
+        for idx, attrs in self.node_attrs.items():
+            if 'last_updated' in attrs:
+                node_last[idx] = attrs['last_updated']
+            if 'created' in attrs:
+                node_created[idx] = attrs['created']
+        graph = CompactMultiDiGraph.from_columns({
+            "names": self.names,
+            "predicates": self.predicates,
+            "node_last": node_last,
+            "node_created": node_created,
+            "node_centrality": np.full(n_nodes, np.nan, dtype=np.float32),
+            "src": np.frombuffer(self.src, dtype=np.int32).copy(),
+            "dst": np.frombuffer(self.dst, dtype=np.int32).copy(),
+            "pred": np.frombuffer(self.pred, dtype=np.int32).copy(),
+            "weight": np.frombuffer(self.weight, dtype=np.float32).copy(),
+            "last": np.frombuffer(self.last, dtype=np.int32).copy(),
+            "history": self.history
+        })
+        return graph.to_networkx() if backend == "networkx" else graph
+
+def _parse_term(term: str, base: str) -> Tuple[str, object]:
+    """('node'|'predicate'|'meta'|'iri'|'blank'|'literal', value) for one N-Triples term"""
+    if term.startswith('<'):
+        iri = term[1:-1]
+        for kind, prefix in (('node', _NODE), ('predicate', _PREDICATE), ('meta', _META)):
+            if iri.startswith(base + prefix):
+                return kind, unquote(iri[len(base) + len(prefix):])
+        return 'iri', iri
+    if term.startswith('_:'):
+        return 'blank', term[2:]
+    end = term.rindex('"')
+    text = term[1:end]
+    if '\\' in text:
+        text = _unescape(text)
+    datatype = term[end + 1:]
+    if datatype.endswith(f'{XSD}integer>'):
+        return 'literal', int(text)
+    if datatype.endswith(f'{XSD}double>'):
+        return 'literal', float(text)
+    return 'literal', text
+
+def read_ntriples(handle: IO[str], backend: str = config.GRAPH_BACKEND,
+                  base: str = config.RDF_BASE_IRI) -> nx.Graph:
+    """Rebuild a memory graph from write_ntriples output in one streaming pass and one bulk load.
+
+    Plain triples become edges (IRIs outside `base` keep their full IRI as the
+    node or predicate name). Reified statements attach their metadata to the
+    matching edge, creating it if the plain triple was not exported. A statement
+    is released once it has its edge and archivedHistory, which write_ntriples
+    emits last, so a metadata export holds only the statements in progress.
+    """
+    builder = _ColumnBuilder()
+    iris = {}  # IRI term -> parsed term; node and predicate IRIs repeat on most lines
+    # (src, predicate, dst) ids -> edge ids whose reification has not arrived yet;
+    # None until the first statement, so plain exports track nothing
+    unclaimed = None
+    statements = {}  # blank id -> partially read reification
+
+    def triple_key(eid: int) -> Tuple[int, int, int]:
+        return builder.src[eid], builder.pred[eid], builder.dst[eid]
+
+    def resolve(statement: Dict):
+        nonlocal unclaimed
+        if unclaimed is None:
+            unclaimed = {}
+            for eid in range(len(builder.src)):
+                unclaimed.setdefault(triple_key(eid), []).append(eid)
+        key = (statement['subject'], statement['predicate'], statement['object'])
+        pid = builder.predicate_ids.get(key[1])
+        lookup = (builder.ids.get(key[0]), pid, builder.ids.get(key[2]))
+        waiting = unclaimed.get(lookup) if pid is not None else None
+        if waiting:
+            eid = waiting.pop(0)
+            if not waiting:
+                del unclaimed[lookup]
+        else:
+            eid = builder.edge(*key)
+        statement['edge'] = eid
+        builder.set_edge(eid, statement.get('weight'), statement.get('lastUpdated'), statement.get('archivedHistory'))
+
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = _TRIPLE.match(line)
+        if match is None:
+            raise ValueError(f"Malformed N-Triples line {line_number}: {line.strip()[:80]}")
+        parsed = []
+        for term in match.groups():
+            if term[0] == '<':
+                value = iris.get(term)
+                if value is None:
+                    value = iris[term] = _parse_term(term, base)
+            else:
+                value = _parse_term(term, base)
+            parsed.append(value)
+        (s_kind, s), (p_kind, p), (o_kind, o) = parsed
+
+        if s_kind == 'blank':
+            statement = statements.setdefault(s, {})
+            if p_kind == 'iri' and p.startswith(RDF):
+                field = p[len(RDF):]
+                if field in ('subject', 'predicate', 'object'):
+                    statement[field] = o
+            elif p_kind == 'meta' and p in _EDGE_META:
+                statement[p] = json.loads(o) if p == 'archivedHistory' else o
+                if 'edge' in statement:
+                    builder.set_edge(statement['edge'], statement.get('weight'),
+                                     statement.get('lastUpdated'), statement.get('archivedHistory'))
+            if 'edge' not in statement:
+                if 'subject' in statement and 'predicate' in statement and 'object' in statement:
+                    resolve(statement)
+            if 'edge' in statement and 'archivedHistory' in statement:
+                del statements[s]
+        elif p_kind == 'meta' and p in _NODE_META:
+            attrs = builder.node_attrs.setdefault(builder.node(s), {})
+            attrs['last_updated' if p == 'lastUpdated' else 'created'] = o
+        elif o_kind != 'literal':
+            eid = builder.edge(s, p, o)
+            if unclaimed is not None:
+                unclaimed.setdefault(triple_key(eid), []).append(eid)
+    return builder.graph(backend)
+
+def read_edge_csv(handle: IO[str], backend: str = config.GRAPH_BACKEND, nodes: IO[str] = None) -> nx.Graph:
+    """Rebuild a memory graph from write_edge_csv output in one bulk load.
+
+    `nodes` is an optional write_node_csv dump, which restores nodes without
+    edges and node timestamps.
+    """
+    builder = _ColumnBuilder()
+    if nodes is not None:
+        for row in csv.DictReader(nodes):
+            attrs = {key: int(row[key]) for key in ('last_updated', 'created') if row[key]}
+            idx = builder.node(row["node"])
+            if attrs:
+                builder.node_attrs[idx] = attrs
+    for row in csv.DictReader(handle):
+        builder.edge(row["subject"], row["predicate"], row["object"],
+                     float(row["weight"]) if row["weight"] else None,
+                     int(row["last_updated"]) if row["last_updated"] else None,
+                     json.loads(row["archived_history"]) if row["archived_history"] else None)
+    return builder.graph(backend)
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+import networkx as nx
+from config import DynaGraphConfig as config
+from utils.graph_utils import get_graph_versions
+from utils.text_processing import clean_text
+
+def normalize_query(query: str) -> str:
+    return clean_text(query).lower()
+
+class RetrievalCache:
+    """Bounded LRU of linearized contexts and their linearize stats, invalidated per neighbourhood.
+
+    Each entry records the graph version it was computed at and the nodes its
+    result depends on. It stays valid until one of those nodes is touched in the
+    graph's GraphVersions, so updates elsewhere in the graph do not evict it.
+    """
+
+    def __init__(self, graph: nx.Graph, max_size: int = config.RETRIEVAL_CACHE_SIZE):
+        self.versions = get_graph_versions(graph)
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, Dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        version, nodes, context = entry
+        node_versions = self.versions.node_versions
+        if any(node_versions.get(node, 0) > version for node in nodes):
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return context
+
+    def put(self, key: Hashable, context: Tuple[str, Dict], nodes: Iterable[Hashable]):
+        self._entries[key] = (self.versions.version, frozenset(nodes), context)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+def get_retrieval_cache(graph: nx.Graph) -> RetrievalCache:
+    """Return the retrieval cache attached to graph, creating it on first use"""
+    cache = graph.graph.get('retrieval_cache')
+    if cache is None:
+        cache = graph.graph['retrieval_cache'] = RetrievalCache(graph)
+    return cache
@@ -1,32 +1,71 @@
-import spacy
+import time
 import numpy as np
 import networkx as nx
 from typing import List, Tuple, Dict
 from config import DynaGraphConfig as config
+from utils.text_processing import get_anchor_index, get_ner_pipeline, extract_entities, clean_text, estimate_tokens
+from utils.graph_utils import edge_attributes, get_graph_versions
+from .beam_search import ArrayBeamSearch
+from .retrieval_cache import get_retrieval_cache, normalize_query
+from .ppr import PushPPR
+
+# Predicates whose mirrored fact states the same thing
+SYMMETRIC_PREDICATES = {"related-to", "similar-to", "interacts-with"}
 
 class MultiScaleRetriever:
-    def __init__(self, beam_width=3, kappa=0.8):
+    def __init__(self, beam_width=3, kappa=0.8, engine=config.BEAM_ENGINE, retrieval_engine=config.RETRIEVAL_ENGINE):
+        if engine not in ("python", "csr"):
+            raise ValueError(f"Unknown beam search engine '{engine}', expected 'python' or 'csr'")
+        if retrieval_engine not in ("beam", "ppr"):
+            raise ValueError(f"Unknown retrieval engine '{retrieval_engine}', expected 'beam' or 'ppr'")
         self._initial_beam_width = beam_width
         self.beam_width = beam_width
         self.kappa = kappa
-        self.nlp = spacy.load("en_core_web_sm")
+        self.engine = engine
+        self._array_search = ArrayBeamSearch()
+        self.retrieval_engine = retrieval_engine
+        self._ppr = PushPPR()
+        self.sweep_timings = {}
+        self.level_cost = None
+        self.linearize_stats = {}
+    
+    @property
+    def nlp(self):
+        # Shared across retrievers and only loaded by the first query
+        return get_ner_pipeline()
+    
+    def extract_entities(self, queries: List[str]) -> List[List[str]]:
+        """Batched NER over many queries with one nlp.pipe call"""
+        return extract_entities(queries)
     
-    def identify_anchor_nodes(self, query: str, graph: nx.Graph) -> List[str]:
-        doc = self.nlp(query)
-        entities = [ent.text for ent in doc.ents]
+    def identify_anchor_nodes(self, query: str, graph: nx.Graph, entities: List[str] = None,
+                              matches: Dict[str, str] = None) -> List[str]:
+        if entities is None:
+            entities = self.extract_entities([query])[0]
+        if matches is None:
+            matches = {}
         
+        index = get_anchor_index(graph)
         anchor_nodes = []
         for entity in entities[:config.MAX_ANCHORS]:
-            best_match, best_score = None, 0.0
-            for node in graph.nodes:
-                score = self._string_similarity(entity, node)
-                if score > best_score and score > 0.4:
-                    best_score = score
-                    best_match = node
+            # Entities repeated across a batch of queries are matched once
+            if entity not in matches:
+                matches[entity] = self._match_entity(entity, index)
+            best_match = matches[entity]
             if best_match:
                 anchor_nodes.append(best_match)
         return anchor_nodes
     
+    def _match_entity(self, entity: str, index) -> str:
+        best_match, best_score = None, 0.0
+        # Only nodes sharing a token, prefix or suffix with the entity can score > 0.4
+        for node in index.candidates(entity):
+            score = self._string_similarity(entity, node)
+            if score > best_score and score > 0.4:
+                best_score = score
+                best_match = node
+        return best_match
+    
     def _string_similarity(self, s1: str, s2: str) -> float:
         s1_lower = s1.lower()
         s2_lower = s2.lower()
@@ -45,42 +84,150 @@ class MultiScaleRetriever:
         
         return max(overlap, prefix, suffix)
     
-    def retrieve_context(self, query: str, graph: nx.Graph, delta: int = None) -> str:
+    def retrieve_context(self, query: str, graph: nx.Graph, delta: int = None, entities: List[str] = None) -> str:
+        return self.retrieve_context_many([query], graph, delta,
+                                          None if entities is None else [entities])[0]
+    
+    def retrieve_context_many(self, queries: List[str], graph: nx.Graph, delta: int = None,
+                              entities: List[List[str]] = None) -> List[str]:
+        """Retrieve one linearized context per query against the same graph state.
+        
+        Graph statistics, beam width and cognitive depth are computed once, NER runs
+        as one batch (skipped when the caller already has the entities), and each
+        distinct anchor is beam-searched only once.
+        """
         if not graph.nodes:
-            return ""
-            
-        # Calculate average branching factor (degree)
-        degrees = [d for n, d in graph.degree()]
-        b = max(1.1, sum(degrees) / len(degrees)) if degrees else 1.1
+            return ["" for _ in queries]
         
-        # Enforce probabilistic Beam Search Completeness (Prop 2)
-        # B >= ceil(b * ln(1/epsilon)) with epsilon = 0.1 (ln(10) ~ 2.302)
-        min_beam = int(np.ceil(b * 2.302))
-        self.beam_width = max(self._initial_beam_width, min_beam)
+        b = self._configure_traversal(graph)
         
         # Determine cognitive depth utilizing mathematical bound
         if delta is None:
             delta = self._determine_cognitive_depth(b)
         
-        anchor_nodes = self.identify_anchor_nodes(query, graph)
-        if not anchor_nodes:
-            return ""
+        return [contexts[delta] for contexts in self._retrieve(queries, graph, [delta], entities)]
+    
+    def retrieve_context_sweep(self, query: str, graph: nx.Graph, deltas=(1, 2, 3, 4, 5)) -> Dict[int, str]:
+        """Contexts for every depth in deltas from a single beam search to max(deltas).
+        
+        The beam kept at level d does not depend on how deep the search goes, so the
+        context at depth d is built from the paths of at most d hops of the deepest run.
+        self.sweep_timings maps each depth to the retrieval time it would have cost alone.
+        """
+        if not graph.nodes:
+            self.sweep_timings = {delta: 0.0 for delta in deltas}
+            return {delta: "" for delta in deltas}
+        
+        self._configure_traversal(graph)
+        return self._retrieve([query], graph, list(deltas))[0]
+    
+    def _retrieve(self, queries: List[str], graph: nx.Graph, deltas: List[int],
+                  entities: List[List[str]] = None) -> List[Dict[int, str]]:
+        start = time.perf_counter()
+        max_delta = max(deltas)
+        if entities is None:
+            entities = self.extract_entities(queries)
+        
+        cache = get_retrieval_cache(graph) if config.RETRIEVAL_CACHE_SIZE else None
+        matches = {}
+        paths_by_anchor = {}
+        # level_costs[d] is the beam search time spent up to depth d
+        level_costs = np.zeros(max_delta + 1)
+        results = []
+        for query, query_entities in zip(queries, entities):
+            anchor_nodes = self.identify_anchor_nodes(query, graph, entities=query_entities, matches=matches)
+            if not anchor_nodes:
+                self.linearize_stats = {}
+                results.append({delta: "" for delta in deltas})
+                continue
             
-        context_subgraph = nx.DiGraph()
+            key = (normalize_query(query), tuple(anchor_nodes), self.retrieval_engine, self.beam_width, self.kappa)
+            if cache is not None:
+                cached = {delta: cache.get(key + (delta,)) for delta in deltas}
+                if all(entry is not None for entry in cached.values()):
+                    # Report the stats of the cached linearization, not of the previous query
+                    self.linearize_stats = dict(cached[deltas[-1]][1])
+                    results.append({delta: entry[0] for delta, entry in cached.items()})
+                    continue
+            
+            if self.retrieval_engine == "ppr":
+                # Push cost is set by the residual tolerance, not by delta
+                context_subgraph, touched = self._ppr.context_subgraph(graph, anchor_nodes)
+                context = self._linearize_context(context_subgraph)
+                contexts = {delta: context for delta in deltas}
+                if cache is not None:
+                    for delta in deltas:
+                        cache.put(key + (delta,), (context, self.linearize_stats), touched)
+                results.append(contexts)
+                continue
+            
+            for anchor in anchor_nodes:
+                if anchor not in paths_by_anchor:
+                    search_start = time.perf_counter()
+                    level_times = []
+                    paths_by_anchor[anchor] = self._beam_search(graph, anchor, max_delta, level_times)
+                    # Levels the search never reached cost what the search cost
+                    level_times += [time.perf_counter()] * (max_delta - len(level_times))
+                    level_costs[1:] += np.array(level_times) - search_start
+            
+            contexts = {}
+            for delta in deltas:
+                context_subgraph = nx.DiGraph()
+                path_nodes = set(anchor_nodes)
+                for anchor in anchor_nodes:
+                    for path in paths_by_anchor[anchor]:
+                        # A path of d hops was found at level d
+                        if len(path) <= delta + 1:
+                            self._add_path_to_context(path, graph, context_subgraph)
+                            path_nodes.update(path)
+                contexts[delta] = self._linearize_context(context_subgraph)
+                if cache is not None:
+                    cache.put(key + (delta,), (contexts[delta], self.linearize_stats),
+                              self._search_dependencies(graph, path_nodes))
+            results.append(contexts)
         
-        for anchor in anchor_nodes:
-            paths = self._beam_search(graph, anchor, delta)
-            for path in paths:
-                self._add_path_to_context(path, graph, context_subgraph)
-                
-        return self._linearize_context(context_subgraph)
+        # Anchor matching is shared by every depth; beam cost grows with depth
+        shared = time.perf_counter() - start - float(level_costs[-1])
+        self.sweep_timings = {delta: shared + float(level_costs[delta]) for delta in deltas}
+        return results
+    
+    def _search_dependencies(self, graph: nx.Graph, path_nodes: set) -> set:
+        """Nodes whose edges or degree feed the beam scores of a search over path_nodes"""
+        dependencies = set(path_nodes)
+        for node in path_nodes:
+            dependencies.update(graph.neighbors(node))
+        return dependencies
+    
+    def cache_stats(self, graph: nx.Graph) -> Dict[str, int]:
+        return get_retrieval_cache(graph).stats()
+    
+    def _configure_traversal(self, graph: nx.Graph) -> float:
+        """Set the beam width for graph and return its average branching factor"""
+        b = self._branching_factor(graph)
+        
+        # Enforce probabilistic Beam Search Completeness (Prop 2)
+        # B >= ceil(b * ln(1/epsilon)) with epsilon = 0.1 (ln(10) ~ 2.302)
+        min_beam = int(np.ceil(b * 2.302))
+        self.beam_width = max(self._initial_beam_width, min_beam)
+        return b
+    
+    def _branching_factor(self, graph: nx.Graph) -> float:
+        """Average degree of graph, recomputed only when its version (or size) changed"""
+        key = (get_graph_versions(graph).version, len(graph))
+        cached = graph.graph.get('degree_stats')
+        if cached is None or cached[0] != key:
+            # Calculate average branching factor (degree)
+            degrees = [d for n, d in graph.degree()]
+            b = max(1.1, sum(degrees) / len(degrees)) if degrees else 1.1
+            cached = graph.graph['degree_stats'] = (key, b)
+        return cached[1]
     
     def _determine_cognitive_depth(self, b: float) -> int:
         """Dynamically analytically calculate delta* minimizing the joint latency/amnesia objective"""
         # System parameters
         C_miss = 10.0
         lambda_cost = 0.5
-        C_op = 1.0
+        C_op = self._operation_cost()
         k_1 = 0.8
         B = self.beam_width
         
@@ -118,9 +265,29 @@ class MultiScaleRetriever:
         delta_star = d_floor if loss_fn(d_floor) < loss_fn(d_ceil) else d_ceil
         return max(config.DELTA_RANGE[0], min(config.DELTA_RANGE[1], delta_star))
     
-    def _beam_search(self, graph: nx.Graph, start: str, depth: int) -> List[List[str]]:
-        beam = [([start], 0.0)]  # (path, cumulative score)
+    def _beam_search(self, graph: nx.Graph, start: str, depth: int, level_times: list = None) -> List[List[str]]:
+        """Paths kept at each level, level by level; level_times collects a timestamp per completed level"""
         all_paths = []
+        last = time.perf_counter()
+        durations = []
+        for paths, _ in self._beam_levels(graph, start, depth):
+            all_paths.extend(paths)
+            now = time.perf_counter()
+            durations.append(now - last)
+            last = now
+            if level_times is not None:
+                level_times.append(now)
+        self._observe_level_costs(durations)
+        return all_paths
+    
+    def _beam_levels(self, graph: nx.Graph, start: str, depth: int):
+        """Yield (paths kept at the level, frontier nodes expanded) one level at a time"""
+        if self.engine == "csr":
+            return self._array_search.iter_levels(graph, start, depth, self.beam_width, self.kappa)
+        return self._python_beam_levels(graph, start, depth)
+    
+    def _python_beam_levels(self, graph: nx.Graph, start: str, depth: int):
+        beam = [([start], 0.0)]  # (path, cumulative score)
         
         for _ in range(depth):
             new_beam = []
@@ -148,21 +315,189 @@ class MultiScaleRetriever:
                 break
                 
             # Select top paths
+            expanded = len(beam)
             new_beam.sort(key=lambda x: x[1], reverse=True)
             beam = new_beam[:self.beam_width]
-            all_paths.extend([path for path, _ in beam])
+            yield [path for path, _ in beam], expanded
+    
+    def _observe_level_costs(self, durations: List[float]):
+        """Fold measured per-level search times into a moving average"""
+        for seconds in durations:
+            if self.level_cost is None:
+                self.level_cost = seconds
+            else:
+                self.level_cost += config.LEVEL_COST_SMOOTHING * (seconds - self.level_cost)
+    
+    def _operation_cost(self) -> float:
+        """C_op of the cognitive-depth model: fixed, or the measured per-level cost per beam entry"""
+        if config.C_OP_MODE == "measured" and self.level_cost is not None:
+            return self.level_cost / (self.beam_width * config.C_OP_UNIT)
+        return 1.0
+    
+    def retrieve_context_anytime(self, query: str, graph: nx.Graph, time_budget: float = config.RETRIEVAL_TIME_BUDGET,
+                                 max_expansions: int = None, delta: int = None,
+                                 entities: List[str] = None) -> Tuple[str, Dict]:
+        """Deepen all anchor beams one level at a time until the depth or budget runs out.
+        
+        A level is only started if the last level's cost still fits in the remaining
+        time budget, and the deadline is checked again before each anchor's step, so
+        the result is the deepest context affordable (a level cut short keeps the
+        anchors it reached). Complete results share the retrieval cache with
+        retrieve_context; the ppr engine runs its push until the deadline instead of
+        by level. Returns the context and {depth, max_depth, expanded, truncated,
+        cached, elapsed}.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget if time_budget is not None else None
+        meta = {"depth": 0, "max_depth": 0, "expanded": 0, "truncated": False, "cached": False, "elapsed": 0.0}
+        if not graph.nodes:
+            return "", meta
+        
+        # Memoized per graph version, so this is O(1) between graph updates
+        b = self._configure_traversal(graph)
+        if delta is None:
+            delta = self._determine_cognitive_depth(b)
+        meta["max_depth"] = delta
+        
+        anchor_nodes = self.identify_anchor_nodes(query, graph, entities=entities)
+        if not anchor_nodes:
+            self.linearize_stats = {}
+            meta["elapsed"] = time.perf_counter() - start
+            return "", meta
+        
+        cache = get_retrieval_cache(graph) if config.RETRIEVAL_CACHE_SIZE else None
+        key = (normalize_query(query), tuple(anchor_nodes), self.retrieval_engine, self.beam_width, self.kappa, delta)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                context, stats = cached
+                self.linearize_stats = dict(stats)
+                meta.update(depth=delta, cached=True, elapsed=time.perf_counter() - start)
+                return context, meta
+        
+        if self.retrieval_engine == "ppr":
+            context_subgraph, dependencies = self._ppr.context_subgraph(graph, anchor_nodes, deadline)
+            meta["expanded"] = self._ppr.stats["pushes"]
+            meta["truncated"] = self._ppr.stats["truncated"]
+            if not meta["truncated"]:
+                meta["depth"] = delta
+        else:
+            context_subgraph, dependencies = self._anytime_beam(graph, anchor_nodes, delta, deadline,
+                                                                max_expansions, meta)
+        
+        context = self._linearize_context(context_subgraph)
+        # A truncated context is only what this budget afforded; do not serve it to later queries
+        if cache is not None and not meta["truncated"]:
+            cache.put(key, (context, self.linearize_stats), dependencies)
+        meta["elapsed"] = time.perf_counter() - start
+        return context, meta
+    
+    def _anytime_beam(self, graph: nx.Graph, anchor_nodes: List[str], delta: int, deadline: float,
+                      max_expansions: int, meta: Dict) -> Tuple[nx.DiGraph, set]:
+        levels = {anchor: self._beam_levels(graph, anchor, delta) for anchor in dict.fromkeys(anchor_nodes)}
+        paths_by_anchor = {anchor: [] for anchor in levels}
+        durations = []
+        last_level_cost = 0.0
+        
+        for level in range(1, delta + 1):
+            over_time = deadline is not None and time.perf_counter() + last_level_cost > deadline
+            over_expansions = max_expansions is not None and meta["expanded"] >= max_expansions
+            if over_time or over_expansions:
+                meta["truncated"] = True
+                break
             
-        return all_paths
+            level_start = time.perf_counter()
+            stepped = 0
+            for anchor in list(levels):
+                if deadline is not None and stepped and time.perf_counter() > deadline:
+                    meta["truncated"] = True
+                    break
+                step = next(levels[anchor], None)
+                if step is None:
+                    # This anchor's beam is exhausted
+                    del levels[anchor]
+                    continue
+                paths, expanded = step
+                paths_by_anchor[anchor].extend(paths)
+                meta["expanded"] += expanded
+                stepped += 1
+            if stepped:
+                last_level_cost = time.perf_counter() - level_start
+                durations.append(last_level_cost / stepped)
+            if meta["truncated"] or not levels:
+                break
+            meta["depth"] = level
+        
+        self._observe_level_costs(durations)
+        
+        context_subgraph = nx.DiGraph()
+        path_nodes = set(anchor_nodes)
+        for anchor in anchor_nodes:
+            for path in paths_by_anchor[anchor]:
+                self._add_path_to_context(path, graph, context_subgraph)
+                path_nodes.update(path)
+        return context_subgraph, self._search_dependencies(graph, path_nodes)
     
     def _add_path_to_context(self, path: List[str], source_graph: nx.Graph, context_graph: nx.DiGraph):
         for i in range(len(path) - 1):
             u, v = path[i], path[i+1]
             if not context_graph.has_edge(u, v):
-                edge_data = source_graph.get_edge_data(u, v)
-                context_graph.add_edge(u, v, **edge_data)
+                edge_data = edge_attributes(source_graph, u, v)
+                # Paths arrive best-first per level, so insertion order ranks the edge
+                context_graph.add_edge(u, v, path_order=context_graph.number_of_edges(), **edge_data)
+    
+    def _rank_context_edges(self, graph: nx.DiGraph) -> list:
+        """Context edges ordered by a blend of path rank, edge weight and recency"""
+        edges = list(graph.edges(data=True))
+        w_path, w_weight, w_recency = config.CONTEXT_RANK_WEIGHTS
+        newest = max(data.get('last_updated', 0) for _, _, data in edges)
+        top_rank = max((data['rank_score'] for _, _, data in edges if 'rank_score' in data), default=0.0)
+        
+        ranked = []
+        for order, (u, v, data) in enumerate(edges):
+            if 'rank_score' in data and top_rank > 0:
+                path_score = data['rank_score'] / top_rank
+            else:
+                path_score = 1.0 - data.get('path_order', order) / len(edges)
+            weight = min(1.0, max(0.0, data.get('weight', 0.0)))
+            recency = np.exp(-config.GAMMA * (newest - data.get('last_updated', newest)))
+            score = w_path * path_score + w_weight * weight + w_recency * recency
+            ranked.append((-score, order, u, v, data))
+        ranked.sort(key=lambda item: item[:2])
+        return [(u, v, data) for _, _, u, v, data in ranked]
     
-    def _linearize_context(self, graph: nx.DiGraph) -> str:
+    def _linearize_context(self, graph: nx.DiGraph, token_budget: int = None) -> str:
+        """Emit the best-ranked distinct facts until the token budget is spent.
+        
+        Facts that repeat an earlier one after text normalization (or its mirror, for
+        symmetric predicates) are skipped; self.linearize_stats reports what was dropped.
+        """
+        if token_budget is None:
+            token_budget = config.CONTEXT_TOKEN_BUDGET
+        stats = {"facts": graph.number_of_edges(), "kept": 0, "duplicates": 0, "over_budget": 0, "tokens": 0}
+        self.linearize_stats = stats
+        if not stats["facts"]:
+            return "No relevant context found"
+        
+        seen = set()
         context_lines = []
-        for u, v, data in graph.edges(data=True):
-            context_lines.append(f"{u} --[{data.get('predicate', 'related to')}]-> {v}")
-        return "\n".join(context_lines) if context_lines else "No relevant context found"
\ No newline at end of file
+        for u, v, data in self._rank_context_edges(graph):
+            predicate = data.get('predicate', 'related to')
+            key = (clean_text(str(u)).lower(), clean_text(str(predicate)).lower(), clean_text(str(v)).lower())
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            if predicate in SYMMETRIC_PREDICATES:
+                seen.add((key[2], key[1], key[0]))
+            
+            line = f"{u} --[{predicate}]-> {v}"
+            cost = estimate_tokens(line) + 1  # newline
+            if token_budget and (stats["over_budget"] or stats["tokens"] + cost > token_budget):
+                stats["over_budget"] += 1
+                continue
+            context_lines.append(line)
+            stats["tokens"] += cost
+            stats["kept"] += 1
+        
+        return "\n".join(context_lines)
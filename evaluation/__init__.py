@@ -8,6 +8,9 @@ Comprehensive evaluation modules for assessing system performance:
 - coherence_eval: Assesses conversational consistency
 - robustness_eval: Tests contradiction handling
 - cognitive_load: Quantifies computational efficiency
+- engine_comparison: Compares beam search and PPR retrieval latency/recall
+- mock_llm: Local OpenAI-compatible server for exercising the LLM client
+- service_benchmark: Turns/second and latency of the multi-session service
 """
 
 from .long_range_eval import LongRangeEvaluator
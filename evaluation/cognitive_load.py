@@ -1,38 +1,75 @@
-import time
+import json
+import random
 import numpy as np
 from tqdm import tqdm
-from core import DynaGraphSystem
+from main import DynaGraphSystem
 
 class CognitiveLoadEvaluator:
     def __init__(self, conversation_dataset="long_conversations.json"):
         self.dataset = self.load_dataset(conversation_dataset)
     
     def load_dataset(self, path):
-        # Implement actual loading logic
-        return [["Message 1", "Message 2", ...] for _ in range(10)]
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self.generate_conversations(10, 12, path)
+    
+    def generate_conversations(self, num_conversations, turns, path=None):
+        """Conversations that keep revisiting the same people, so the graph grows denser turn by turn"""
+        people = ['Alex', 'Taylor', 'Jordan', 'Morgan', 'Casey', 'Riley']
+        cities = ['New York', 'London', 'Tokyo', 'Berlin', 'Lima']
+        jobs = ['doctor', 'engineer', 'teacher', 'chef', 'pilot']
+        hobbies = ['hiking', 'painting', 'cooking', 'chess', 'sailing']
+        templates = [
+            lambda: f"My friend {random.choice(people)} is a {random.choice(jobs)}.",
+            lambda: f"{random.choice(people)} moved to {random.choice(cities)} last year.",
+            lambda: f"{random.choice(people)} and {random.choice(people)} go {random.choice(hobbies)} together.",
+            lambda: f"{random.choice(people)} works with {random.choice(people)} in {random.choice(cities)}.",
+            lambda: f"Where does {random.choice(people)} live now?",
+            lambda: f"What does {random.choice(people)} do for a living?"
+        ]
+        conversations = [[random.choice(templates)() for _ in range(turns)] for _ in range(num_conversations)]
+        
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(conversations, f, indent=2)
+        return conversations
     
     def measure_efficiency(self, delta_values=(1, 2, 3, 4, 5)):
-        results = {}
-        for delta in delta_values:
-            latencies = []
-            memory_usages = []
+        """Retrieval latency per depth, from one pass over each conversation.
+        
+        Every turn runs a single beam search to max(delta_values) before the system
+        processes the message; the per-depth latency is what that depth alone costs.
+        """
+        latencies = {delta: [] for delta in delta_values}
+        memory_usages = []
+        
+        for conversation in tqdm(self.dataset, desc=f"Testing δ={tuple(delta_values)}"):
+            # Synchronous ingestion so every turn measures the graph it just built
+            system = DynaGraphSystem(async_ingestion=False)
+            totals = {delta: 0.0 for delta in delta_values}
             
-            for conversation in tqdm(self.dataset, desc=f"Testing δ={delta}"):
-                system = DynaGraphSystem()
-                start_time = time.perf_counter()
-                
-                for message in conversation:
-                    response = system.process_input(message, delta=delta)
-                    # Memory measurement would use resource tracking in real implementation
-                    memory_usages.append(len(system.knowledge_graph.graph.nodes))
+            for message in conversation:
+                system.retriever.retrieve_context_sweep(
+                    message, system.knowledge_graph.graph, delta_values
+                )
+                for delta, seconds in system.retriever.sweep_timings.items():
+                    totals[delta] += seconds
                 
-                end_time = time.perf_counter()
-                latencies.append(end_time - start_time)
+                response = system.process_input(message)
+                # Memory measurement would use resource tracking in real implementation
+                memory_usages.append(len(system.knowledge_graph.graph.nodes))
             
+            for delta in delta_values:
+                latencies[delta].append(totals[delta])
+        
+        results = {}
+        for delta in delta_values:
             results[delta] = {
-                "avg_latency": np.mean(latencies),
+                "avg_latency": np.mean(latencies[delta]),
                 "avg_memory_nodes": np.mean(memory_usages),
-                "efficiency_ratio": np.mean(memory_usages) / np.mean(latencies)
+                "efficiency_ratio": np.mean(memory_usages) / np.mean(latencies[delta])
             }
         
         return results
@@ -0,0 +1,60 @@
+import time
+import numpy as np
+from tqdm import tqdm
+from core.graph_manager import TemporalKnowledgeGraph
+from core.retriever import MultiScaleRetriever
+from evaluation.long_range_eval import LongRangeEvaluator
+
+class EngineComparisonEvaluator:
+    """Latency and recall of beam search vs. push PPR retrieval on the long-range test cases"""
+
+    def __init__(self, test_file="test_cases.json"):
+        self.long_range = LongRangeEvaluator(test_file)
+        self.constructor = self.long_range.constructor
+        self.retrievers = {
+            "beam": MultiScaleRetriever(retrieval_engine="beam"),
+            "ppr": MultiScaleRetriever(retrieval_engine="ppr")
+        }
+
+    def run_comparison(self):
+        latencies = {name: [] for name in self.retrievers}
+        hits = {name: 0 for name in self.retrievers}
+        fact_recall = []
+
+        for case in tqdm(self.long_range.test_cases, desc="Comparing engines"):
+            graph = TemporalKnowledgeGraph()
+            graph.update_many(case["background"], self.constructor)
+
+            contexts = {}
+            for name, retriever in self.retrievers.items():
+                start = time.perf_counter()
+                contexts[name] = retriever.retrieve_context(case["question"], graph.graph)
+                latencies[name].append(time.perf_counter() - start)
+                if case["expected"].lower() in contexts[name].lower():
+                    hits[name] += 1
+
+            # Share of beam-search facts that PPR also retrieves
+            beam_facts = set(contexts["beam"].splitlines())
+            if beam_facts:
+                fact_recall.append(len(beam_facts & set(contexts["ppr"].splitlines())) / len(beam_facts))
+
+        total = len(self.long_range.test_cases)
+        results = {}
+        for name in self.retrievers:
+            results[name] = {
+                "avg_latency": np.mean(latencies[name]) if latencies[name] else 0.0,
+                "p95_latency": np.percentile(latencies[name], 95) if latencies[name] else 0.0,
+                "answer_recall": hits[name] / total if total else 0.0
+            }
+        results["ppr"]["beam_fact_recall"] = np.mean(fact_recall) if fact_recall else 0.0
+        return results
+
+if __name__ == "__main__":
+    evaluator = EngineComparisonEvaluator()
+    results = evaluator.run_comparison()
+
+    print("\nRetrieval Engine Comparison:")
+    print("Engine | Avg Latency (ms) | p95 Latency (ms) | Answer Recall")
+    for name, data in results.items():
+        print(f"{name:6} | {data['avg_latency'] * 1000:16.3f} | {data['p95_latency'] * 1000:16.3f} | {data['answer_recall']:.3f}")
+    print(f"PPR recall of beam-search facts: {results['ppr']['beam_fact_recall']:.3f}")
@@ -47,17 +47,17 @@ class LongRangeEvaluator:
         for case in tqdm(self.test_cases, desc="Evaluating"):
             graph = TemporalKnowledgeGraph()
             
-            # Inject background information
-            for info in case["background"]:
-                graph.update(info, self.constructor)
+            # Inject background information (one batched extraction call)
+            graph.update_many(case["background"], self.constructor)
             
-            # Ask question with different delta values
+            # Ask question with different delta values (one search to the deepest delta)
+            contexts = self.retriever.retrieve_context_sweep(
+                case["question"], 
+                graph.graph, 
+                delta_values
+            )
             for delta in delta_values:
-                context = self.retriever.retrieve_context(
-                    case["question"], 
-                    graph.graph, 
-                    delta=delta
-                )
+                context = contexts[delta]
                 
                 # Simple answer extraction (in real system would use LLM)
                 answer_found = case["expected"].lower() in context.lower()
@@ -0,0 +1,165 @@
+"""
+Local OpenAI-compatible chat-completions server for exercising the LLM client
+without network access: fixed latency, injected rate limits, word-by-word
+streaming, and counters for requests, connections and peak concurrency.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops SYNs when many clients connect at once
+    request_queue_size = 1024
+
+def echo_reply(messages: List[Dict]) -> str:
+    return f"echo: {messages[-1]['content'] if messages else ''}"
+
+class MockLLMServer:
+    """Serves POST {base}/chat/completions on 127.0.0.1 in a background thread.
+
+    Usage:
+        with MockLLMServer(latency=0.05, rate_limit_every=10) as server:
+            client = LLMClient(base_url=server.base_url, api_key="test")
+    """
+
+    def __init__(self, reply: Callable[[List[Dict]], str] = echo_reply, latency: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 0.0, chunk_delay: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+        self.requests = 0
+        self.connections = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+            # Headers and body go out as separate writes; without TCP_NODELAY the body waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict, headers: Dict = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, chunks):
+                # Server-sent events over chunked transfer encoding, so the connection stays reusable
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    event = f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(server.chunk_delay)
+                done = b"data: [DONE]\n\n"
+                self.wfile.write(f"{len(done):x}\r\n".encode("ascii") + done + b"\r\n0\r\n\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                with server._lock:
+                    server.requests += 1
+                    limited = server.rate_limit_every and server.requests % server.rate_limit_every == 0
+                    if limited:
+                        server.rate_limited += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if limited:
+                        self._send_json(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                                        {"Retry-After": str(server.retry_after)})
+                        return
+                    time.sleep(server.latency)
+                    if request.get("stream"):
+                        self._send_stream(server.stream_chunks(request))
+                    else:
+                        self._send_json(200, server.completion(request))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
+
+    def completion(self, request: Dict) -> Dict:
+        content = self.reply(request.get("messages", []))
+        return {
+            "id": f"mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    def stream_chunks(self, request: Dict):
+        """chat.completion.chunk events carrying the reply one word at a time"""
+        content = self.reply(request.get("messages", []))
+        words = content.split(" ")
+        base = {
+            "id": f"mock-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock")
+        }
+        for i, word in enumerate(words):
+            piece = word if i == 0 else " " + word
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
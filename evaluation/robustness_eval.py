@@ -22,11 +22,8 @@ class RobustnessEvaluator:
             graph = TemporalKnowledgeGraph()
             constructor = TemporalKnowledgeConstructor()
             
-            # Inject first fact
-            graph.update(case["fact1"], constructor)
-            
-            # Inject contradictory fact
-            graph.update(case["fact2"], constructor)
+            # Inject the first fact, then the contradictory one, as consecutive turns
+            graph.update_many([case["fact1"], case["fact2"]], constructor)
             
             # Check if system detects contradiction
             detected = self.detect_contradiction(graph, case["fact2"])
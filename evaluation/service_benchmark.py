@@ -0,0 +1,99 @@
+import re
+import json
+import time
+import asyncio
+import tempfile
+import numpy as np
+from typing import Dict, List
+from evaluation.mock_llm import MockLLMServer
+from service import SessionService
+from utils.llm_client import LLMClient
+
+_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+_PLACES = ["Paris", "Berlin", "Tokyo", "Lima", "Oslo", "Cairo", "Quito", "Hanoi"]
+
+def triplet_reply(messages: List[Dict]) -> str:
+    """Mock model: JSON triplets for extraction prompts, a short answer otherwise"""
+    prompt = messages[-1]["content"] if messages else ""
+    if "Extract key facts" not in prompt:
+        return "Noted, I will remember that for later."
+    text = re.search(r'Text: "(.*?)"\n', prompt, re.S)
+    words = re.findall(r"\b[A-Z][a-z]+\b", text.group(1) if text else "")
+    triplets = [[s, "related-to", o] for s, o in zip(words, words[1:])]
+    return json.dumps({"triplets": triplets})
+
+class ServiceBenchmark:
+    """Turns/second and response latency of SessionService against the mock LLM server.
+
+    `sessions` conversations of `turns` messages each are driven with at most
+    `concurrency` turns in flight; a session's messages are sent in order. With
+    max_active below `sessions`, the run also exercises eviction and recovery.
+    """
+
+    def __init__(self, sessions=1000, turns=3, concurrency=256, latency=0.05, max_active=256, workers=8):
+        self.sessions = sessions
+        self.turns = turns
+        self.concurrency = concurrency
+        self.latency = latency
+        self.max_active = max_active
+        self.workers = workers
+
+    def message(self, session: int, turn: int) -> str:
+        name = _NAMES[(session + turn) % len(_NAMES)]
+        place = _PLACES[(session * 3 + turn) % len(_PLACES)]
+        return f"{name} travelled to {place} with {_NAMES[session % len(_NAMES)]}."
+
+    async def _run(self, service: SessionService) -> Dict:
+        slots = asyncio.Semaphore(self.concurrency)
+        latencies = []
+
+        async def conversation(session: int):
+            for turn in range(self.turns):
+                async with slots:
+                    start = time.perf_counter()
+                    await service.turn(f"s{session}", self.message(session, turn))
+                    latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(i) for i in range(self.sessions)))
+        answered = time.perf_counter() - start
+        await service.drain()
+        ingested = time.perf_counter() - start
+        stats = service.stats()
+        await service.close()
+
+        total = self.sessions * self.turns
+        return {
+            "turns": total,
+            "turns_per_second": total / answered,
+            "ingested_turns_per_second": total / ingested,
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p99": float(np.percentile(latencies, 99)),
+            "loaded": stats["loaded"],
+            "evicted": stats["evicted"],
+            "errors": stats["errors"] + stats["ingestion_errors"]
+        }
+
+    def run(self) -> Dict:
+        with MockLLMServer(reply=triplet_reply, latency=self.latency) as server, \
+                tempfile.TemporaryDirectory() as store_dir:
+            llm = LLMClient(base_url=server.base_url, api_key="test", max_concurrency=self.concurrency)
+            service = SessionService(store_dir=store_dir, max_active=self.max_active,
+                                     idle_timeout=0, workers=self.workers, llm=llm)
+            results = asyncio.run(self._run(service))
+            llm.close()
+            results["llm_requests"] = server.requests
+            results["llm_connections"] = server.connections
+        return results
+
+if __name__ == "__main__":
+    benchmark = ServiceBenchmark()
+    results = benchmark.run()
+
+    print("\nMulti-session Service Benchmark:")
+    print(f"Sessions: {benchmark.sessions} x {benchmark.turns} turns, {benchmark.concurrency} in flight, "
+          f"{benchmark.max_active} active at most")
+    print(f"Answered: {results['turns_per_second']:.1f} turns/s | Ingested: {results['ingested_turns_per_second']:.1f} turns/s")
+    print(f"Latency p50 {results['latency_p50'] * 1000:.1f} ms | p99 {results['latency_p99'] * 1000:.1f} ms")
+    print(f"Sessions loaded {results['loaded']}, evicted {results['evicted']}, errors {results['errors']}")
+    print(f"LLM requests {results['llm_requests']} over {results['llm_connections']} connections")
@@ -1,15 +1,24 @@
+import time
+from typing import Iterator
 import networkx as nx
 import matplotlib.pyplot as plt
 from core.constructor import TemporalKnowledgeConstructor
 from core.retriever import MultiScaleRetriever
 from core.consolidator import MemoryConsolidator
 from core.graph_manager import TemporalKnowledgeGraph
-import openai
+from core.ingestion import IngestionWorker
+from utils.llm_client import get_llm_client
+from utils.text_processing import estimate_tokens
 from config import DynaGraphConfig as config
 
 class DynaGraphSystem:
-    def __init__(self):
-        self.constructor = TemporalKnowledgeConstructor(
+    def __init__(self, async_ingestion=config.ASYNC_INGESTION, wait_policy=config.INGESTION_WAIT_POLICY,
+                 store_path=config.GRAPH_STORE_PATH, constructor=None,
+                 retrieval_time_budget=config.RETRIEVAL_TIME_BUDGET):
+        if wait_policy not in ("dependent", "always", "never"):
+            raise ValueError(f"Unknown ingestion wait policy '{wait_policy}', expected 'dependent', 'always' or 'never'")
+        # The constructor holds no per-graph state, so many systems may share one
+        self.constructor = constructor or TemporalKnowledgeConstructor(
             alpha=config.ALPHA,
             gamma=config.GAMMA
         )
@@ -20,20 +29,82 @@ class DynaGraphSystem:
         self.consolidator = MemoryConsolidator(
             merge_threshold=config.MERGE_SIMILARITY
         )
-        self.knowledge_graph = TemporalKnowledgeGraph()
+        # Recovers the previous memory (snapshot + WAL tail) when store_path already holds one
+        self.knowledge_graph = TemporalKnowledgeGraph(store_path=store_path)
+        self.llm = get_llm_client()
         self.conversation_history = []
-        self.turn_count = 0
+        self.turn_count = self.knowledge_graph.turn_counter
+        # Ingestion and consolidation only affect later turns, so they run off the response path
+        self.wait_policy = wait_policy
+        self.ingestion = IngestionWorker() if async_ingestion else None
+        self.ingestion_waits = 0
+        self.stream_stats = {}
+        # With a budget, retrieval returns the deepest context found in time (see retrieval_stats)
+        self.retrieval_time_budget = retrieval_time_budget
+        self.retrieval_stats = {}
         
     def process_input(self, user_input: str) -> str:
         # Retrieve relevant context
-        context = self.retriever.retrieve_context(
-            user_input, 
-            self.knowledge_graph.graph
-        )
+        context = self._retrieve(user_input)
         
         # Generate response with context
         response = self._generate_response(user_input, context)
         
+        self._finish_turn(user_input, response)
+        return response
+    
+    def process_input_stream(self, user_input: str) -> Iterator[str]:
+        """Like process_input, but yields response chunks as the model produces them.
+        
+        History and graph ingestion use the complete response once the stream ends;
+        time-to-first-token and generation speed for the turn land in stream_stats.
+        """
+        context = self._retrieve(user_input)
+        
+        start = time.perf_counter()
+        first_token = None
+        chunks = []
+        for chunk in self.llm.stream(
+            model=config.MAIN_MODEL,
+            messages=[{"role": "user", "content": self._build_prompt(user_input, context)}]
+        ):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            chunks.append(chunk)
+            yield chunk
+        total = time.perf_counter() - start
+        
+        response = "".join(chunks).strip()
+        tokens = estimate_tokens(response)
+        generating = total - (first_token or total)
+        self.stream_stats = {
+            "turn": self.turn_count,
+            "time_to_first_token": first_token,
+            "total_time": total,
+            "chunks": len(chunks),
+            "tokens": tokens,
+            "tokens_per_second": tokens / generating if generating > 0 else 0.0
+        }
+        self._finish_turn(user_input, response)
+    
+    def _retrieve(self, user_input: str) -> str:
+        entities = self._await_dependencies(user_input)
+        with self.knowledge_graph.lock:
+            if self.retrieval_time_budget is None:
+                return self.retriever.retrieve_context(
+                    user_input, 
+                    self.knowledge_graph.graph,
+                    entities=entities
+                )
+            context, self.retrieval_stats = self.retriever.retrieve_context_anytime(
+                user_input,
+                self.knowledge_graph.graph,
+                time_budget=self.retrieval_time_budget,
+                entities=entities
+            )
+            return context
+    
+    def _finish_turn(self, user_input: str, response: str):
         # Update conversation history
         self.conversation_history.append({
             'user': user_input,
@@ -43,20 +114,82 @@ class DynaGraphSystem:
         
         # Update knowledge graph
         combined_text = f"User: {user_input}\nAssistant: {response}"
+        self.turn_count += 1
+        consolidate = self.turn_count % config.REWIRING_INTERVAL == 0
+        if self.ingestion is None:
+            self._ingest(combined_text, consolidate)
+        else:
+            self.ingestion.submit(self._ingest, combined_text, consolidate, text=combined_text)
+    
+    def _ingest(self, text: str, consolidate: bool):
         self.knowledge_graph.update(
-            combined_text, 
+            text, 
             self.constructor
         )
-        self.turn_count += 1
         
         # Periodic consolidation
-        if self.turn_count % config.REWIRING_INTERVAL == 0:
+        if consolidate:
             self.knowledge_graph.consolidate(self.consolidator)
-            
-        return response
+    
+    def _await_dependencies(self, query: str):
+        """Apply the wait policy before reading the graph for `query`.
+        
+        "dependent" waits up to the last pending turn whose text mentions one of the
+        query's entities, and for every pending turn when NER finds none (a follow-up
+        such as "what about him?" most likely refers to them); "always" waits for
+        every pending turn; "never" reads the
+        graph as it is. Returns the query's entities when the policy extracted them,
+        so retrieval does not run NER a second time; None otherwise.
+        """
+        if self.ingestion is None or self.wait_policy == "never" or not self.ingestion.depth:
+            return None
+        entities = None
+        if self.wait_policy == "always":
+            seq = self.ingestion.submitted
+        else:
+            entities = self.retriever.extract_entities([query])[0]
+            if entities:
+                seq = self.ingestion.pending_mentions(entities)
+                if seq is None:
+                    return entities
+            else:
+                seq = self.ingestion.submitted
+        self.ingestion_waits += 1
+        self.ingestion.wait(seq, timeout=config.INGESTION_WAIT_TIMEOUT)
+        return entities
+    
+    def flush(self, timeout=None) -> bool:
+        """Block until every submitted turn has been ingested"""
+        return True if self.ingestion is None else self.ingestion.wait(timeout=timeout)
+    
+    def ingestion_stats(self) -> dict:
+        """Queue depth and lag of background ingestion"""
+        if self.ingestion is None:
+            return {"depth": 0, "lag": 0.0, "waits": 0}
+        return {**self.ingestion.stats(), "waits": self.ingestion_waits}
+    
+    def close(self):
+        """Finish pending ingestion, stop the background worker and close the graph store"""
+        if self.ingestion is not None:
+            self.ingestion.close()
+        self.knowledge_graph.close()
     
     def _generate_response(self, user_input: str, context: str) -> str:
-        prompt = f"""
+        response = self.llm.complete(
+            model=config.MAIN_MODEL,
+            messages=[{"role": "user", "content": self._build_prompt(user_input, context)}]
+        )
+        return response.choices[0].message.content.strip()
+    
+    async def _agenerate_response(self, user_input: str, context: str) -> str:
+        response = await self.llm.acomplete(
+            model=config.MAIN_MODEL,
+            messages=[{"role": "user", "content": self._build_prompt(user_input, context)}]
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _build_prompt(self, user_input: str, context: str) -> str:
+        return f"""
         [LONG-TERM CONTEXT]
         {context}
         
@@ -68,13 +201,6 @@ class DynaGraphSystem:
         
         [ASSISTANT RESPONSE]
         """
-        
-        client = openai.OpenAI(base_url=config.API_BASE_URL, api_key=config.API_KEY)
-        response = client.chat.completions.create(
-            model=config.MAIN_MODEL,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
     
     def _recent_history(self, window=3) -> str:
         recent = self.conversation_history[-window:]
@@ -85,7 +211,7 @@ class DynaGraphSystem:
 
     def visualize_graph(self):
         """Displays the current Knowledge Graph using Matplotlib"""
-        G = self.knowledge_graph.graph
+        G = self.knowledge_graph.as_networkx()
         if len(G.nodes) == 0:
             print("[System] The graph is currently empty.")
             return
@@ -119,14 +245,17 @@ if __name__ == "__main__":
     while True:
         user_input = input("\nUser: ")
         if user_input.lower() in ['exit', 'quit']:
+            system.close()
             break
             
         if user_input.lower() in ['visualize', 'voir graph', 'voir', 'show graph']:
+            system.flush()
             system.visualize_graph()
             continue
             
         if user_input.lower() in ['consolider', 'consolidate']:
             print("\n[System] Performing memory consolidation...")
+            system.flush()
             old_size = len(system.knowledge_graph.graph.nodes)
             system.knowledge_graph.consolidate(system.consolidator)
             new_size = len(system.knowledge_graph.graph.nodes)
@@ -134,6 +263,12 @@ if __name__ == "__main__":
             system.visualize_graph()
             continue
             
-        response = system.process_input(user_input)
-        print(f"\nAssistant: {response}")
-        print(f"\n[System] Turn {system.turn_count} completed | Graph size: {len(system.knowledge_graph.graph.nodes)} nodes")
\ No newline at end of file
+        print("\nAssistant: ", end="", flush=True)
+        for chunk in system.process_input_stream(user_input):
+            print(chunk, end="", flush=True)
+        print()
+        stats = system.ingestion_stats()
+        print(f"\n[System] Turn {system.turn_count} completed | Graph size: {len(system.knowledge_graph.graph.nodes)} nodes"
+              f" | Ingestion queue: {stats['depth']} pending, lag {stats['lag']:.2f}s"
+              f" | First token {system.stream_stats['time_to_first_token'] or 0:.2f}s,"
+              f" {system.stream_stats['tokens_per_second']:.1f} tokens/s")
\ No newline at end of file
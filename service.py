@@ -0,0 +1,394 @@
+"""
+Multi-session DynaGraph service: many conversations in one asyncio process.
+
+Every session is a DynaGraphSystem with its own graph, retriever, consolidator
+and snapshot + WAL store under SERVICE_STORE_DIR/<session id>. The embedding
+model, spaCy pipeline, triplet constructor and pooled LLM client are shared.
+Turns of one session run strictly in order; different sessions run
+concurrently. Idle sessions are evicted to disk and recovered on their next
+turn; each answered turn is appended to the session's history.jsonl as soon
+as it is ingested.
+
+HTTP/JSON API (python service.py):
+    POST /sessions/<id>/turns   {"message": "..."} -> {"session", "turn", "response"}
+    GET  /sessions/<id>         turn count and graph size
+    POST /sessions/<id>/evict   flush the session to disk and drop it from memory
+    GET  /stats                 sessions, throughput and latency percentiles
+    GET  /health
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import numpy as np
+from config import DynaGraphConfig as config
+from core.constructor import TemporalKnowledgeConstructor
+from main import DynaGraphSystem
+from utils.llm_client import LLMClient, get_llm_client
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class _Session:
+    def __init__(self, session_id: str, system: DynaGraphSystem):
+        self.id = session_id
+        self.system = system
+        # Held from retrieval until the turn is ingested, so turns apply in arrival order
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.pending = 0  # turns waiting for or holding the lock; only idle sessions are evicted
+        self.closed = False
+
+class SessionService:
+    """Hosts DynaGraphSystem sessions on one event loop.
+
+    A turn takes the session lock, retrieves on the worker pool, generates with
+    the async LLM client and returns the response; ingestion then continues in
+    the background on its own pool and releases the lock when the graph is
+    updated and the turn appended to the history. Sessions not used for
+    `idle_timeout` seconds, or the least recently used idle ones beyond
+    `max_active`, are closed; their WAL and history are already durable.
+    """
+
+    def __init__(self, store_dir: str = config.SERVICE_STORE_DIR,
+                 max_active: int = config.SERVICE_MAX_ACTIVE_SESSIONS,
+                 idle_timeout: float = config.SERVICE_IDLE_TIMEOUT,
+                 workers: int = config.SERVICE_WORKERS,
+                 ingestion_workers: int = config.SERVICE_INGESTION_WORKERS, llm: Optional[LLMClient] = None):
+        self.store_dir = store_dir
+        self.max_active = max_active
+        self.idle_timeout = idle_timeout
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.llm = llm or get_llm_client()
+        self.constructor = TemporalKnowledgeConstructor(alpha=config.ALPHA, gamma=config.GAMMA)
+        self.constructor.llm = self.llm
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dynagraph-session")
+        self.ingestion_executor = ThreadPoolExecutor(max_workers=ingestion_workers,
+                                                     thread_name_prefix="dynagraph-ingestion")
+
+        self._sessions = OrderedDict()  # session id -> _Session, least recently used first
+        self._loading = {}  # session id -> future of a session being recovered
+        self._closing = {}  # session id -> task flushing an evicted session
+        self._claims = {}  # session id -> turns waiting for it to load
+        self._tasks = set()
+        self._reaper = None
+
+        self._latencies = deque(maxlen=config.LLM_LATENCY_WINDOW)
+        self._started = time.perf_counter()
+        self.counters = {"turns": 0, "errors": 0, "ingestion_errors": 0, "loaded": 0, "evicted": 0}
+
+    # --------------------------------------------------------------- sessions
+
+    def _path(self, session_id: str) -> str:
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id '{session_id}'")
+        return os.path.join(self.store_dir, session_id)
+
+    async def _session(self, session_id: str, claim: bool = False) -> _Session:
+        """The loaded session, recovering it first if needed; claim counts a turn as pending"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            if claim:
+                # Handed to the session when it is created, before capacity is enforced
+                self._claims[session_id] = self._claims.get(session_id, 0) + 1
+            loading = self._loading.get(session_id)
+            if loading is None:
+                loading = self._loading[session_id] = asyncio.ensure_future(self._load(session_id))
+                loading.add_done_callback(lambda _: self._loading.pop(session_id, None))
+            try:
+                session = await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                if claim:
+                    self._release_claim(session_id, loading)
+                raise
+        else:
+            self._sessions.move_to_end(session_id)
+            if claim:
+                session.pending += 1
+        session.last_active = time.monotonic()
+        return session
+
+    def _release_claim(self, session_id: str, loading: asyncio.Future):
+        """Withdraw the claim of a turn cancelled while its session was loading"""
+        if not loading.done():
+            self._claims[session_id] -= 1
+            if not self._claims[session_id]:
+                del self._claims[session_id]
+        elif not loading.cancelled() and loading.exception() is None:
+            # The claim was already handed to the session
+            loading.result().pending -= 1
+
+    async def _load(self, session_id: str) -> _Session:
+        path = self._path(session_id)
+        closing = self._closing.get(session_id)
+        if closing is not None:
+            await closing
+
+        def recover():
+            system = DynaGraphSystem(async_ingestion=False, store_path=path, constructor=self.constructor)
+            system.llm = self.llm
+            system.conversation_history = self._read_history(path)
+            return system
+
+        try:
+            system = await asyncio.get_running_loop().run_in_executor(self.executor, recover)
+        finally:
+            claims = self._claims.pop(session_id, 0)
+        session = _Session(session_id, system)
+        session.pending = claims
+        self._sessions[session_id] = session
+        self.counters["loaded"] += 1
+        self._evict_over_capacity()
+        return session
+
+    @staticmethod
+    def _read_history(path: str) -> list:
+        history = []
+        appended = os.path.join(path, "history.jsonl")
+        if os.path.exists(appended):
+            with open(appended) as f:
+                for line in f:
+                    try:
+                        history.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn last line of a crashed process
+        return history
+
+    def _evict_over_capacity(self):
+        excess = len(self._sessions) - self.max_active
+        if excess <= 0:
+            return
+        # Busy sessions are skipped; they become candidates once their turn is ingested
+        idle = [sid for sid, session in self._sessions.items() if not session.pending][:excess]
+        for session_id in idle:
+            self._schedule_eviction(session_id)
+
+    def _schedule_eviction(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        task = asyncio.ensure_future(self._close(session))
+        self._closing[session_id] = task
+        task.add_done_callback(lambda _: self._closing.pop(session_id, None))
+
+    async def _close(self, session: _Session):
+        async with session.lock:  # let an in-flight turn finish ingesting
+            await asyncio.get_running_loop().run_in_executor(self.executor, session.system.close)
+            session.closed = True
+        self.counters["evicted"] += 1
+
+    async def evict(self, session_id: str) -> bool:
+        """Flush one session to disk and drop it from memory; False if it was not loaded"""
+        self._path(session_id)
+        if session_id not in self._sessions:
+            return False
+        self._schedule_eviction(session_id)
+        closing = self._closing.get(session_id)
+        if closing is not None:
+            await closing
+        return True
+
+    async def _reap(self):
+        interval = max(1.0, self.idle_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id, session in list(self._sessions.items()):
+                if session.last_active < cutoff and not session.pending:
+                    self._schedule_eviction(session_id)
+
+    # ------------------------------------------------------------------ turns
+
+    async def turn(self, session_id: str, message: str) -> Dict:
+        """Answer one message; the graph update finishes after the response is returned"""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        owned = False
+        while not owned:
+            session = await self._session(session_id, claim=True)
+            try:
+                await session.lock.acquire()
+                if session.closed:
+                    # Evicted explicitly while this turn waited; the next lookup recovers it from disk
+                    session.lock.release()
+                else:
+                    owned = True
+            finally:
+                # Also reached when the turn is cancelled while queued for the lock
+                if not owned:
+                    session.pending -= 1
+        system = session.system
+
+        # The turn holds the lock and one pending count until _ingest takes them over
+        ingesting = False
+        try:
+            context = await loop.run_in_executor(self.executor, system._retrieve, message)
+            response = await system._agenerate_response(message, context)
+            turn = system.turn_count
+            task = asyncio.ensure_future(self._ingest(session, message, response))
+            ingesting = True
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            if not ingesting:
+                session.pending -= 1
+                session.lock.release()
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        session.last_active = time.monotonic()
+        self._latencies.append(time.perf_counter() - start)
+        self.counters["turns"] += 1
+        return {"session": session_id, "turn": turn, "response": response}
+
+    async def _ingest(self, session: _Session, message: str, response: str):
+        def finish():
+            try:
+                session.system._finish_turn(message, response)
+            finally:
+                # The turn joins the history before its graph update, even if that fails
+                with open(os.path.join(self._path(session.id), "history.jsonl"), "a") as f:
+                    f.write(json.dumps(session.system.conversation_history[-1]) + "\n")
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.ingestion_executor, finish)
+        except Exception:
+            self.counters["ingestion_errors"] += 1
+        finally:
+            session.pending -= 1
+            session.lock.release()
+            self._evict_over_capacity()
+
+    async def drain(self):
+        """Wait until every answered turn has been ingested"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def session_info(self, session_id: str) -> Dict:
+        session = await self._session(session_id)
+        graph = session.system.knowledge_graph.graph
+        return {
+            "session": session_id,
+            "turns": session.system.turn_count,
+            "nodes": graph.number_of_nodes(),
+            "edges": graph.number_of_edges(),
+            "pending_turns": session.pending
+        }
+
+    def stats(self) -> Dict:
+        latencies = np.asarray(self._latencies) if self._latencies else np.zeros(1)
+        elapsed = time.perf_counter() - self._started
+        return {
+            **self.counters,
+            "active_sessions": len(self._sessions),
+            "pending_ingestion": len(self._tasks),
+            "turns_per_second": self.counters["turns"] / elapsed if elapsed > 0 else 0.0,
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p99": float(np.percentile(latencies, 99)),
+            "llm": self.llm.stats()
+        }
+
+    def start(self):
+        """Begin evicting idle sessions; call from the running event loop"""
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = asyncio.ensure_future(self._reap())
+
+    async def close(self):
+        """Ingest pending turns, then flush every session to disk"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await self.drain()
+        for session_id in list(self._sessions):
+            self._schedule_eviction(session_id)
+        await asyncio.gather(*list(self._closing.values()), return_exceptions=True)
+        self.executor.shutdown(wait=True)
+        self.ingestion_executor.shutdown(wait=True)
+
+    # ------------------------------------------------------------------- HTTP
+
+    async def serve(self, host: str = config.SERVICE_HOST, port: int = config.SERVICE_PORT) -> asyncio.AbstractServer:
+        """Start the HTTP/JSON API (HTTP/1.1 with keep-alive) and the idle-session reaper"""
+        self.start()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+
+                status, payload = await self._route(method, path.split("?", 1)[0], body)
+                data = json.dumps(payload).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        parts = [part for part in path.split("/") if part]
+        try:
+            if method == "GET" and parts == ["health"]:
+                return 200, {"status": "ok"}
+            if method == "GET" and parts == ["stats"]:
+                return 200, self.stats()
+            if len(parts) >= 2 and parts[0] == "sessions":
+                session_id = parts[1]
+                self._path(session_id)
+                if method == "GET" and len(parts) == 2:
+                    return 200, await self.session_info(session_id)
+                if method == "POST" and parts[2:] == ["evict"]:
+                    return 200, {"session": session_id, "evicted": await self.evict(session_id)}
+                if method == "POST" and parts[2:] == ["turns"]:
+                    message = json.loads(body or b"{}").get("message")
+                    if not isinstance(message, str) or not message.strip():
+                        return 400, {"error": "expected a JSON body with a non-empty 'message'"}
+                    return 200, await self.turn(session_id, message)
+            return 404, {"error": f"no route for {method} {path}"}
+        except (ValueError, json.JSONDecodeError) as error:
+            return 400, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": repr(error)}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+async def _main():
+    service = SessionService()
+    server = await service.serve()
+    print(f"DynaGraph service listening on http://{config.SERVICE_HOST}:{config.SERVICE_PORT}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
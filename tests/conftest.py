@@ -0,0 +1,64 @@
+import os
+import re
+import sys
+import json
+import pytest
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.constructor import TemporalKnowledgeConstructor
+from core.retriever import MultiScaleRetriever
+from evaluation.mock_llm import MockLLMServer
+from utils.llm_client import LLMClient
+from utils.graph_utils import get_graph_versions
+
+def triplet_reply(messages):
+    """Extraction replies for `Subject predicate Object` sentences, one per line"""
+    prompt = messages[-1]["content"] if messages else ""
+    if "[1]" in prompt:
+        items = re.findall(r'\[(\d+)\] "(.*)"', prompt)
+        return json.dumps({"results": {key: _triplets(text) for key, text in items}})
+    text = re.search(r'Text: "(.*?)"\n', prompt, re.S)
+    return json.dumps({"triplets": _triplets(text.group(1) if text else "")})
+
+def _triplets(text):
+    return [line.split()[:3] for line in text.replace("\\n", "\n").splitlines() if len(line.split()) >= 3]
+
+@pytest.fixture
+def mock_llm():
+    with MockLLMServer(reply=triplet_reply) as server:
+        yield server
+
+@pytest.fixture
+def constructor(mock_llm):
+    """Constructor extracting from the mock server; no ontology, so no embedding model is loaded"""
+    constructor = TemporalKnowledgeConstructor()
+    constructor.llm = LLMClient(base_url=mock_llm.base_url, api_key="test", max_retries=0)
+    constructor.extraction_cache = None
+    constructor.core_concepts = []
+    yield constructor
+    constructor.llm.close()
+
+def capitalized_entities(queries):
+    """Stand-in for spaCy NER: capitalized words are the entities"""
+    return [re.findall(r"\b[A-Z][a-z]+\b", query) for query in queries]
+
+@pytest.fixture
+def facts_graph():
+    graph = nx.MultiDiGraph()
+    for u, p, v in [("Alice", "located-in", "Paris"), ("Paris", "part-of", "France"),
+                    ("Bob", "related-to", "Alice"), ("Bob", "located-in", "Berlin"),
+                    ("Berlin", "part-of", "Germany"), ("Carol", "related-to", "Bob")]:
+        graph.add_edge(u, v, predicate=p, weight=0.8, last_updated=1)
+    get_graph_versions(graph).touch(graph.nodes)
+    return graph
+
+@pytest.fixture
+def make_retriever(monkeypatch):
+    """MultiScaleRetriever factory whose NER is capitalized_entities"""
+    def make(**kwargs):
+        retriever = MultiScaleRetriever(**kwargs)
+        monkeypatch.setattr(retriever, "extract_entities", capitalized_entities)
+        return retriever
+    return make
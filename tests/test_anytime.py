@@ -0,0 +1,51 @@
+import random
+import networkx as nx
+import pytest
+from core.ppr import PushPPR
+from main import DynaGraphSystem
+
+@pytest.mark.parametrize("engine", ["beam", "ppr"])
+def test_unbounded_anytime_matches_and_shares_the_cache(make_retriever, facts_graph, engine):
+    retriever = make_retriever(retrieval_engine=engine)
+    context, meta = retriever.retrieve_context_anytime("Where is Bob?", facts_graph, time_budget=None, delta=3)
+    assert not meta["truncated"] and not meta["cached"]
+    assert context == retriever.retrieve_context("Where is Bob?", facts_graph, delta=3)
+    assert retriever.cache_stats(facts_graph)["hits"] == 1
+    
+    again, meta = retriever.retrieve_context_anytime("Where is Bob?", facts_graph, time_budget=None, delta=3)
+    assert again == context and meta["cached"] and meta["depth"] == 3
+
+def test_exhausted_budget_truncates_without_caching(make_retriever, facts_graph):
+    retriever = make_retriever()
+    context, meta = retriever.retrieve_context_anytime("Carol and Bob", facts_graph, time_budget=0.0, delta=3)
+    assert meta["truncated"] and meta["depth"] == 0 and meta["expanded"] == 0
+    assert retriever.cache_stats(facts_graph)["size"] == 0
+    
+    full, meta = retriever.retrieve_context_anytime("Carol and Bob", facts_graph, time_budget=None, delta=3)
+    assert meta["depth"] >= 1 and not meta["cached"] and full != context
+
+def test_expansion_cap_stops_between_levels(make_retriever, facts_graph):
+    retriever = make_retriever()
+    _, meta = retriever.retrieve_context_anytime("Carol", facts_graph, time_budget=None, max_expansions=1, delta=3)
+    assert meta["truncated"] and meta["depth"] == 1
+
+def test_ppr_push_stops_at_the_deadline():
+    rng = random.Random(0)
+    graph = nx.MultiDiGraph()
+    for _ in range(3000):
+        graph.add_edge(rng.randrange(500), rng.randrange(500), weight=rng.random())
+    ppr = PushPPR(epsilon=1e-6)
+    scores, _ = ppr.rank(graph, [0], deadline=0.0)
+    assert ppr.stats["truncated"] and ppr.stats["pushes"] == 63
+    complete, _ = ppr.rank(graph, [0])
+    assert not ppr.stats["truncated"] and sum(complete.values()) > sum(scores.values())
+
+def test_process_input_uses_the_time_budget(constructor, make_retriever, facts_graph):
+    system = DynaGraphSystem(async_ingestion=False, store_path=None, constructor=constructor,
+                             retrieval_time_budget=0.0)
+    system.retriever = make_retriever()
+    system.llm = constructor.llm
+    system.knowledge_graph.graph = facts_graph
+    system.process_input("Where is Carol?")
+    assert system.retrieval_stats["truncated"] and system.retrieval_stats["depth"] == 0
+    system.close()
@@ -0,0 +1,57 @@
+import re
+import json
+import pytest
+from core.extraction_cache import ExtractionCache
+from tests.conftest import triplet_reply
+
+TEXTS = ["Alice likes Paris", "Bob visits Rome", "Carol owns Dogs", "Dave reads Books"]
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.db"), max_bytes=1 << 20, read_only=False)
+    yield cache
+    cache.close()
+
+def batch_sizes_of(mock_llm, broken):
+    """Serve `broken(items)` for batch prompts that it returns a reply for; record every request's size"""
+    sizes = []
+    
+    def reply(messages):
+        items = re.findall(r'\[(\d+)\] "(.*)"', messages[-1]["content"])
+        sizes.append(len(items) or 1)
+        return (broken(items) if items else None) or triplet_reply(messages)
+    
+    mock_llm.reply = reply
+    return sizes
+
+@pytest.mark.parametrize("broken", [
+    lambda items: "{\"results\": {\"1\": [[" if len(items) > 1 else None,  # truncated JSON
+    lambda items: "not JSON at all" if len(items) > 1 else None
+])
+def test_unparsable_batch_is_split_down_to_single_texts(constructor, mock_llm, cache, broken):
+    constructor.extraction_cache = cache
+    sizes = batch_sizes_of(mock_llm, broken)
+    assert constructor.extract_triplets_many(TEXTS, batch_size=4) == [[t.split()] for t in TEXTS]
+    assert sizes == [4, 2, 1, 1, 2, 1, 1]
+    assert len(cache) == 4
+    assert all(constructor.extract_triplets(t) == [t.split()] for t in TEXTS)  # cached, well formed
+
+def test_batch_with_missing_items_retries_only_those(constructor, mock_llm, cache):
+    constructor.extraction_cache = cache
+    # The first batch answers only its first two ids
+    first = lambda items: json.dumps({"results": {k: [t.split()] for k, t in items[:2]}}) if len(items) == 4 else None
+    sizes = batch_sizes_of(mock_llm, first)
+    assert constructor.extract_triplets_many(TEXTS, batch_size=4) == [[t.split()] for t in TEXTS]
+    assert sizes == [4, 2]
+    assert len(cache) == 4
+
+def test_malformed_single_reply_after_split_is_not_cached(constructor, mock_llm, cache):
+    constructor.extraction_cache = cache
+    # Every batch fails, and so does the single-text prompt for Bob
+    batch_sizes_of(mock_llm, lambda items: "garbage" if len(items) > 1 else None)
+    reply = mock_llm.reply
+    mock_llm.reply = lambda messages: "garbage" if "Bob visits Rome" in messages[-1]["content"] \
+        and "[1]" not in messages[-1]["content"] else reply(messages)
+    results = constructor.extract_triplets_many(TEXTS[:2], batch_size=2)
+    assert results == [[TEXTS[0].split()], []]
+    assert len(cache) == 1
@@ -0,0 +1,80 @@
+import random
+import networkx as nx
+import pytest
+from core.compact_graph import CompactMultiDiGraph
+from core.retriever import MultiScaleRetriever
+from utils.graph_utils import get_graph_versions
+
+def random_graph(backend, n=60, m=180, seed=0):
+    rng = random.Random(seed)
+    graph = nx.MultiDiGraph() if backend == "networkx" else CompactMultiDiGraph()
+    for _ in range(m):
+        u, v = f"n{rng.randrange(n)}", f"n{rng.randrange(n)}"
+        if u != v:
+            graph.add_edge(u, v, predicate="related-to", weight=rng.uniform(0.05, 1.0), last_updated=0)
+    get_graph_versions(graph).touch(graph.nodes)
+    return graph
+
+def mutate(graph, rng):
+    """Add a few edges and drop a node, touching what changed as the constructor/consolidator do"""
+    nodes = list(graph.nodes)
+    touched = set()
+    for _ in range(3):
+        u, v = rng.choice(nodes), f"n{rng.randrange(len(nodes) + 10)}"
+        if u != v:
+            graph.add_edge(u, v, predicate="related-to", weight=rng.uniform(0.05, 1.0), last_updated=1)
+            touched.update((u, v))
+    victim = rng.choice(nodes)
+    if victim not in touched:
+        touched.update(graph.predecessors(victim))
+        touched.update(graph.successors(victim))
+        graph.remove_node(victim)
+        touched.add(victim)
+    get_graph_versions(graph).touch(touched)
+
+def searches(retriever, graph, depth=4):
+    return {start: retriever._beam_search(graph, start, depth) for start in sorted(graph.nodes)[:15]}
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_csr_matches_python_beam_search(backend):
+    graph = random_graph(backend)
+    python = MultiScaleRetriever(beam_width=4, engine="python")
+    csr = MultiScaleRetriever(beam_width=4, engine="csr")
+    assert searches(csr, graph) == searches(python, graph)
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_csr_patches_stay_equivalent(backend):
+    rng = random.Random(1)
+    graph = random_graph(backend)
+    python = MultiScaleRetriever(beam_width=4, engine="python")
+    csr = MultiScaleRetriever(beam_width=4, engine="csr")
+    searches(csr, graph)
+    snapshot = graph.graph["csr_snapshot"]
+    for _ in range(40):
+        mutate(graph, rng)
+        assert searches(csr, graph) == searches(python, graph)
+        assert snapshot.rebuilt_rows < len(graph)  # patched, not rebuilt
+
+def test_csr_compacts_dead_rows():
+    rng = random.Random(2)
+    graph = random_graph("networkx", n=40, m=120)
+    csr = MultiScaleRetriever(beam_width=3, engine="csr")
+    python = MultiScaleRetriever(beam_width=3, engine="python")
+    searches(csr, graph)
+    snapshot = graph.graph["csr_snapshot"]
+    while snapshot.compactions == 0:
+        mutate(graph, rng)
+        csr._beam_search(graph, next(iter(graph.nodes)), 2)
+        assert snapshot.used - snapshot.live <= max(1024, snapshot.live)
+    assert snapshot.used == snapshot.live
+    assert searches(csr, graph) == searches(python, graph)
+
+def test_branching_factor_is_memoized_per_version():
+    graph = random_graph("networkx")
+    retriever = MultiScaleRetriever(engine="python")
+    b = retriever._configure_traversal(graph)
+    graph.add_edge("n0", "n1", weight=0.5)  # not touched yet: the cached value stands
+    assert retriever._configure_traversal(graph) == b
+    get_graph_versions(graph).touch(["n0", "n1"])
+    degrees = [d for _, d in graph.degree()]
+    assert retriever._configure_traversal(graph) == pytest.approx(sum(degrees) / len(degrees))
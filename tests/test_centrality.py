@@ -0,0 +1,30 @@
+import random
+import networkx as nx
+import pytest
+from core.centrality import CentralityEngine
+
+def random_graph(n=300, m=900, seed=0):
+    rng = random.Random(seed)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(n), last_updated=0)
+    for _ in range(m):
+        graph.add_edge(rng.randrange(n), rng.randrange(n), weight=1.0)
+    return graph
+
+def test_sampled_matches_exact_when_samples_cover_the_graph():
+    graph = random_graph(n=100, m=300)
+    engine = CentralityEngine(mode="sampled", samples=100, seed=0)
+    assert engine.compute(graph) == pytest.approx(nx.betweenness_centrality(graph))
+    assert engine.stats["nodes"] == 100
+
+def test_tradeoff_report_scores_each_sample_size():
+    graph = random_graph()
+    report = CentralityEngine(seed=0).tradeoff_report(graph, sample_sizes=(32, 128, 512))
+
+    assert set(report) == {"exact", "sampled_k32", "sampled_k128"}
+    assert report["exact"]["max_error"] == 0.0 and report["exact"]["prune_agreement"] == 1.0
+    assert report["sampled_k128"]["mean_error"] < report["sampled_k32"]["mean_error"]
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        CentralityEngine(mode="incremental")
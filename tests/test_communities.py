@@ -0,0 +1,56 @@
+import networkx as nx
+from core.communities import CommunityDetector
+from utils.graph_utils import to_weighted_undirected
+
+def cliques(groups, turn=1):
+    graph = nx.MultiDiGraph()
+    for group in groups:
+        for i, u in enumerate(group):
+            for v in group[i + 1:]:
+                graph.add_edge(u, v, weight=1.0)
+    for node in graph:
+        graph.nodes[node]['last_updated'] = turn
+    return graph
+
+def chain(groups):
+    """Cliques joined in a ring by one weak edge each"""
+    graph = cliques(groups)
+    for a, b in zip(groups, groups[1:] + groups[:1]):
+        graph.add_edge(a[0], b[0], weight=0.1, last_updated=1)
+    return graph
+
+GROUPS = [[f"{name}{i}" for i in range(6)] for name in "abcd"]
+REGROUPED = [[group[i] for group in GROUPS] for i in range(6)]
+
+def detect(detector, graph):
+    return detector.detect(graph, to_weighted_undirected(graph))
+
+def test_new_node_joins_its_neighbours_without_a_full_run():
+    graph = chain(GROUPS)
+    detector = CommunityDetector(seed=0)
+    before = detect(detector, graph)
+    assert detector.stats["mode"] == "full"
+
+    for member in GROUPS[1][:4]:
+        graph.add_edge("new", member, weight=1.0)
+    graph.nodes["new"]['last_updated'] = 2
+    after = detect(detector, graph)
+
+    assert detector.stats["mode"] == "incremental"
+    assert 0 < detector.stats["reoptimized"] < len(graph)
+    assert after["new"] == after["b0"]
+    assert all(after[node] == before[node] for node in before)
+
+def test_drift_beyond_the_threshold_falls_back_to_a_full_run():
+    detector = CommunityDetector(seed=0)
+    detect(detector, chain(GROUPS))
+    # Same nodes and stamps, so nothing looks dirty, but the cliques are regrouped
+    partition = detect(detector, chain(REGROUPED))
+    assert detector.stats["mode"] == "full"
+    assert partition["a0"] == partition["b0"] != partition["a1"]
+
+def test_drift_within_the_threshold_keeps_the_warm_partition():
+    detector = CommunityDetector(seed=0, drift_threshold=1.0)
+    before = detect(detector, chain(GROUPS))
+    assert detect(detector, chain(REGROUPED)) == before
+    assert detector.stats["mode"] == "incremental" and detector.stats["reoptimized"] == 0
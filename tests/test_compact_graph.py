@@ -0,0 +1,18 @@
+import networkx as nx
+from core.compact_graph import CompactMultiDiGraph
+from utils.graph_utils import get_graph_versions
+
+def test_conversions_do_not_share_graph_state():
+    source = nx.MultiDiGraph(name="memory")
+    source.add_edge("Alice", "Paris", predicate="located-in", weight=0.5)
+    versions = get_graph_versions(source)
+
+    compact = CompactMultiDiGraph.from_networkx(source)
+    assert compact.graph == {"name": "memory"}
+    get_graph_versions(compact).touch(["Alice"])
+    compact.graph["name"] = "copy"
+    assert source.graph["versions"] is versions and source.graph["name"] == "memory"
+
+    back = compact.to_networkx()
+    assert back.graph == {"name": "copy"}
+    assert get_graph_versions(back) is not get_graph_versions(compact)
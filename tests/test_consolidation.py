@@ -0,0 +1,103 @@
+import hashlib
+import numpy as np
+import networkx as nx
+from core.compact_graph import CompactMultiDiGraph
+from core.consolidator import MemoryConsolidator
+from core.graph_manager import TemporalKnowledgeGraph
+from utils.embedding_utils import EmbeddingService
+
+class CaseFoldModel:
+    """Stand-in for the sentence-transformers model: names equal up to case embed identically"""
+
+    def encode(self, texts):
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.lower().encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(256).astype(np.float32)
+            rows.append(vector / np.linalg.norm(vector))
+        return np.stack(rows)
+
+    def get_sentence_embedding_dimension(self):
+        return 256
+
+def memory_graph():
+    graph = nx.MultiDiGraph()
+    facts = [("Alice", "located-in", "Paris", 18), ("alice", "located-in", "Paris", 15),
+             ("alice", "works-at", "Acme", 16), ("Bob", "related-to", "Alice", 17),
+             ("Paris", "part-of", "France", 12), ("Carol", "related-to", "Bob", 19),
+             ("Dave", "located-in", "Lima", 2), ("Erin", "related-to", "Dave", 3)]
+    for u, p, v, turn in facts:
+        graph.add_edge(u, v, predicate=p, weight=turn / 20, last_updated=turn, archived_history=[])
+    for node in graph:
+        graph.nodes[node]['last_updated'] = max(t for u, _, v, t in facts if node in (u, v))
+    return graph
+
+def consolidated(backend):
+    kg = TemporalKnowledgeGraph(backend=backend)
+    graph = memory_graph()
+    kg.graph = graph if backend == "networkx" else CompactMultiDiGraph.from_networkx(graph)
+    kg.turn_counter = 20
+    consolidator = MemoryConsolidator(centrality_mode="exact")
+    consolidator.embedding_model = EmbeddingService(cache_path=None)
+    consolidator.embedding_model._model = CaseFoldModel()
+    kg.consolidate(consolidator)
+    return kg, consolidator
+
+def facts(graph):
+    return sorted((u, v, d['predicate'], round(d['weight'], 4), d['last_updated'], tuple(d['archived_history']))
+                  for u, v, d in graph.edges(data=True))
+
+def test_compact_consolidation_matches_networkx():
+    reference, consolidator = consolidated("networkx")
+    compact, _ = consolidated("compact")
+
+    assert isinstance(compact.graph, CompactMultiDiGraph)
+    assert consolidator.merge_stats["merged_nodes"] == 1
+    assert {"Dave", "Erin", "Lima", "alice"}.isdisjoint(reference.graph)
+    assert sorted(compact.graph) == sorted(reference.graph)
+    assert facts(compact.graph) == facts(reference.graph)
+    # The duplicate located-in fact was folded into one edge on both backends
+    assert ("Alice", "Paris", "located-in", 0.9, 18, ()) in facts(compact.graph)
+    for node in reference.graph:
+        assert dict(compact.graph.nodes[node]) == reference.graph.nodes[node]
+
+def test_topology_keeps_structure_for_centrality():
+    graph = CompactMultiDiGraph.from_networkx(memory_graph())
+    graph.add_edge("Alice", "Paris", predicate="visited")
+    topology = graph.topology()
+
+    assert set(topology.edges) == {(u, v) for u, v in graph.edges}
+    assert topology.nodes["Carol"] == {'last_updated': 19}
+    assert nx.betweenness_centrality(topology) == nx.betweenness_centrality(graph.to_networkx())
+
+def naive_super_graph(graph, partition, min_weight=0.3):
+    communities = {}
+    for node in partition:
+        communities.setdefault(partition[node], []).append(node)
+    super_nodes = {}
+    for comm_id, members in communities.items():
+        internal = graph.subgraph(members)
+        super_nodes[comm_id] = max(members, key=lambda node: (internal.degree(node), -members.index(node)))
+
+    between = {}
+    for u, v in set(graph.edges()):
+        if partition[u] != partition[v]:
+            weights = [d['weight'] for d in graph.get_edge_data(u, v).values()]
+            between.setdefault((partition[u], partition[v]), []).append(sum(weights) / len(weights))
+    edges = {(super_nodes[c1], super_nodes[c2]): round(np.mean(w), 6)
+             for (c1, c2), w in between.items() if np.mean(w) > min_weight}
+    return {super_nodes[c]: sorted(m) for c, m in communities.items()}, edges
+
+def test_community_abstraction_matches_a_naive_pass():
+    rng = np.random.default_rng(4)
+    graph = nx.MultiDiGraph()
+    for _ in range(400):
+        u, v = rng.integers(60, size=2)
+        graph.add_edge(f"n{u}", f"n{v}", weight=float(rng.random()))
+    partition = {node: int(node[1:]) % 7 for node in graph}
+
+    super_graph = MemoryConsolidator()._abstract_communities(graph, partition, min_weight=0.5)
+    nodes, edges = naive_super_graph(graph, partition, min_weight=0.5)
+    assert {node: sorted(d['community']) for node, d in super_graph.nodes(data=True)} == nodes
+    assert {(u, v): round(w, 6) for u, v, w in super_graph.edges(data='weight')} == edges
+    assert 0 < len(edges) < 42
@@ -0,0 +1,59 @@
+import hashlib
+import numpy as np
+import pytest
+
+class CountingModel:
+    """Deterministic stand-in for the embedding service that records what it encodes"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+            rows.append(np.random.default_rng(seed).standard_normal(16))
+        return np.stack(rows)
+
+@pytest.fixture
+def mapper(constructor):
+    constructor.core_concepts = constructor._load_core_concepts()
+    constructor.semantic_model = CountingModel()
+    return constructor
+
+def test_repeated_predicates_are_cache_hits(mapper):
+    model = mapper.semantic_model
+    first = mapper.map_predicates_to_ontology(["likes", "lives in", "likes"])
+    assert model.calls == [mapper.core_concepts, ["likes", "lives in"]]  # ontology once, each miss once
+    assert first[0] == first[2]
+    
+    assert mapper.map_predicates_to_ontology(["lives in", "likes"]) == [first[1], first[0]]
+    assert mapper.map_predicate_to_ontology("likes") == first[0]
+    assert len(model.calls) == 2
+
+def test_batched_mapping_matches_one_at_a_time(mapper):
+    predicates = ["likes", "is-a", "visited", "part of", "likes", "owns"] + mapper.core_concepts[:4]
+    one_by_one = [mapper.map_predicate_to_ontology(p) for p in predicates]
+    mapper._predicate_cache.clear()
+    batched = mapper.map_predicates_to_ontology(predicates)
+    
+    assert [m for m, _ in batched] == [m for m, _ in one_by_one]
+    assert [s for _, s in batched] == pytest.approx([s for _, s in one_by_one], abs=1e-5)
+    assert batched[1] == ("is-a", pytest.approx(1.0, abs=1e-5))
+
+def test_predicate_cache_is_a_bounded_lru(mapper):
+    mapper.predicate_cache_size = 2
+    mapper.map_predicates_to_ontology(["a", "b"])
+    mapper.map_predicates_to_ontology(["a"])  # a becomes the most recent
+    mapper.map_predicates_to_ontology(["c"])
+    assert list(mapper._predicate_cache) == ["a", "c"]
+    
+    calls = len(mapper.semantic_model.calls)
+    mapper.map_predicates_to_ontology(["a", "b"])
+    assert mapper.semantic_model.calls[calls:] == [["b"]]
+
+def test_ontology_edit_clears_the_mapping_cache(mapper):
+    mapper.map_predicates_to_ontology(["likes"])
+    mapper.core_concepts = mapper.core_concepts + ["likes"]
+    assert mapper.map_predicate_to_ontology("likes") == ("likes", pytest.approx(1.0, abs=1e-5))
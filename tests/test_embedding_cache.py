@@ -0,0 +1,72 @@
+import os
+import hashlib
+import numpy as np
+from utils.embedding_utils import EmbeddingService
+
+class HashModel:
+    """Deterministic stand-in for the sentence-transformers model"""
+    
+    def __init__(self):
+        self.encoded = 0
+    
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.stack([np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8)[:8].astype(np.float32)
+                         for t in texts])
+    
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+def service(**kwargs):
+    service = EmbeddingService(**kwargs)
+    service._model = HashModel()
+    return service
+
+def test_memory_cache_is_an_lru():
+    embeddings = service(cache_path=None, memory_size=3)
+    embeddings.encode(["a", "b", "c"])
+    embeddings.encode(["a"])  # a is now the most recent
+    embeddings.encode(["d", "e"])
+    assert embeddings.stats()["cached"] == 3 and embeddings.evictions == 2
+    
+    encoded = embeddings.model.encoded
+    embeddings.encode(["a", "e"])
+    assert embeddings.model.encoded == encoded
+    embeddings.encode(["b"])
+    assert embeddings.model.encoded == encoded + 1
+
+def test_one_call_larger_than_the_cache():
+    embeddings = service(cache_path=None, memory_size=2)
+    texts = ["a", "b", "c", "d", "a"]
+    assert np.array_equal(embeddings.encode(texts), HashModel().encode(texts))
+    assert embeddings.stats()["cached"] == 2
+
+def test_flushes_append_to_the_cache_file(tmp_path):
+    path = str(tmp_path / "embeddings")
+    embeddings = service(cache_path=path, flush_rows=2)
+    embeddings.encode(["a", "b"])  # first flush writes the file
+    inode = os.stat(f"{path}.npy").st_ino
+    embeddings.encode(["c", "d", "e"])
+    embeddings.save()
+    assert os.stat(f"{path}.npy").st_ino == inode  # appended, not replaced
+    
+    reloaded = service(cache_path=path)
+    assert np.load(f"{path}.npy").shape == (5, 8)
+    texts = ["e", "a", "c", "d", "b"]
+    assert np.array_equal(reloaded.encode(texts), HashModel().encode(texts))
+    assert reloaded.model.encoded == 0 and reloaded.hits == 5
+
+def test_torn_keys_tail_is_dropped_before_appending(tmp_path):
+    path = str(tmp_path / "embeddings")
+    embeddings = service(cache_path=path)
+    embeddings.encode(["a", "b"])
+    embeddings.save()
+    with open(f"{path}.keys", "a") as f:
+        f.write("0" * 40 + "\n")  # a key whose row never reached the file
+    
+    reloaded = service(cache_path=path)
+    reloaded.encode(["c"])
+    reloaded.save()
+    again = service(cache_path=path)
+    assert np.array_equal(again.encode(["a", "b", "c"]), HashModel().encode(["a", "b", "c"]))
+    assert again.model.encoded == 0
@@ -0,0 +1,97 @@
+import pytest
+import core.constructor as constructor_module
+from config import DynaGraphConfig as config
+from core.extraction_cache import ExtractionCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.db"), max_bytes=1 << 20, read_only=False)
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def cached_constructor(constructor, cache):
+    constructor.extraction_cache = cache
+    return constructor
+
+def test_second_extraction_is_a_hit(cached_constructor, mock_llm, cache):
+    assert cached_constructor.extract_triplets("Alice likes Paris") == [["Alice", "likes", "Paris"]]
+    requests = mock_llm.requests
+    assert cached_constructor.extract_triplets("Alice likes Paris") == [["Alice", "likes", "Paris"]]
+    assert mock_llm.requests == requests
+    assert cache.hits == 1 and cache.misses == 1
+
+def test_batched_and_single_extractions_share_entries(cached_constructor, mock_llm, cache):
+    texts = ["Alice likes Paris", "Bob visits Rome", "Carol owns Dogs"]
+    assert cached_constructor.extract_triplets_many(texts, batch_size=3) == [[t.split()] for t in texts]
+    requests = mock_llm.requests
+    assert cached_constructor.extract_triplets("Bob visits Rome") == ["Bob visits Rome".split()]
+    assert cached_constructor.extract_triplets_many(texts + ["Dave reads Books"], batch_size=3)[-1] == \
+        ["Dave reads Books".split()]
+    assert mock_llm.requests == requests + 1
+    assert len(cache) == 4
+
+def test_entries_are_keyed_by_the_prompt_that_produced_them(cached_constructor, mock_llm, cache, monkeypatch):
+    texts = ["Alice likes Paris", "Bob visits Rome"]
+    cached_constructor.extract_triplets_many(texts, batch_size=2)
+    cached_constructor.extract_triplets("Carol owns Dogs")
+    key = lambda template, text: ExtractionCache.key(config.TRIPLET_MODEL, template, text)
+    assert cache.get(key(constructor_module.TRIPLET_BATCH_PROMPT, "Alice likes Paris")) is not None
+    assert cache.get(key(constructor_module.TRIPLET_PROMPT, "Alice likes Paris")) is None
+    assert cache.get(key(constructor_module.TRIPLET_PROMPT, "Carol owns Dogs")) is not None
+    
+    # Editing the batch prompt invalidates what it produced, not the single-prompt entries
+    monkeypatch.setattr(constructor_module, "TRIPLET_BATCH_PROMPT", constructor_module.TRIPLET_BATCH_PROMPT + " ")
+    requests = mock_llm.requests
+    cached_constructor.extract_triplets_many(texts + ["Carol owns Dogs"], batch_size=3)
+    assert mock_llm.requests == requests + 1
+    assert len(cache) == 5
+
+def test_malformed_replies_are_not_cached(cached_constructor, mock_llm, cache):
+    reply = mock_llm.reply
+    mock_llm.reply = lambda messages: "I could not find any facts."
+    assert cached_constructor.extract_triplets("Alice likes Paris") == []
+    assert cached_constructor.extract_triplets_many(["Bob visits Rome", "Carol owns Dogs"]) == [[], []]
+    assert len(cache) == 0
+    
+    mock_llm.reply = reply
+    assert cached_constructor.extract_triplets("Alice likes Paris") == [["Alice", "likes", "Paris"]]
+    assert cached_constructor.extract_triplets_many(["Bob visits Rome"]) == [[["Bob", "visits", "Rome"]]]
+    assert len(cache) == 2
+
+def test_empty_extraction_is_cached(cached_constructor, mock_llm, cache):
+    assert cached_constructor.extract_triplets("hello") == []
+    requests = mock_llm.requests
+    assert cached_constructor.extract_triplets("hello") == []
+    assert mock_llm.requests == requests
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.db"), max_bytes=400, read_only=False)
+    keys = [ExtractionCache.key("m", "p", str(i)) for i in range(6)]
+    for key in keys[:4]:
+        cache.put(key, [["s", "p", "o"]])
+    assert cache.get(keys[0]) is not None  # keys[0] becomes the most recent
+    for key in keys[4:]:
+        cache.put(key, [["s", "p", "o"]])
+    assert cache.evictions >= 1
+    assert cache.get(keys[0]) is not None and cache.get(keys[1]) is None
+    cache.close()
+
+def test_hits_write_use_counters_in_batches(tmp_path):
+    path = str(tmp_path / "extractions.db")
+    cache = ExtractionCache(path, max_bytes=1 << 20, read_only=False, touch_batch=3)
+    keys = [ExtractionCache.key("m", "p", str(i)) for i in range(3)]
+    for key in keys:
+        cache.put(key, [])
+    order = lambda db: [key for key, in db.execute("SELECT key FROM extractions ORDER BY used")]
+    cache.get(keys[1])
+    cache.get(keys[0])
+    assert order(cache._db) == keys  # nothing written yet
+    cache.get(keys[2])  # third distinct key: the batch is written
+    assert order(cache._db) == [keys[1], keys[0], keys[2]]
+    
+    cache.get(keys[1])
+    cache.close()  # pending counters are written on close
+    reopened = ExtractionCache(path, max_bytes=1 << 20, read_only=False)
+    assert order(reopened._db) == [keys[0], keys[2], keys[1]]
+    reopened.close()
@@ -0,0 +1,68 @@
+import threading
+import time
+from core.ingestion import IngestionWorker
+from main import DynaGraphSystem
+from tests.conftest import capitalized_entities
+
+def test_jobs_run_in_sequence_order_across_submitters():
+    worker = IngestionWorker()
+    ran = []
+    seqs = {}
+    gate = threading.Barrier(8)
+    
+    def submitter(thread):
+        gate.wait()
+        for i in range(200):
+            token = (thread, i)
+            seqs[token] = worker.submit(ran.append, token)
+    
+    threads = [threading.Thread(target=submitter, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert worker.wait(timeout=10)
+    worker.close()
+    assert [seqs[token] for token in ran] == list(range(1, 1601))
+
+def test_wait_covers_earlier_jobs():
+    worker = IngestionWorker()
+    done = []
+    worker.submit(lambda: (time.sleep(0.05), done.append(1)), text="alice visited paris")
+    seq = worker.submit(done.append, 2, text="bob")
+    assert worker.pending_mentions(["Alice"]) == 1
+    assert worker.wait(seq, timeout=5) and done == [1, 2]
+    assert worker.pending_mentions(["Alice"]) is None
+    worker.close()
+
+def test_dependent_wait_runs_ner_once(constructor, facts_graph):
+    system = DynaGraphSystem(async_ingestion=True, wait_policy="dependent", store_path=None,
+                             constructor=constructor)
+    calls = []
+    
+    def counting_entities(queries):
+        calls.append(list(queries))
+        return capitalized_entities(queries)
+    
+    system.retriever.extract_entities = counting_entities
+    system.knowledge_graph.graph = facts_graph
+    system.ingestion.submit(time.sleep, 0.05, text="Alice moved to Rome")
+    context = system._retrieve("Where is Alice?")
+    assert "Alice" in context
+    assert calls == [["Where is Alice?"]] and system.ingestion_waits == 1
+    system.close()
+
+def test_dependent_wait_covers_pending_turns_when_no_entities(constructor, facts_graph):
+    system = DynaGraphSystem(async_ingestion=True, wait_policy="dependent", store_path=None,
+                             constructor=constructor)
+    system.retriever.extract_entities = capitalized_entities
+    system.knowledge_graph.graph = facts_graph
+    done = []
+    system.ingestion.submit(lambda: (time.sleep(0.05), done.append(1)), text="Alice moved to Rome")
+    system._retrieve("what about him?")
+    assert done == [1] and system.ingestion_waits == 1
+
+    system.ingestion.submit(lambda: (time.sleep(0.05), done.append(2)), text="Bob moved to Oslo")
+    system._retrieve("Where is Carol?")  # names an entity no pending turn mentions
+    assert system.ingestion_waits == 1
+    system.close()
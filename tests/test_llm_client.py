@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from evaluation.mock_llm import MockLLMServer
+from utils.llm_client import LLMClient, _Slots
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def test_sync_and_async_calls_share_one_limit():
+    with MockLLMServer(latency=0.05) as server:
+        llm = LLMClient(base_url=server.base_url, api_key="test", max_concurrency=4, max_retries=0)
+        threads = [threading.Thread(target=llm.complete, args=("m", MESSAGES)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+
+        async def run():
+            await asyncio.gather(*(llm.acomplete("m", MESSAGES) for _ in range(6)))
+
+        asyncio.run(run())
+        for thread in threads:
+            thread.join()
+        llm.close()
+        assert server.requests == 12
+        assert server.max_in_flight == 4
+
+def test_async_pools_close_with_their_loop():
+    with MockLLMServer() as server:
+        llm = LLMClient(base_url=server.base_url, api_key="test", max_concurrency=4, pool_shard_size=2)
+
+        async def run():
+            await asyncio.gather(*(llm.acomplete("m", MESSAGES) for _ in range(4)))
+            return list(llm._async.values())[0][0]
+
+        first = asyncio.run(run())
+        assert llm._async == {} and all(client.is_closed() for client in first)
+        second = asyncio.run(run())
+        assert second is not first and all(client.is_closed() for client in second)
+        llm.close()
+
+def test_cancelled_waiter_does_not_keep_a_slot():
+    slots = _Slots(1)
+
+    async def run():
+        slots.acquire()
+        waiter = asyncio.ensure_future(slots.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        slots.release()
+        await asyncio.sleep(0)
+        await asyncio.wait_for(slots.aacquire(), timeout=1)
+        slots.release()
+
+    asyncio.run(run())
+    assert slots._free == 1 and not slots._waiters
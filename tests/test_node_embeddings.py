@@ -0,0 +1,70 @@
+import hashlib
+import numpy as np
+import networkx as nx
+from core.consolidator import MemoryConsolidator
+from utils.embedding_utils import EmbeddingService, NodeEmbeddingStore, get_node_embedding_store
+
+class HashModel:
+    """Deterministic stand-in for the sentence-transformers model; distinct names are near-orthogonal"""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        seeds = (int.from_bytes(hashlib.sha256(t.encode()).digest()[:4], "little") for t in texts)
+        return np.stack([np.random.default_rng(seed).standard_normal(64).astype(np.float32) for seed in seeds])
+
+    def get_sentence_embedding_dimension(self):
+        return 64
+
+def service():
+    service = EmbeddingService(cache_path=None)
+    service._model = HashModel()
+    return service
+
+def unit(text):
+    vector = HashModel().encode([text])[0]
+    return vector / np.linalg.norm(vector)
+
+def test_store_encodes_only_new_nodes_and_keeps_rows_after_removal():
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from((f"n{i}", f"n{i + 1}") for i in range(99))
+    store = NodeEmbeddingStore(service())
+    assert store.sync(graph) == 100  # past the initial capacity of 64 rows
+
+    graph.remove_nodes_from(["n0", "n50"])
+    graph.add_edge("n1", "extra")
+    assert store.sync(graph) == 1
+    assert store.service.model.encoded == 101
+    assert sorted(store.names) == sorted(graph.nodes) and store.matrix.shape == (99, 64)
+    for name in graph:
+        assert np.allclose(store.vector(name), unit(name))
+        assert np.array_equal(store.matrix[store.names.index(name)], store.vector(name))
+
+def test_blocked_pair_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((50, 8)).astype(np.float32)
+    embeddings[10] = embeddings[3] + 0.01
+    embeddings[49] = embeddings[3] + 0.02
+    embeddings[25] = embeddings[24]
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    names = [f"n{i}" for i in range(50)]
+
+    similarity = embeddings @ embeddings.T
+    expected = [(names[i], names[j]) for i in range(50) for j in range(i + 1, 50) if similarity[i, j] > 0.8]
+    assert ("n3", "n10") in expected and ("n24", "n25") in expected
+    for block_size in (1, 7, 64):
+        consolidator = MemoryConsolidator(block_size=block_size)
+        assert consolidator._find_similar_pairs(names, embeddings) == expected
+
+def test_merge_reuses_the_graph_store():
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from([("Alice", "Paris"), ("Bob", "Alice")], weight=0.5)
+    consolidator = MemoryConsolidator()
+    consolidator.embedding_model = service()
+    assert consolidator._merge_similar_nodes(graph)["encoded"] == 3
+
+    graph.add_edge("Carol", "Bob", weight=0.5)
+    assert consolidator._merge_similar_nodes(graph)["encoded"] == 1
+    assert len(get_node_embedding_store(graph)) == 4
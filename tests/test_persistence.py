@@ -0,0 +1,104 @@
+import io
+import time
+import pytest
+from core import persistence
+from core.graph_manager import TemporalKnowledgeGraph
+from core.persistence import GraphStore
+from utils.graph_utils import get_graph_versions
+
+def edge_set(graph):
+    return sorted((u, v, d.get("predicate"), d.get("last_updated")) for u, v, d in graph.edges(data=True))
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_recovery_replays_wal(tmp_path, constructor, backend):
+    kg = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    for text in ["Alice knows Bob", "Bob visits Paris", "Alice likes Paris"]:
+        kg.update(text, constructor)
+    kg.close()
+
+    recovered = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    assert recovered.turn_counter == 3
+    assert edge_set(recovered.graph) == edge_set(kg.graph)
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_recovery_after_snapshot_and_wal_tail(tmp_path, constructor, backend):
+    kg = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    kg.update("Alice knows Bob", constructor)
+    kg.save(wait=True)
+    kg.update("Bob visits Paris", constructor)
+    kg.close()
+
+    recovered = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    assert recovered.store.stats["replayed"] == 1
+    assert edge_set(recovered.graph) == edge_set(kg.graph)
+
+def test_torn_wal_tail_is_dropped(tmp_path, constructor):
+    kg = TemporalKnowledgeGraph(store_path=str(tmp_path))
+    kg.update("Alice knows Bob", constructor)
+    kg.update("Bob visits Paris", constructor)
+    kg.close()
+    segment = sorted(tmp_path.glob("wal-*.log"))[-1]
+    segment.write_bytes(segment.read_bytes()[:-5])
+
+    recovered = TemporalKnowledgeGraph(store_path=str(tmp_path))
+    assert recovered.turn_counter == 1
+    assert recovered.graph.has_edge("Alice", "Bob")
+    assert not recovered.graph.has_edge("Bob", "Paris")
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_recovery_after_import(tmp_path, constructor, backend):
+    kg = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    for text in ["Alice knows Bob", "Bob visits Paris", "Alice likes Paris"]:
+        kg.update(text, constructor)
+    kg.import_rdf(io.StringIO(kg.export_rdf(metadata=True)))
+    kg.update("X knows Y", constructor)
+    kg.update("Y visits Paris", constructor)
+    kg.close()
+
+    recovered = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    assert recovered.graph.has_edge("X", "Y")
+    assert recovered.graph.has_edge("Y", "Paris")
+    assert recovered.turn_counter == kg.turn_counter == 5
+    assert edge_set(recovered.graph) == edge_set(kg.graph)
+
+def last_record(path):
+    segment = max(path.glob("wal-*.log"), key=lambda p: int(p.name[4:-4]))
+    return GraphStore._read_segment(str(segment))[0][-1]
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_records_hold_only_the_changed_edges(tmp_path, constructor, backend):
+    kg = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    kg.update_many([f"Hub knows N{i}" for i in range(50)], constructor)
+    kg.update("Hub knows Newcomer", constructor)
+    ops = {op[1]: op for op in last_record(tmp_path)["ops"]}
+    assert set(ops) == {"Hub", "Newcomer"}
+    assert [target for target, _ in ops["Hub"][3]] == ["Newcomer"]
+
+    # An edge removed between two touched nodes is removed on replay too
+    kg.graph.remove_edge("Hub", "N3")
+    get_graph_versions(kg.graph).touch(["Hub", "N3"])
+    kg._persist()
+    kg.close()
+    recovered = TemporalKnowledgeGraph(backend=backend, store_path=str(tmp_path))
+    assert not recovered.graph.has_edge("Hub", "N3")
+    assert edge_set(recovered.graph) == edge_set(kg.graph)
+
+def test_background_snapshot_copies_outside_the_lock(tmp_path, constructor, monkeypatch):
+    monkeypatch.setattr(persistence, "_CAPTURE_CHUNK", 2)
+    kg = TemporalKnowledgeGraph(store_path=str(tmp_path))
+    kg.update_many(["Alice knows Bob", "Bob visits Paris", "Carol likes Rome"], constructor)
+    with kg.lock:
+        assert kg.store.snapshot(kg)  # returns before copying a single node
+        time.sleep(0.05)
+        assert kg.store._writer.is_alive()
+        # Changes made while the writer waits are in the WAL after the snapshot's seq
+        kg.graph.remove_node("Rome")
+        get_graph_versions(kg.graph).touch(["Rome", "Carol"])
+        kg._persist()
+    kg.update("Dave knows Alice", constructor)
+    kg.close()
+
+    recovered = TemporalKnowledgeGraph(store_path=str(tmp_path))
+    assert recovered.store.snapshot_seq > 0 and recovered.store.stats["replayed"] == 2
+    assert "Rome" not in recovered.graph
+    assert edge_set(recovered.graph) == edge_set(kg.graph)
@@ -0,0 +1,56 @@
+import io
+import pytest
+import networkx as nx
+from core.compact_graph import CompactMultiDiGraph
+from core.graph_manager import TemporalKnowledgeGraph
+from core.rdf_io import read_ntriples, write_ntriples
+
+def memory_graph():
+    graph = nx.MultiDiGraph()
+    graph.add_edge("Alice", "Paris", predicate="located-in", weight=0.5, last_updated=3,
+                   archived_history=[{"weight": 0.2, "turn": 1}])
+    graph.add_edge("Alice", "Paris", predicate="located-in", last_updated=4)  # parallel, no weight
+    graph.add_edge("Bob", "Alice", predicate="related-to", weight=0.75)
+    graph.add_node("Carol", last_updated=2, created=1)  # isolated
+    graph.nodes["Alice"].update(last_updated=4, created=1)
+    return graph
+
+def facts(graph):
+    return sorted(str((u, v, d.get('predicate'), d.get('weight'), d.get('last_updated'),
+                       d.get('archived_history') or [])) for u, v, d in graph.edges(data=True))
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_ntriples_round_trip(backend):
+    graph = memory_graph()
+    buffer = io.StringIO()
+    write_ntriples(graph, buffer, metadata=True)
+    restored = read_ntriples(io.StringIO(buffer.getvalue()), backend)
+
+    assert facts(restored) == facts(graph)
+    assert restored.nodes["Carol"]["last_updated"] == 2
+    assert restored.nodes["Alice"]["created"] == 1
+
+def test_plain_ntriples_keep_parallel_edges():
+    buffer = io.StringIO()
+    write_ntriples(memory_graph(), buffer)
+    restored = read_ntriples(io.StringIO(buffer.getvalue()), "networkx")
+    assert restored.number_of_edges("Alice", "Paris") == 2
+    assert "Carol" not in restored
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_edge_csv_with_node_file(backend):
+    kg = TemporalKnowledgeGraph(backend=backend)
+    graph = memory_graph()
+    kg.graph = graph if backend == "networkx" else CompactMultiDiGraph.from_networkx(graph)
+    edges, nodes = io.StringIO(), io.StringIO()
+    assert kg.export_edges(edges, nodes) == 3
+
+    edges_only = TemporalKnowledgeGraph(backend=backend)
+    edges_only.import_edges(io.StringIO(edges.getvalue()))
+    assert "Carol" not in edges_only.graph
+
+    restored = TemporalKnowledgeGraph(backend=backend)
+    restored.import_edges(io.StringIO(edges.getvalue()), io.StringIO(nodes.getvalue()))
+    assert facts(restored.graph) == facts(kg.graph)
+    assert dict(restored.graph.nodes["Carol"]) == {"last_updated": 2, "created": 1}
+    assert restored.graph.nodes["Alice"]["created"] == 1
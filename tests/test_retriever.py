@@ -0,0 +1,106 @@
+import pytest
+import networkx as nx
+from config import DynaGraphConfig as config
+from core.retriever import MultiScaleRetriever
+from utils.text_processing import estimate_tokens
+
+@pytest.mark.parametrize("engine", ["beam", "ppr"])
+def test_cache_hit_reports_the_cached_linearize_stats(make_retriever, facts_graph, engine):
+    retriever = make_retriever(retrieval_engine=engine)
+    alice = retriever.retrieve_context("Where is Alice?", facts_graph, delta=2)
+    alice_stats = dict(retriever.linearize_stats)
+    retriever.retrieve_context("Where is Carol?", facts_graph, delta=1)
+    assert retriever.linearize_stats != alice_stats
+    
+    assert retriever.retrieve_context("Where is Alice?", facts_graph, delta=2) == alice
+    assert retriever.cache_stats(facts_graph)["hits"] >= 1
+    assert retriever.linearize_stats == alice_stats
+
+QUERIES = ["where is Alice?", "who knows Alice and Bob?", "where is Berlin?", "who is Dave?", "is Bob in Paris?"]
+
+@pytest.fixture
+def uncached(monkeypatch):
+    monkeypatch.setattr(config, "RETRIEVAL_CACHE_SIZE", 0)
+
+def counting(monkeypatch, retriever, name):
+    calls = []
+    method = getattr(retriever, name)
+    monkeypatch.setattr(retriever, name, lambda *args: calls.append(args[:2]) or method(*args))
+    return calls
+
+def test_batch_matches_single_queries_and_shares_anchors(make_retriever, facts_graph, uncached, monkeypatch):
+    single = make_retriever()
+    expected = [single.retrieve_context(query, facts_graph, delta=2) for query in QUERIES]
+
+    batch = make_retriever()
+    searched = counting(monkeypatch, batch, "_beam_search")
+    matched = counting(monkeypatch, batch, "_match_entity")
+    assert batch.retrieve_context_many(QUERIES, facts_graph, delta=2) == expected
+    assert expected[0] and expected[3] == ""
+    # Alice and Bob each appear in three queries but are matched and searched once
+    assert sorted(entity for entity, _ in matched) == ["Alice", "Berlin", "Bob", "Dave", "Paris"]
+    assert sorted(anchor for _, anchor in searched) == ["Alice", "Berlin", "Bob", "Paris"]
+
+@pytest.mark.parametrize("engine", ["beam", "ppr"])
+def test_sweep_matches_one_retrieval_per_depth(make_retriever, facts_graph, uncached, monkeypatch, engine):
+    query, deltas = "what does Carol know?", (1, 2, 3, 4)
+    single = make_retriever(retrieval_engine=engine)
+    expected = {delta: single.retrieve_context(query, facts_graph, delta=delta) for delta in deltas}
+
+    sweep = make_retriever(retrieval_engine=engine)
+    searched = counting(monkeypatch, sweep, "_beam_search")
+    assert sweep.retrieve_context_sweep(query, facts_graph, deltas) == expected
+    assert len(searched) == (1 if engine == "beam" else 0)
+    timings = [sweep.sweep_timings[delta] for delta in deltas]
+    assert timings == sorted(timings)
+    if engine == "beam":
+        assert len(set(expected.values())) == len(deltas)  # every depth reaches further
+
+def context_graph():
+    graph = nx.DiGraph()
+    # (u, v, predicate, weight, last_updated), in path order
+    for order, (u, v, p, w, t) in enumerate([("Alice", "Paris", "located-in", 0.2, 1),
+                                             ("Bob", "Berlin", "located-in", 0.9, 3),
+                                             ("Carol", "Bob", "related-to", 0.5, 9),
+                                             ("Dave", "Lima", "located-in", 0.7, 5)]):
+        graph.add_edge(u, v, predicate=p, weight=w, last_updated=t, path_order=order)
+    return graph
+
+@pytest.mark.parametrize("weights, first", [((1, 0, 0), ["Alice", "Bob", "Carol", "Dave"]),
+                                            ((0, 1, 0), ["Bob", "Dave", "Carol", "Alice"]),
+                                            ((0, 0, 1), ["Carol", "Dave", "Bob", "Alice"])])
+def test_context_facts_follow_the_rank_blend(monkeypatch, weights, first):
+    monkeypatch.setattr(config, "CONTEXT_RANK_WEIGHTS", weights)
+    ranked = MultiScaleRetriever()._rank_context_edges(context_graph())
+    assert [u for u, _, _ in ranked] == first
+
+def test_ppr_rank_score_overrides_path_order(monkeypatch):
+    monkeypatch.setattr(config, "CONTEXT_RANK_WEIGHTS", (1, 0, 0))
+    graph = context_graph()
+    for rank, (u, v) in enumerate([("Dave", "Lima"), ("Carol", "Bob"), ("Alice", "Paris"), ("Bob", "Berlin")]):
+        graph.edges[u, v]['rank_score'] = 1.0 / (rank + 1)
+    assert [u for u, _, _ in MultiScaleRetriever()._rank_context_edges(graph)] == ["Dave", "Carol", "Alice", "Bob"]
+
+def test_repeated_facts_are_dropped(monkeypatch):
+    monkeypatch.setattr(config, "CONTEXT_RANK_WEIGHTS", (1, 0, 0))
+    graph = context_graph()
+    graph.add_edge("alice ", "PARIS", predicate="Located-in", path_order=4)  # same fact after normalization
+    graph.add_edge("Bob", "Carol", predicate="related-to", path_order=5)  # symmetric mirror
+    graph.add_edge("Paris", "Alice", predicate="located-in", path_order=6)  # not symmetric, kept
+    retriever = MultiScaleRetriever()
+    lines = retriever._linearize_context(graph, token_budget=0).splitlines()
+
+    assert lines == ["Alice --[located-in]-> Paris", "Bob --[located-in]-> Berlin", "Carol --[related-to]-> Bob",
+                     "Dave --[located-in]-> Lima", "Paris --[located-in]-> Alice"]
+    assert retriever.linearize_stats["duplicates"] == 2 and retriever.linearize_stats["over_budget"] == 0
+
+def test_context_stops_at_the_token_budget(monkeypatch):
+    monkeypatch.setattr(config, "CONTEXT_RANK_WEIGHTS", (1, 0, 0))
+    retriever = MultiScaleRetriever()
+    full = retriever._linearize_context(context_graph(), token_budget=0).splitlines()
+    budget = sum(estimate_tokens(line) + 1 for line in full[:2]) + 1
+
+    lines = retriever._linearize_context(context_graph(), token_budget=budget).splitlines()
+    stats = retriever.linearize_stats
+    assert lines == full[:2]
+    assert stats["tokens"] <= budget and stats["kept"] == 2 and stats["over_budget"] == 2
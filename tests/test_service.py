@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import threading
+import pytest
+import core.retriever
+from evaluation.mock_llm import MockLLMServer
+from service import SessionService
+from tests.conftest import capitalized_entities, triplet_reply
+from utils.llm_client import LLMClient
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch):
+    """SessionService against a slow mock LLM; NER is capitalized_entities and there is no ontology"""
+    monkeypatch.setattr(core.retriever, "extract_entities", capitalized_entities)
+    servers, services = [], []
+    
+    def make(latency=0.0, **kwargs):
+        server = MockLLMServer(reply=triplet_reply, latency=latency).__enter__()
+        llm = LLMClient(base_url=server.base_url, api_key="test", max_retries=0)
+        service = SessionService(store_dir=str(tmp_path), idle_timeout=0, llm=llm, **kwargs)
+        service.constructor.extraction_cache = None
+        service.constructor.core_concepts = []
+        servers.append((server, llm))
+        services.append(service)
+        return service
+    
+    yield make
+    for server, llm in servers:
+        llm.close()
+        server.__exit__(None, None, None)
+
+def test_turn_cancelled_while_queued_releases_its_claim(make_service):
+    service = make_service(latency=0.2)
+    
+    async def scenario():
+        first = asyncio.ensure_future(service.turn("s1", "Alice likes Paris"))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(service.turn("s1", "Bob likes Rome"))
+        await asyncio.sleep(0.05)
+        second.cancel()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        await service.drain()
+        pending = service._sessions["s1"].pending
+        assert await service.evict("s1")
+        await service.close()
+        return pending
+    
+    assert asyncio.run(scenario()) == 0
+
+def test_history_is_appended_per_turn_and_recovered(make_service, tmp_path):
+    service = make_service()
+    
+    async def talk(service, messages):
+        for message in messages:
+            await service.turn("s1", message)
+        await service.drain()
+    
+    asyncio.run(talk(service, ["Alice likes Paris", "Bob likes Rome"]))
+    with open(os.path.join(tmp_path, "s1", "history.jsonl")) as f:
+        lines = [json.loads(line) for line in f]
+    assert [entry["user"] for entry in lines] == ["Alice likes Paris", "Bob likes Rome"]
+    
+    # A process that dies without evicting loses nothing: a fresh service recovers the history
+    recovered = make_service()
+    
+    async def reload():
+        info = await recovered.session_info("s1")
+        history = recovered._sessions["s1"].system.conversation_history
+        await recovered.close()
+        await service.close()
+        return info, history
+    
+    info, history = asyncio.run(reload())
+    assert [entry["user"] for entry in history] == ["Alice likes Paris", "Bob likes Rome"]
+    assert info["turns"] == 2 and info["nodes"] >= 3
+
+def test_ingestion_runs_on_its_own_pool(make_service, monkeypatch):
+    service = make_service()
+    threads = set()
+    
+    async def scenario():
+        await service.turn("s1", "Alice likes Paris")
+        system = service._sessions["s1"].system
+        finish_turn = system._finish_turn
+        
+        def recording(*args):
+            threads.add(threading.current_thread().name)
+            return finish_turn(*args)
+        
+        system._finish_turn = recording
+        await service.turn("s1", "Bob likes Rome")
+        await service.drain()
+        await service.close()
+    
+    asyncio.run(scenario())
+    assert threads and all(name.startswith("dynagraph-ingestion") for name in threads)
@@ -0,0 +1,40 @@
+import asyncio
+from main import DynaGraphSystem
+from tests.conftest import triplet_reply
+from utils.llm_client import LLMClient
+
+ANSWER = "Alice moved to Paris last spring and likes it there."
+
+def answer_or_triplets(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    return triplet_reply(messages) if "Extract key facts" in prompt else ANSWER
+
+def test_stream_and_astream_join_to_the_reply(mock_llm):
+    mock_llm.reply = answer_or_triplets
+    llm = LLMClient(base_url=mock_llm.base_url, api_key="test", max_retries=0)
+    messages = [{"role": "user", "content": "Where is Alice?"}]
+    chunks = list(llm.stream("m", messages))
+    assert len(chunks) == len(ANSWER.split()) and "".join(chunks) == ANSWER
+
+    async def collect():
+        return [chunk async for chunk in llm.astream("m", messages)]
+
+    assert "".join(asyncio.run(collect())) == ANSWER
+    assert llm.stats()["calls"] == 2
+    llm.close()
+
+def test_process_input_stream_records_stream_stats(constructor, mock_llm, make_retriever):
+    mock_llm.reply = answer_or_triplets
+    mock_llm.chunk_delay = 0.005
+    system = DynaGraphSystem(async_ingestion=False, store_path=None, constructor=constructor)
+    system.retriever = make_retriever()
+    system.llm = constructor.llm
+
+    chunks = list(system.process_input_stream("Where is Alice?"))
+    assert "".join(chunks) == ANSWER
+    stats = system.stream_stats
+    assert stats["chunks"] == len(chunks) and stats["turn"] == system.conversation_history[-1]["turn"]
+    assert 0 < stats["time_to_first_token"] < stats["total_time"]
+    assert stats["tokens_per_second"] > 0
+    assert system.conversation_history[-1]["assistant"] == ANSWER
+    system.close()
@@ -0,0 +1,107 @@
+import re
+import sys
+import random
+from types import SimpleNamespace
+import pytest
+import networkx as nx
+from core.retriever import MultiScaleRetriever
+from utils import text_processing
+from utils.text_processing import get_anchor_index
+
+WORDS = ["alice", "Paris", "new york", "York", "ab", "a", "Acme Corp", "corp", "Bob", "bobcat", "Lyon", "on"]
+
+def full_scan(retriever, entity, graph):
+    best_match, best_score = None, 0.0
+    for node in graph.nodes:
+        score = retriever._string_similarity(entity, node)
+        if score > best_score and score > 0.4:
+            best_score = score
+            best_match = node
+    return best_match
+
+def random_names(rng, count):
+    return [" ".join(rng.sample(WORDS, rng.randint(1, 2))) + rng.choice(["", "s", "ing"]) for _ in range(count)]
+
+def test_indexed_match_equals_a_full_scan():
+    rng = random.Random(0)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(random_names(rng, 200))
+    retriever = MultiScaleRetriever()
+    index = get_anchor_index(graph)
+
+    for entity in WORDS + random_names(rng, 100) + ["", "x", "ALICE"]:
+        assert retriever._match_entity(entity, index) == full_scan(retriever, entity, graph)
+
+def test_index_follows_added_and_removed_nodes():
+    graph = nx.MultiDiGraph()
+    graph.add_edge("Alice", "Paris")
+    index = get_anchor_index(graph)
+    retriever = MultiScaleRetriever()
+
+    graph.add_node("Alicia")
+    index.add(["Alicia"])
+    assert get_anchor_index(graph) is index
+    assert index.candidates("ali") == ["Alice", "Alicia"]
+
+    graph.remove_node("Alice")
+    index.remove(["Alice"])
+    assert retriever._match_entity("alice", index) == "Alicia"
+    assert "Alice" not in index and index.candidates("Paris") == ["Paris"]
+
+def test_index_is_rebuilt_when_the_graph_changed_elsewhere():
+    graph = nx.MultiDiGraph()
+    graph.add_edge("Alice", "Paris")
+    stale = get_anchor_index(graph)
+    graph.add_node("Berlin")
+    index = get_anchor_index(graph)
+    assert index is not stale and "Berlin" in index
+
+class FakeNLP:
+    """Stand-in for a loaded spaCy pipeline: capitalized words are the entities"""
+
+    def __init__(self, exclude, listeners):
+        self.exclude = exclude
+        self.pipe_names = ["tok2vec", "ner"]
+        self.listeners = listeners
+        self.calls = []
+
+    def get_pipe(self, name):
+        return SimpleNamespace(listening_components=self.listeners)
+
+    def remove_pipe(self, name):
+        self.pipe_names.remove(name)
+
+    def pipe(self, texts, batch_size):
+        texts = list(texts)
+        self.calls.append((len(texts), batch_size))
+        for text in texts:
+            yield SimpleNamespace(ents=[SimpleNamespace(text=word) for word in re.findall(r"\b[A-Z]\w+", text)])
+
+@pytest.fixture
+def fake_spacy(monkeypatch):
+    loads = []
+
+    def load(model, exclude=()):
+        loads.append(model)
+        return FakeNLP(exclude, listeners=["ner"] if model == "listening" else [])
+
+    monkeypatch.setitem(sys.modules, "spacy", SimpleNamespace(load=load))
+    monkeypatch.setattr(text_processing, "_ner_pipelines", {})
+    return loads
+
+def test_ner_pipeline_is_lean_and_loaded_once(fake_spacy):
+    MultiScaleRetriever()
+    assert fake_spacy == []  # not loaded until the first query
+
+    nlp = text_processing.get_ner_pipeline("model")
+    assert text_processing.get_ner_pipeline("model") is nlp and fake_spacy == ["model"]
+    assert {"tagger", "parser", "lemmatizer"} <= set(nlp.exclude)
+    assert nlp.pipe_names == ["ner"]
+    # NER that listens to the shared tok2vec keeps it
+    assert text_processing.get_ner_pipeline("listening").pipe_names == ["tok2vec", "ner"]
+
+def test_entities_for_many_texts_come_from_one_pipe_call(fake_spacy):
+    queries = ["where is Alice?", "no entities here", "Bob met Carol in Paris"]
+    entities = text_processing.extract_entities(queries, model="model", batch_size=2)
+    assert entities == [["Alice"], [], ["Bob", "Carol", "Paris"]]
+    assert text_processing.get_ner_pipeline("model").calls == [(3, 2)]
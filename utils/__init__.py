@@ -7,6 +7,7 @@ Helper functions and tools used throughout the DynaGraph-LLM system:
 - text_processing: Text cleaning and NLP utilities
 - embedding_utils: Semantic embedding operations
 - time_utils: Turn management and time formatting
+- llm_client: Pooled, rate-limit aware chat-completions client
 - graph_utils: NetworkX graph operations (imported dynamically)
 """
 
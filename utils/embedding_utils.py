@@ -1,11 +1,302 @@
-from sentence_transformers import SentenceTransformer
+import io
+import os
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
+from typing import List, Dict
+from config import DynaGraphConfig as config
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+class EmbeddingService:
+    """Process-wide SentenceTransformer, loaded on first use, with a content-hash keyed vector cache.
+
+    With a cache_path, vectors are appended to a memory-mapped file every flush_rows
+    new vectors (and by save()); without one, at most memory_size vectors are kept
+    in memory, least recently used first out.
+    """
+
+    def __init__(self, model_name: str = config.EMBEDDING_MODEL, cache_path: str = config.EMBEDDING_CACHE_PATH,
+                 memory_size: int = config.EMBEDDING_MEMORY_CACHE_SIZE, flush_rows: int = config.EMBEDDING_FLUSH_ROWS):
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.memory_size = memory_size
+        self.flush_rows = flush_rows
+        self._model = None
+        self._lock = threading.RLock()
+
+        # digest -> row; rows below _persisted_rows live in the memory-mapped file
+        self._index = {}
+        self._persisted = None
+        self._persisted_rows = 0
+        self._pending = []
+        self._pending_keys = []
+        # digest -> vector, LRU order, used instead of the rows above without a cache_path
+        self._memory = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_path:
+            self._load_cache()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _row(self, idx: int) -> np.ndarray:
+        if idx < self._persisted_rows:
+            return self._persisted[idx]
+        return self._pending[idx - self._persisted_rows]
+
+    def encode(self, texts) -> np.ndarray:
+        """Encode texts, only running the model on texts not seen before"""
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+
+        with self._lock:
+            missing = {}
+            for text, key in zip(texts, keys):
+                if key not in self._index and key not in self._memory and key not in missing:
+                    missing[key] = text
+
+            encoded = {}
+            if missing:
+                vectors = np.asarray(self.model.encode(list(missing.values())), dtype=np.float32)
+                encoded = dict(zip(missing, vectors))
+
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+            if not texts:
+                return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+            # Gather before storing: storing may evict vectors this call still needs
+            result = np.stack([encoded[key] if key in encoded else self._lookup(key) for key in keys])
+            self._store(encoded)
+            return result
+
+    def _lookup(self, key: str) -> np.ndarray:
+        if self.cache_path:
+            return self._row(self._index[key])
+        self._memory.move_to_end(key)
+        return self._memory[key]
+
+    def _store(self, encoded: Dict[str, np.ndarray]):
+        if not self.cache_path:
+            self._memory.update(encoded)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+            return
+        for key, vector in encoded.items():
+            self._index[key] = self._persisted_rows + len(self._pending)
+            self._pending.append(vector)
+            self._pending_keys.append(key)
+        if len(self._pending) >= self.flush_rows:
+            self.save()
+
+    def _paths(self):
+        return f"{self.cache_path}.npy", f"{self.cache_path}.keys"
+
+    def _load_cache(self):
+        vectors_path, keys_path = self._paths()
+        if not (os.path.exists(vectors_path) and os.path.exists(keys_path)):
+            return
+        with open(keys_path) as f:
+            keys = f.read().split()
+        vectors = np.load(vectors_path, mmap_mode='r')
+
+        # Ignore a torn tail if the process died between writing the two files
+        rows = min(len(keys), len(vectors))
+        if len(keys) > rows:
+            # Keys are appended after their rows, so drop the orphans before appending more
+            with open(keys_path, "w") as f:
+                f.write("".join(f"{key}\n" for key in keys[:rows]))
+        self._persisted = vectors
+        self._persisted_rows = rows
+        self._index = {key: i for i, key in enumerate(keys[:rows])}
+
+    def save(self):
+        """Append newly encoded vectors to the memory-mapped cache file"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            vectors_path, keys_path = self._paths()
+            os.makedirs(os.path.dirname(os.path.abspath(vectors_path)), exist_ok=True)
+
+            pending = np.stack(self._pending)
+            total = self._persisted_rows + len(pending)
+            if not (self._persisted_rows and self._append_rows(vectors_path, pending, total)):
+                self._rewrite_rows(vectors_path, pending, total)
+
+            with open(keys_path, "a" if self._persisted_rows else "w") as f:
+                f.write("".join(f"{key}\n" for key in self._pending_keys))
+
+            self._persisted = np.load(vectors_path, mmap_mode='r')
+            self._persisted_rows = total
+            self._pending = []
+            self._pending_keys = []
+
+    def _append_rows(self, vectors_path: str, rows: np.ndarray, total: int) -> bool:
+        """Write rows after the persisted ones and patch the .npy header's row count in place.
+
+        Returns False when the header cannot be rewritten at its current size (files
+        from numpy < 1.24 leave no room for the row count to grow).
+        """
+        fmt = np.lib.format
+        with open(vectors_path, "r+b") as f:
+            version = fmt.read_magic(f)
+            if version not in ((1, 0), (2, 0)):
+                return False
+            read, write = ((fmt.read_array_header_1_0, fmt.write_array_header_1_0) if version == (1, 0)
+                           else (fmt.read_array_header_2_0, fmt.write_array_header_2_0))
+            shape, fortran_order, dtype = read(f)
+            data_start = f.tell()
+            if fortran_order or dtype != np.float32 or len(shape) != 2 or shape[1] != rows.shape[1]:
+                return False
+
+            header = io.BytesIO()
+            write(header, {"descr": fmt.dtype_to_descr(dtype), "fortran_order": False, "shape": (total, shape[1])})
+            if header.tell() != data_start:
+                return False
+
+            # Rows first, header last: a crash in between leaves the old row count valid
+            f.seek(data_start + self._persisted_rows * rows.shape[1] * rows.itemsize)
+            f.truncate()
+            f.write(rows.tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        return True
+
+    def _rewrite_rows(self, vectors_path: str, rows: np.ndarray, total: int):
+        tmp_path = vectors_path + ".tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(total, rows.shape[1]))
+        if self._persisted_rows:
+            out[:self._persisted_rows] = self._persisted[:self._persisted_rows]
+        out[self._persisted_rows:] = rows
+        out.flush()
+        del out
+        os.replace(tmp_path, vectors_path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._index) + len(self._memory), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+class NodeEmbeddingStore:
+    """Normalized node-name embeddings kept alongside a graph and refreshed only for changed nodes"""
+
+    def __init__(self, service: EmbeddingService = None):
+        self.service = service
+        self.names = []
+        self._index = {}
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Row i is the unit-norm embedding of names[i]"""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:len(self.names)]
+
+    def vector(self, name) -> np.ndarray:
+        return self._matrix[self._index[name]]
+
+    def add(self, names: list, vectors: np.ndarray = None):
+        names = [name for name in dict.fromkeys(names) if name not in self._index]
+        if not names:
+            return
+        if vectors is None:
+            vectors = (self.service or get_embedding_service()).encode([str(name) for name in names])
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        size = len(self.names)
+        needed = size + len(names)
+        if self._matrix is None or needed > len(self._matrix):
+            # Grow geometrically so repeated small additions stay amortized O(1) per row
+            capacity = max(needed, 2 * (0 if self._matrix is None else len(self._matrix)), 64)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            if size:
+                grown[:size] = self._matrix[:size]
+            self._matrix = grown
+        self._matrix[size:needed] = vectors
+        for offset, name in enumerate(names):
+            self._index[name] = size + offset
+            self.names.append(name)
+
+    def remove(self, names):
+        for name in names:
+            row = self._index.pop(name, None)
+            if row is None:
+                continue
+            # Swap the last row into the hole to keep the matrix dense
+            last = len(self.names) - 1
+            if row != last:
+                moved = self.names[last]
+                self._matrix[row] = self._matrix[last]
+                self.names[row] = moved
+                self._index[moved] = row
+            self.names.pop()
+
+    def rename(self, old, new):
+        """Drop the old name and encode the new one"""
+        self.remove([old])
+        self.add([new])
+
+    def sync(self, graph) -> int:
+        """Drop vanished nodes and encode only nodes not yet stored; returns the number encoded"""
+        stale = [name for name in self._index if name not in graph]
+        self.remove(stale)
+        missing = [node for node in graph.nodes if node not in self._index]
+        self.add(missing)
+        return len(missing)
+
+def get_node_embedding_store(graph) -> NodeEmbeddingStore:
+    """Return the embedding store attached to graph, creating it on first use"""
+    store = graph.graph.get('node_embeddings')
+    if store is None:
+        store = graph.graph['node_embeddings'] = NodeEmbeddingStore()
+    return store
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the embedding service shared by every component in this process"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+                if _service.cache_path:
+                    atexit.register(_service.save)
+    return _service
 
 def get_embedding(text: str) -> np.ndarray:
     """Get sentence embedding"""
-    return model.encode([text])[0]
+    return get_embedding_service().encode([text])[0]
 
 def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
     """Compute cosine similarity between two vectors"""
@@ -13,13 +304,14 @@ def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
 
 def semantic_search(query: str, corpus: List[str], top_k=5) -> List[Dict]:
     """Semantic search implementation"""
-    query_embed = model.encode([query])
-    corpus_embeds = model.encode(corpus)
-    
+    service = get_embedding_service()
+    query_embed = service.encode([query])
+    corpus_embeds = service.encode(corpus)
+
     similarities = np.dot(query_embed, corpus_embeds.T).flatten()
     top_indices = np.argsort(similarities)[::-1][:top_k]
-    
+
     return [{
         "text": corpus[i],
         "score": float(similarities[i])
-    } for i in top_indices]
\ No newline at end of file
+    } for i in top_indices]
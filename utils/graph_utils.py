@@ -0,0 +1,181 @@
+import bisect
+import networkx as nx
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+class GraphVersions:
+    """Monotonic graph version plus the version at which each node last changed.
+
+    Writers call touch() with the nodes whose attributes or edges they modified
+    (including removed nodes and their former neighbours); readers holding
+    derived state ask changed_since() for what to refresh.
+    """
+
+    def __init__(self, max_log: int = 4096):
+        self.version = 0
+        self.node_versions = {}
+        self.max_log = max_log
+        self._log_versions = []
+        self._log_nodes = []
+
+    def touch(self, nodes: Iterable[Hashable]) -> int:
+        nodes = set(nodes)
+        self.version += 1
+        for node in nodes:
+            self.node_versions[node] = self.version
+        self._log_versions.append(self.version)
+        self._log_nodes.append(nodes)
+        if len(self._log_versions) > self.max_log:
+            drop = len(self._log_versions) - self.max_log
+            del self._log_versions[:drop]
+            del self._log_nodes[:drop]
+        return self.version
+
+    def changed_since(self, version: int) -> Optional[Set[Hashable]]:
+        """Nodes touched after version, or None if the log no longer reaches back that far"""
+        if version >= self.version:
+            return set()
+        if not self._log_versions or self._log_versions[0] > version + 1:
+            return None
+        changed = set()
+        for nodes in self._log_nodes[bisect.bisect_right(self._log_versions, version):]:
+            changed |= nodes
+        return changed
+
+def get_graph_versions(graph: nx.Graph) -> GraphVersions:
+    """Return the version tracker attached to graph, creating it on first use"""
+    versions = graph.graph.get('versions')
+    if versions is None:
+        versions = graph.graph['versions'] = GraphVersions()
+    return versions
+
+class UnionFind:
+    """Disjoint sets with path halving and union by size"""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item: Hashable) -> Hashable:
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.size[item] = 1
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def groups(self) -> List[List[Hashable]]:
+        """Sets with more than one member, members in first-seen order"""
+        members = {}
+        for item in self.parent:
+            members.setdefault(self.find(item), []).append(item)
+        return [group for group in members.values() if len(group) > 1]
+
+def group_pairs(pairs: Iterable[Tuple[Hashable, Hashable]]) -> List[List[Hashable]]:
+    """Collapse transitive merge pairs into disjoint groups"""
+    sets = UnionFind()
+    for a, b in pairs:
+        sets.union(a, b)
+    return sets.groups()
+
+def to_weighted_undirected(graph: nx.Graph, weight: str = 'weight') -> nx.Graph:
+    """Collapse a (multi)digraph into a simple undirected graph, summing parallel edge weights"""
+    undirected = nx.Graph()
+    undirected.add_nodes_from(graph)
+    adjacency = undirected.adj
+    for u, v, w in graph.edges(data=weight, default=1):
+        if v in adjacency[u]:
+            adjacency[u][v][weight] += w
+        else:
+            undirected.add_edge(u, v, **{weight: w})
+    return undirected
+
+def edge_attributes(graph: nx.Graph, u: Hashable, v: Hashable) -> dict:
+    """Attributes of the u -> v fact; for parallel edges, the most recently updated one"""
+    data = graph[u][v]
+    if graph.is_multigraph():
+        return max(data.values(), key=lambda attrs: attrs.get('last_updated', 0))
+    return data
+
+def _combine_edge(target: dict, source: dict):
+    """Fold a duplicate fact into the surviving edge, keeping the freshest and strongest values"""
+    target['weight'] = max(target.get('weight', 0.0), source.get('weight', 0.0))
+    target['last_updated'] = max(target.get('last_updated', 0), source.get('last_updated', 0))
+    history = source.get('archived_history')
+    if history:
+        target['archived_history'] = list(target.get('archived_history') or []) + list(history)
+
+def merge_node_groups(graph: nx.MultiDiGraph, groups: List[List[Hashable]]) -> Dict[Hashable, Hashable]:
+    """Contract each group into one representative node, in place.
+
+    The representative is the highest-degree member, so only the edges of the
+    other members are rewired. Rewired edges that would become self-loops are
+    dropped, and an edge that duplicates an existing fact (same endpoints and
+    predicate) is folded into it. Returns the {merged node: representative} map.
+    """
+    mapping = {}
+    for group in groups:
+        members = [node for node in group if node in graph]
+        if len(members) < 2:
+            continue
+        representative = max(members, key=graph.degree)
+        for node in members:
+            if node != representative:
+                mapping[node] = representative
+
+    if not mapping:
+        return mapping
+
+    def resolve(node):
+        return mapping.get(node, node)
+
+    # Collect every touched edge once: out-edges of merged nodes, plus in-edges
+    # whose source is not itself merged (those are seen as out-edges already)
+    rewired = []
+    for node in mapping:
+        for _, v, data in graph.out_edges(node, data=True):
+            rewired.append((node, v, data))
+        for u, _, data in graph.in_edges(node, data=True):
+            if u not in mapping:
+                rewired.append((u, node, data))
+
+    for node, representative in mapping.items():
+        attrs = graph.nodes[node]
+        rep_attrs = graph.nodes[representative]
+        if 'last_updated' in attrs:
+            rep_attrs['last_updated'] = max(rep_attrs.get('last_updated', 0), attrs['last_updated'])
+        if 'created' in attrs:
+            rep_attrs['created'] = min(rep_attrs.get('created', attrs['created']), attrs['created'])
+
+    graph.remove_nodes_from(mapping)
+
+    for u, v, data in rewired:
+        u, v = resolve(u), resolve(v)
+        if u == v:
+            continue
+        existing = graph[u].get(v, {})
+        if existing and not graph.is_multigraph():
+            existing = {0: existing}
+        for key, edge_data in existing.items():
+            if edge_data.get('predicate') == data.get('predicate'):
+                _combine_edge(edge_data, data)
+                if graph.is_multigraph():
+                    # Write back: the compact backend hands out attribute copies
+                    graph.add_edge(u, v, key, **edge_data)
+                break
+        else:
+            graph.add_edge(u, v, **data)
+
+    return mapping
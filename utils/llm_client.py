@@ -0,0 +1,335 @@
+import time
+import random
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List
+import httpx
+import openai
+from config import DynaGraphConfig as config
+
+# Transient failures worth retrying; anything else (auth, bad request) is raised at once
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+class _Slots:
+    """At most `size` holders across threads and event loops, granted in arrival order.
+
+    Sync callers block their thread; async callers await a future on their own
+    loop. release() hands the slot straight to the oldest waiter.
+    """
+
+    def __init__(self, size: int):
+        self._free = size
+        self._waiters = deque()  # threading.Event or (loop, future)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted)
+        granted.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and not waiter[1].cancelled():
+                self.release()  # granted just before the cancellation landed
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:  # its loop is closed; try the next waiter
+                    continue
+            self._free += 1
+
+    def _grant(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+class LLMClient:
+    """Process-wide chat-completions client over one keep-alive connection pool.
+
+    Sync calls go through an openai.OpenAI client and async calls through
+    openai.AsyncOpenAI clients, all backed by pooled httpx clients; async requests
+    are spread over pools of `pool_shard_size` connections, one set per event
+    loop, closed when that loop shuts down. Sync and async calls together allow
+    at most `max_concurrency` requests in flight. Retryable errors back off
+    exponentially with full jitter, or by Retry-After when the server sends it.
+    """
+
+    def __init__(self, base_url: str = config.API_BASE_URL, api_key: str = config.API_KEY,
+                 max_concurrency: int = config.LLM_MAX_CONCURRENCY, timeout: float = config.LLM_TIMEOUT,
+                 max_retries: int = config.LLM_MAX_RETRIES, backoff_base: float = config.LLM_BACKOFF_BASE,
+                 backoff_max: float = config.LLM_BACKOFF_MAX, pool_shard_size: int = config.LLM_POOL_SHARD_SIZE):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_shard_size = max(1, min(pool_shard_size, max_concurrency))
+
+        self._client = None
+        self._slots = _Slots(max_concurrency)
+        self._async = {}  # event loop -> (AsyncOpenAI shards, round-robin counter, pool keeper)
+        self._lock = threading.Lock()
+
+        self._latencies = deque(maxlen=config.LLM_LATENCY_WINDOW)
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_concurrency,
+                            max_keepalive_connections=self.max_concurrency,
+                            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY)
+
+    @property
+    def client(self) -> openai.OpenAI:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = openai.OpenAI(
+                        base_url=self.base_url, api_key=self.api_key, timeout=self.timeout,
+                        max_retries=0,  # retried here, under the concurrency limit
+                        http_client=httpx.Client(limits=self._limits(), timeout=self.timeout)
+                    )
+        return self._client
+
+    async def _async_client(self) -> openai.AsyncOpenAI:
+        # httpx async pools belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        state = self._async.get(loop)
+        if state is None:
+            # Loops closed without shutting down their async generators left nothing to close with
+            for stale in [other for other in list(self._async) if other.is_closed()]:
+                self._async.pop(stale, None)
+            # Per-request bookkeeping in an httpx async pool grows with its size, so large
+            # concurrency limits are spread round-robin over several small pools
+            shards = -(-self.max_concurrency // self.pool_shard_size)
+            limits = httpx.Limits(max_connections=self.pool_shard_size,
+                                  max_keepalive_connections=self.pool_shard_size,
+                                  keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY)
+            clients = [openai.AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, timeout=self.timeout, max_retries=0,
+                http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            ) for _ in range(shards)]
+            keeper = self._keep_pools(loop, clients)
+            state = self._async[loop] = (clients, itertools.count(), keeper)
+            await keeper.asend(None)
+        clients, turn, _ = state
+        return clients[next(turn) % len(clients)]
+
+    async def _keep_pools(self, loop, clients: List[openai.AsyncOpenAI]):
+        """Parked async generator owning one loop's pools.
+
+        The loop's shutdown_asyncgens() (run by asyncio.run) resumes it while the
+        loop can still close connections; close() schedules the same on the loop.
+        """
+        try:
+            yield
+        finally:
+            self._async.pop(loop, None)
+            for client in clients:
+                await client.close()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _failed(self, attempt: int, error: Exception) -> float:
+        """Record a failed attempt; return the delay before retrying or re-raise"""
+        with self._lock:
+            if isinstance(error, openai.RateLimitError):
+                self.rate_limited += 1
+            if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+                self.errors += 1
+                raise error
+            self.retries += 1
+        return self._backoff(attempt, error)
+
+    def _record(self, seconds: float):
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(seconds)
+
+    def complete(self, model: str, messages: List[Dict], **kwargs):
+        """Blocking chat completion; returns the openai ChatCompletion"""
+        attempt = 0
+        while True:
+            try:
+                with self._slots:
+                    start = time.perf_counter()
+                    response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+            except Exception as error:
+                delay = self._failed(attempt, error)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self._record(time.perf_counter() - start)
+            return response
+
+    async def acomplete(self, model: str, messages: List[Dict], **kwargs):
+        """asyncio chat completion; returns the openai ChatCompletion"""
+        client = await self._async_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._slots:
+                    start = time.perf_counter()
+                    response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+            except Exception as error:
+                delay = self._failed(attempt, error)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._record(time.perf_counter() - start)
+            return response
+
+    def stream(self, model: str, messages: List[Dict], **kwargs) -> Iterator[str]:
+        """Blocking streamed chat completion; yields content deltas as they arrive.
+
+        Retries only happen before the first chunk, so no text is ever repeated. The
+        concurrency slot is held until the stream is exhausted or closed.
+        """
+        attempt = 0
+        while True:
+            try:
+                self._slots.acquire()
+                start = time.perf_counter()
+                chunks = self.client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+            except Exception as error:
+                self._slots.release()
+                delay = self._failed(attempt, error)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            break
+        try:
+            with chunks:
+                for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        finally:
+            self._slots.release()
+        self._record(time.perf_counter() - start)
+
+    async def astream(self, model: str, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """asyncio streamed chat completion; yields content deltas as they arrive"""
+        client = await self._async_client()
+        attempt = 0
+        while True:
+            await self._slots.aacquire()
+            try:
+                start = time.perf_counter()
+                chunks = await client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+            except Exception as error:
+                self._slots.release()
+                delay = self._failed(attempt, error)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            break
+        try:
+            async with chunks:
+                async for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        finally:
+            self._slots.release()
+        self._record(time.perf_counter() - start)
+
+    def stats(self) -> Dict:
+        """Call counts and request latency percentiles (excluding slot waits) over the recent window"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors
+            }
+        if latencies:
+            stats.update({
+                "mean": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+                "max": latencies[-1]
+            })
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        # Async pools can only be closed on their own loops
+        for loop, (_, _, keeper) in list(self._async.items()):
+            try:
+                loop.call_soon_threadsafe(lambda loop=loop, keeper=keeper: loop.create_task(keeper.aclose()))
+            except RuntimeError:  # already closed
+                self._async.pop(loop, None)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Return the LLM client shared by every component in this process"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
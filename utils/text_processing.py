@@ -1,4 +1,8 @@
 import re
+import threading
+from collections import defaultdict
+from typing import Iterable, List
+from config import DynaGraphConfig as config
 
 def clean_text(text: str) -> str:
     """Basic text cleaning function"""
@@ -18,4 +22,120 @@ def tokenize_with_offsets(text: str):
         end = start + len(word)
         tokens.append((word, start, end))
         start = end + 1  # +1 for the space
-    return tokens
\ No newline at end of file
+    return tokens
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate: one token per punctuation mark and per ~4 characters of a word"""
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PIECES.findall(text))
+
+class AnchorIndex:
+    """Lookup tables for matching query entities to node names without scanning every node.
+
+    Holds a lowercase exact-match map, token postings, and 1..3 character
+    prefix/suffix tables: every node that can share a token, a prefix or a suffix
+    with an entity is reachable from one of them. Candidates come back in graph
+    insertion order so callers keep first-best-match tie-breaking.
+    """
+
+    def __init__(self):
+        self._order = {}
+        self._next = 0
+        self._exact = defaultdict(set)
+        self._tokens = defaultdict(set)
+        self._prefix = [None] + [defaultdict(set) for _ in range(3)]
+        self._suffix = [None] + [defaultdict(set) for _ in range(3)]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, node) -> bool:
+        return node in self._order
+
+    def _postings(self, node):
+        lower = str(node).lower()
+        yield self._exact, lower
+        for token in set(lower.split()):
+            yield self._tokens, token
+        for k in range(1, min(3, len(lower)) + 1):
+            yield self._prefix[k], lower[:k]
+            yield self._suffix[k], lower[-k:]
+
+    def add(self, nodes: Iterable):
+        for node in nodes:
+            if node in self._order:
+                continue
+            self._order[node] = self._next
+            self._next += 1
+            for table, key in self._postings(node):
+                table[key].add(node)
+
+    def remove(self, nodes: Iterable):
+        for node in nodes:
+            if self._order.pop(node, None) is None:
+                continue
+            for table, key in self._postings(node):
+                bucket = table.get(key)
+                if bucket is not None:
+                    bucket.discard(node)
+                    if not bucket:
+                        del table[key]
+
+    def candidates(self, entity: str) -> List:
+        """Nodes that can score above zero against entity, in insertion order"""
+        lower = entity.lower()
+        if not lower:
+            # Every node starts with the empty string
+            return sorted(self._order, key=self._order.__getitem__)
+        found = set(self._exact.get(lower, ()))
+        for token in set(lower.split()):
+            found.update(self._tokens.get(token, ()))
+
+        # node starts/ends with the entity's first/last (up to) 3 characters
+        k = min(3, len(lower))
+        if k:
+            found.update(self._prefix[k].get(lower[:k], ()))
+            found.update(self._suffix[k].get(lower[-k:], ()))
+        # entity starts/ends with a node shorter than 3 characters
+        for j in range(min(2, len(lower)) + 1):
+            found.update(self._exact.get(lower[:j], ()))
+            found.update(self._exact.get(lower[len(lower) - j:], ()))
+
+        return sorted(found, key=self._order.__getitem__)
+
+def get_anchor_index(graph) -> AnchorIndex:
+    """Return the anchor index attached to graph, rebuilding it if it fell out of step"""
+    index = graph.graph.get('anchor_index')
+    if index is None or len(index) != graph.number_of_nodes():
+        index = AnchorIndex()
+        index.add(graph.nodes)
+        graph.graph['anchor_index'] = index
+    return index
+
+# Pipeline components that do not contribute to doc.ents
+_NON_NER_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+_ner_pipelines = {}
+_ner_lock = threading.Lock()
+
+def get_ner_pipeline(model: str = config.NER_MODEL):
+    """Return the process-wide spaCy pipeline for model, loaded on first use with only what NER needs"""
+    nlp = _ner_pipelines.get(model)
+    if nlp is None:
+        with _ner_lock:
+            nlp = _ner_pipelines.get(model)
+            if nlp is None:
+                import spacy
+                nlp = spacy.load(model, exclude=_NON_NER_PIPES)
+                # Drop the shared tok2vec when NER carries its own embedding layer
+                if "tok2vec" in nlp.pipe_names and "ner" not in nlp.get_pipe("tok2vec").listening_components:
+                    nlp.remove_pipe("tok2vec")
+                _ner_pipelines[model] = nlp
+    return nlp
+
+def extract_entities(texts: Iterable[str], model: str = config.NER_MODEL,
+                     batch_size: int = config.NER_BATCH_SIZE) -> List[List[str]]:
+    """Named-entity strings for each text, run through nlp.pipe in batches"""
+    nlp = get_ner_pipeline(model)
+    return [[ent.text for ent in doc.ents] for doc in nlp.pipe(texts, batch_size=batch_size)]